@@ -5,8 +5,16 @@ Convert Python code to Sui
 """
 
 import ast
+import bisect
+import heapq
+import json
+import os
 import sys
-from typing import Optional
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterable, Iterator, Optional, TextIO
 
 def get_version() -> str:
     """Get package version"""
@@ -17,18 +25,55 @@ def get_version() -> str:
         return "0.4.1"
 
 
+def tokenize(line: str) -> list[str]:
+    """Split a Sui line into tokens, keeping string literals whole"""
+    tokens = []
+    i = 0
+    while i < len(line):
+        if line[i] in ' \t':
+            i += 1
+            continue
+        j = i
+        if line[i] == '"':
+            j += 1
+            while j < len(line) and line[j] != '"':
+                j += 2 if line[j] == '\\' else 1
+            j += 1
+        else:
+            while j < len(line) and line[j] not in ' \t':
+                j += 1
+        tokens.append(line[i:j])
+        i = j
+    return tokens
+
+
+def is_temp(token: str) -> bool:
+    """Check if a token is a temporary awaiting register allocation"""
+    return token[:1] == 't' and token[1:].isdigit()
+
+
+# Comparisons as (instruction, swap operands, negate result)
+COMPARE_OPS = {
+    ast.Lt: ('<', False), ast.Gt: ('>', False), ast.Eq: ('~', False), ast.Is: ('~', False),
+    ast.LtE: ('>', True), ast.GtE: ('<', True), ast.NotEq: ('~', True), ast.IsNot: ('~', True),
+}
+
+
 class Py2SuiTranspiler(ast.NodeVisitor):
     """Python to Sui transpiler"""
 
     def __init__(self):
         self.output: list[str] = []
         self.var_counter = 0
+        self.temp_counter = 0
+        self.global_counter = 0
         self.label_counter = 0
         self.func_counter = 0
-        self.var_map: dict[str, str] = {}  # Python var name -> Sui var
+        self.var_map: dict[str, str] = {}  # Python var name -> Sui global (or main) var
+        self.local_map: dict[str, str] = {}  # Python var name -> Sui local in a function
         self.func_map: dict[str, int] = {}  # Python func name -> Sui func id
         self.is_global = True
-        self.func_args: list[str] = []  # Current function argument names
+        self.func_args: dict[str, int] = {}  # Current function argument names -> index
 
     def emit(self, line: str):
         """Emit a line of code"""
@@ -40,6 +85,12 @@ class Py2SuiTranspiler(ast.NodeVisitor):
         self.var_counter += 1
         return var
 
+    def new_temp(self) -> str:
+        """Create a temporary; allocate_temps() later maps it onto a reusable vN"""
+        temp = f"t{self.temp_counter}"
+        self.temp_counter += 1
+        return temp
+
     def new_label(self) -> int:
         """Create a new label"""
         label = self.label_counter
@@ -50,28 +101,137 @@ class Py2SuiTranspiler(ast.NodeVisitor):
         """Resolve a variable name"""
         # Function argument
         if name in self.func_args:
-            return f"a{self.func_args.index(name)}"
+            return f"a{self.func_args[name]}"
         # Existing variable
+        if name in self.local_map:
+            return self.local_map[name]
         if name in self.var_map:
             return self.var_map[name]
         # New variable
         if self.is_global:
-            var = f"g{len([v for v in self.var_map.values() if v.startswith('g')])}"
+            var = f"g{self.global_counter}"
+            self.global_counter += 1
+            self.var_map[name] = var
         else:
             var = self.new_var()
-        self.var_map[name] = var
+            self.local_map[name] = var
         return var
 
+    def allocate_temps(self, start: int, first_free: int):
+        """
+        Map the temporaries in output[start:] onto as few vN registers as
+        possible, starting at v{first_free}, with a linear scan over their
+        live ranges
+        """
+        lines = [tokenize(line) for line in self.output[start:]]
+        first: dict[str, int] = {}
+        last: dict[str, int] = {}
+        labels: dict[str, int] = {}
+        for i, tokens in enumerate(lines):
+            if tokens and tokens[0] == ':':
+                labels[tokens[1]] = i
+            for token in tokens[1:]:
+                if is_temp(token):
+                    first.setdefault(token, i)
+                    last[token] = i
+
+        # A temporary live into a loop stays live until its back edge
+        loops = [(labels[tokens[-1]], i) for i, tokens in enumerate(lines)
+                 if tokens and tokens[0] in ('@', '?') and labels.get(tokens[-1], i) < i]
+        loops.sort()
+        heads = [head for head, _ in loops]
+        changed = True
+        while changed:
+            changed = False
+            for temp, begin in first.items():
+                lo = bisect.bisect_right(heads, begin)
+                hi = bisect.bisect_right(heads, last[temp])
+                for _, back in loops[lo:hi]:
+                    if last[temp] < back:
+                        last[temp] = back
+                        changed = True
+
+        # Every instruction reads its operands before writing its result, so
+        # a register freed on a line can be reused for that line's result
+        assigned: dict[str, str] = {}
+        free: list[int] = []
+        active: list[tuple[int, int]] = []  # (end, register)
+        next_reg = first_free
+        for temp in sorted(first, key=first.get):
+            begin = first[temp]
+            while active and active[0][0] <= begin:
+                heapq.heappush(free, heapq.heappop(active)[1])
+            reg = heapq.heappop(free) if free else next_reg
+            if reg == next_reg:
+                next_reg += 1
+            assigned[temp] = f"v{reg}"
+            heapq.heappush(active, (last[temp], reg))
+
+        for i, tokens in enumerate(lines):
+            if any(is_temp(t) for t in tokens[1:]):
+                self.output[start + i] = ' '.join(assigned.get(t, t) for t in tokens)
+
+    def literal(self, node: ast.Constant) -> str:
+        """Sui operand for a constant"""
+        if isinstance(node.value, str):
+            return f'"{node.value}"'
+        if isinstance(node.value, bool) or node.value is None:
+            return str(int(bool(node.value)))
+        return str(node.value)
+
+    def compare(self, op: ast.cmpop, left: str, right: str) -> tuple[str, bool]:
+        """Emit one comparison; returns (temp, negated) where the temp holds it or its negation"""
+        result = self.new_temp()
+        if type(op) not in COMPARE_OPS:
+            self.emit(f"= {result} 0")
+            return result, False
+        inst, negated = COMPARE_OPS[type(op)]
+        self.emit(f"{inst} {result} {left} {right}")
+        return result, negated
+
+    def branch(self, test: ast.expr, label: int, when: bool):
+        """Jump to `label` if `test` is truthy (when=True) or falsy (when=False)"""
+        if isinstance(test, ast.Constant):
+            if bool(test.value) == when:
+                self.emit(f"@ {label}")
+            return
+
+        if isinstance(test, ast.UnaryOp) and isinstance(test.op, ast.Not):
+            self.branch(test.operand, label, not when)
+            return
+
+        if isinstance(test, ast.BoolOp):
+            # Short-circuit: `and` exits on the first falsy value, `or` on the first truthy one
+            exits_on = isinstance(test.op, ast.Or)
+            if exits_on == when:
+                for value in test.values:
+                    self.branch(value, label, when)
+            else:
+                skip = self.new_label()
+                for value in test.values[:-1]:
+                    self.branch(value, skip, exits_on)
+                self.branch(test.values[-1], label, when)
+                self.emit(f": {skip}")
+            return
+
+        if isinstance(test, ast.Compare) and len(test.ops) == 1:
+            left = self.visit_expr(test.left)
+            right = self.visit_expr(test.comparators[0])
+            cond, negated = self.compare(test.ops[0], left, right)
+        else:
+            cond, negated = self.visit_expr(test), False
+
+        if negated == when:
+            # The value on hand is the opposite of what we branch on
+            result = self.new_temp()
+            self.emit(f"! {result} {cond}")
+            cond = result
+        self.emit(f"? {cond} {label}")
+
     def visit_expr(self, node: ast.expr) -> str:
-        """Evaluate expression and return result variable"""
+        """Evaluate expression and return the operand holding its value"""
         if isinstance(node, ast.Constant):
-            # Literal
-            var = self.new_var()
-            if isinstance(node.value, str):
-                self.emit(f'= {var} "{node.value}"')
-            else:
-                self.emit(f"= {var} {node.value}")
-            return var
+            return self.literal(node)
 
         elif isinstance(node, ast.Name):
             return self.get_var(node.id)
@@ -79,7 +239,7 @@ class Py2SuiTranspiler(ast.NodeVisitor):
         elif isinstance(node, ast.BinOp):
             left = self.visit_expr(node.left)
             right = self.visit_expr(node.right)
-            result = self.new_var()
+            result = self.new_temp()
 
             op_map = {
                 ast.Add: '+',
@@ -94,58 +254,40 @@ class Py2SuiTranspiler(ast.NodeVisitor):
             return result
 
         elif isinstance(node, ast.Compare):
+            # a < b < c is (a < b) & (b < c), with b evaluated once
             left = self.visit_expr(node.left)
-            result = self.new_var()
-
+            result = None
             for op, comparator in zip(node.ops, node.comparators):
                 right = self.visit_expr(comparator)
-
-                if isinstance(op, ast.Lt):
-                    self.emit(f"< {result} {left} {right}")
-                elif isinstance(op, ast.LtE):
-                    # <= is < or ==
-                    tmp1 = self.new_var()
-                    tmp2 = self.new_var()
-                    self.emit(f"< {tmp1} {left} {right}")
-                    self.emit(f"~ {tmp2} {left} {right}")
-                    self.emit(f"| {result} {tmp1} {tmp2}")
-                elif isinstance(op, ast.Gt):
-                    self.emit(f"> {result} {left} {right}")
-                elif isinstance(op, ast.GtE):
-                    tmp1 = self.new_var()
-                    tmp2 = self.new_var()
-                    self.emit(f"> {tmp1} {left} {right}")
-                    self.emit(f"~ {tmp2} {left} {right}")
-                    self.emit(f"| {result} {tmp1} {tmp2}")
-                elif isinstance(op, ast.Eq):
-                    self.emit(f"~ {result} {left} {right}")
-                elif isinstance(op, ast.NotEq):
-                    tmp = self.new_var()
-                    self.emit(f"~ {tmp} {left} {right}")
-                    self.emit(f"! {result} {tmp}")
-
-                left = result
-
+                cond, negated = self.compare(op, left, right)
+                if negated:
+                    self.emit(f"! {cond} {cond}")
+                if result is not None:
+                    self.emit(f"& {cond} {result} {cond}")
+                result = cond
+                left = right
             return result
 
         elif isinstance(node, ast.UnaryOp):
+            if isinstance(node.op, ast.USub) and isinstance(node.operand, ast.Constant):
+                return f"-{self.literal(node.operand)}"
             operand = self.visit_expr(node.operand)
-            result = self.new_var()
+            result = self.new_temp()
 
             if isinstance(node.op, ast.Not):
                 self.emit(f"! {result} {operand}")
             elif isinstance(node.op, ast.USub):
                 self.emit(f"- {result} 0 {operand}")
+            else:
+                return operand
 
             return result
 
         elif isinstance(node, ast.JoinedStr):
             # f-string: not supported
             print(f"⚠ Warning: f-strings are not supported. Use regular strings.", file=sys.stderr)
-            result = self.new_var()
             self.emit(f"; Unsupported: f-string")
-            self.emit(f"= {result} 0")
-            return result
+            return "0"
 
         elif isinstance(node, ast.Call):
             if isinstance(node.func, ast.Name):
@@ -161,46 +303,42 @@ class Py2SuiTranspiler(ast.NodeVisitor):
                         else:
                             arg_var = self.visit_expr(arg)
                             self.emit(f". {arg_var}")
-                    return self.new_var()
+                    return "0"
 
                 # input
                 if func_name == 'input':
-                    result = self.new_var()
+                    result = self.new_temp()
                     self.emit(f", {result}")
                     return result
 
                 # len
                 if func_name == 'len':
                     # Simplified implementation
-                    result = self.new_var()
-                    self.emit(f"= {result} 0")
-                    return result
+                    return "0"
 
                 # User-defined function
                 if func_name in self.func_map:
                     func_id = self.func_map[func_name]
                     args = [self.visit_expr(arg) for arg in node.args]
-                    result = self.new_var()
+                    result = self.new_temp()
                     args_str = " ".join(args)
                     self.emit(f"$ {result} {func_id} {args_str}")
                     return result
 
             # Unknown function
-            result = self.new_var()
-            self.emit(f"= {result} 0")
-            return result
+            return "0"
 
         elif isinstance(node, ast.Subscript):
             arr = self.visit_expr(node.value)
             idx = self.visit_expr(node.slice)
-            result = self.new_var()
+            result = self.new_temp()
             self.emit(f"] {result} {arr} {idx}")
             return result
 
         elif isinstance(node, ast.List):
             # List literal
             size = len(node.elts)
-            result = self.new_var()
+            result = self.new_temp()
             self.emit(f"[ {result} {size}")
             for i, elt in enumerate(node.elts):
                 val = self.visit_expr(elt)
@@ -208,27 +346,27 @@ class Py2SuiTranspiler(ast.NodeVisitor):
             return result
 
         elif isinstance(node, ast.BoolOp):
-            if isinstance(node.op, ast.And):
-                result = self.visit_expr(node.values[0])
-                for val in node.values[1:]:
-                    right = self.visit_expr(val)
-                    new_result = self.new_var()
-                    self.emit(f"& {new_result} {result} {right}")
-                    result = new_result
-                return result
-            elif isinstance(node.op, ast.Or):
-                result = self.visit_expr(node.values[0])
-                for val in node.values[1:]:
-                    right = self.visit_expr(val)
-                    new_result = self.new_var()
-                    self.emit(f"| {new_result} {result} {right}")
-                    result = new_result
-                return result
+            op = '&' if isinstance(node.op, ast.And) else '|'
+            result = self.visit_expr(node.values[0])
+            for val in node.values[1:]:
+                right = self.visit_expr(val)
+                new_result = self.new_temp()
+                self.emit(f"{op} {new_result} {result} {right}")
+                result = new_result
+            return result
 
         # Default
-        result = self.new_var()
-        self.emit(f"= {result} 0")
-        return result
+        return "0"
+
+    def assign_to(self, var: str, value: str):
+        """Store a value, writing straight into `var` when the value was just computed"""
+        if is_temp(value) and self.output:
+            tokens = tokenize(self.output[-1])
+            if len(tokens) > 1 and tokens[1] == value and tokens[0] not in ('[', '{', '.', '?', '@', ':', '^'):
+                tokens[1] = var
+                self.output[-1] = ' '.join(tokens)
+                return
+        self.emit(f"= {var} {value}")
 
     def visit_Assign(self, node: ast.Assign):
         """Assignment statement"""
@@ -237,7 +375,8 @@ class Py2SuiTranspiler(ast.NodeVisitor):
         for target in node.targets:
             if isinstance(target, ast.Name):
                 var = self.get_var(target.id)
-                self.emit(f"= {var} {value}")
+                self.assign_to(var, value)
+                value = var
             elif isinstance(target, ast.Subscript):
                 arr = self.visit_expr(target.value)
                 idx = self.visit_expr(target.slice)
@@ -260,16 +399,12 @@ class Py2SuiTranspiler(ast.NodeVisitor):
 
     def visit_If(self, node: ast.If):
         """If statement"""
-        cond = self.visit_expr(node.test)
-
         if node.orelse:
             # if-else
             else_label = self.new_label()
             end_label = self.new_label()
 
-            not_cond = self.new_var()
-            self.emit(f"! {not_cond} {cond}")
-            self.emit(f"? {not_cond} {else_label}")
+            self.branch(node.test, else_label, False)
 
             for stmt in node.body:
                 self.visit(stmt)
@@ -284,9 +419,7 @@ class Py2SuiTranspiler(ast.NodeVisitor):
             # if only
             end_label = self.new_label()
 
-            not_cond = self.new_var()
-            self.emit(f"! {not_cond} {cond}")
-            self.emit(f"? {not_cond} {end_label}")
+            self.branch(node.test, end_label, False)
 
             for stmt in node.body:
                 self.visit(stmt)
@@ -299,10 +432,7 @@ class Py2SuiTranspiler(ast.NodeVisitor):
         end_label = self.new_label()
 
         self.emit(f": {start_label}")
-        cond = self.visit_expr(node.test)
-        not_cond = self.new_var()
-        self.emit(f"! {not_cond} {cond}")
-        self.emit(f"? {not_cond} {end_label}")
+        self.branch(node.test, end_label, False)
 
         for stmt in node.body:
             self.visit(stmt)
@@ -317,9 +447,7 @@ class Py2SuiTranspiler(ast.NodeVisitor):
                 args = node.iter.args
 
                 if len(args) == 1:
-                    start, end = 0, args[0]
-                elif len(args) == 2:
-                    start, end = args[0], args[1]
+                    start, end = ast.Constant(0), args[0]
                 else:
                     start, end = args[0], args[1]
 
@@ -327,11 +455,7 @@ class Py2SuiTranspiler(ast.NodeVisitor):
                 loop_var = self.get_var(node.target.id)
 
                 # Initialize
-                if isinstance(start, int):
-                    self.emit(f"= {loop_var} {start}")
-                else:
-                    start_val = self.visit_expr(start)
-                    self.emit(f"= {loop_var} {start_val}")
+                self.assign_to(loop_var, self.visit_expr(start))
 
                 # End value
                 end_val = self.visit_expr(end)
@@ -341,12 +465,11 @@ class Py2SuiTranspiler(ast.NodeVisitor):
 
                 self.emit(f": {start_label}")
 
-                # Condition check
-                cond = self.new_var()
+                # Condition check: leave once loop_var < end is false
+                cond = self.new_temp()
                 self.emit(f"< {cond} {loop_var} {end_val}")
-                not_cond = self.new_var()
-                self.emit(f"! {not_cond} {cond}")
-                self.emit(f"? {not_cond} {end_label}")
+                self.emit(f"! {cond} {cond}")
+                self.emit(f"? {cond} {end_label}")
 
                 # Body
                 for stmt in node.body:
@@ -372,24 +495,36 @@ class Py2SuiTranspiler(ast.NodeVisitor):
         old_global = self.is_global
         old_var_counter = self.var_counter
         old_func_args = self.func_args
-        old_var_map = self.var_map.copy()
+        old_local_map = self.local_map
 
         self.is_global = False
         self.var_counter = 0
-        self.func_args = [arg.arg for arg in node.args.args]
+        self.func_args = {arg.arg: i for i, arg in enumerate(node.args.args)}
+        self.local_map = {}
 
         self.emit(f"# {func_id} {argc} {{")
+        body_start = len(self.output)
+
+        # Arguments are read-only in Sui; copy the ones the body reassigns
+        assigned = {n.id for n in ast.walk(node) if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Store)}
+        for name, idx in list(self.func_args.items()):
+            if name in assigned:
+                var = self.new_var()
+                self.emit(f"= {var} a{idx}")
+                del self.func_args[name]
+                self.local_map[name] = var
 
         for stmt in node.body:
             self.visit(stmt)
 
+        self.allocate_temps(body_start, self.var_counter)
         self.emit("}")
 
         # Restore context
         self.is_global = old_global
         self.var_counter = old_var_counter
         self.func_args = old_func_args
-        self.var_map = old_var_map
+        self.local_map = old_local_map
 
     def visit_Return(self, node: ast.Return):
         """Return statement"""
@@ -416,8 +551,10 @@ class Py2SuiTranspiler(ast.NodeVisitor):
         for func in func_defs:
             self.visit(func)
 
+        main_start = len(self.output)
         for stmt in other:
             self.visit(stmt)
+        self.allocate_temps(main_start, self.var_counter)
 
     def transpile(self, code: str) -> str:
         """Transpile Python code to Sui"""
@@ -426,6 +563,118 @@ class Py2SuiTranspiler(ast.NodeVisitor):
         return '\n'.join(self.output)
 
 
+def translate_item(item: tuple[str, Optional[str], Optional[str]]) -> dict:
+    """
+    Translate one batch item (id, path, code) in a worker process.
+    Errors are reported in the result instead of raised.
+    """
+    item_id, path, code = item
+    start = time.perf_counter()
+    try:
+        if code is None:
+            if path is None:
+                raise ValueError('expected a JSON object with a "code" string')
+            with open(path, 'r', encoding='utf-8') as f:
+                code = f.read()
+        sui_code = Py2SuiTranspiler().transpile(code)
+        result = {"id": item_id, "ok": True, "sui": sui_code}
+    except Exception as e:
+        result = {"id": item_id, "ok": False, "error": f"{type(e).__name__}: {e}"}
+    result["elapsed"] = round(time.perf_counter() - start, 6)
+    return result
+
+
+def iter_batch_items(source: str) -> Iterator[tuple[str, Optional[str], Optional[str]]]:
+    """
+    Yield (id, path, code) items from a directory of .py files, or from a
+    JSONL file ('-' for stdin) whose lines hold {"code": ..., "id": ...}
+    """
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith('.py'):
+                    path = os.path.join(root, name)
+                    yield os.path.relpath(path, source), path, None
+        return
+
+    stream = sys.stdin if source == '-' else open(source, 'r', encoding='utf-8')
+    try:
+        for line_no, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                code = record.get("code", record.get("source"))
+                item_id = str(record.get("id", line_no))
+            except (ValueError, AttributeError):
+                code, item_id = None, str(line_no)
+            # A bad record is passed on as code=None so it is reported like any other failure
+            yield item_id, None, code if isinstance(code, str) else None
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def translate_isolated(item: tuple[str, Optional[str], Optional[str]]) -> dict:
+    """Translate one item in a worker process of its own, reporting a crash as its failure"""
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        try:
+            return executor.submit(translate_item, item).result()
+        except BrokenProcessPool:
+            return {"id": item[0], "ok": False, "error": "worker process crashed", "elapsed": None}
+
+
+def run_batch(items: Iterable[tuple[str, Optional[str], Optional[str]]], out: TextIO,
+              workers: Optional[int] = None) -> tuple[int, int]:
+    """
+    Translate items across a process pool, writing one JSON result per line
+    in input order. Returns (total, failed).
+    """
+    workers = workers or os.cpu_count() or 1
+    window = workers * 4  # items in flight; keeps memory flat on large corpora
+    items = iter(items)
+    total = failed = 0
+    pending: deque = deque()
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        while True:
+            while len(pending) < window:
+                item = next(items, None)
+                if item is None:
+                    break
+                pending.append((item, executor.submit(translate_item, item)))
+            if not pending:
+                break
+
+            item, future = pending.popleft()
+            try:
+                result = future.result()
+            except BrokenProcessPool:
+                # A worker died (e.g. out of memory) and took the pool down with it.
+                # Any unfinished item may be the cause, so each is rerun on its own
+                # to pin the crash on the right one before starting a fresh pool
+                executor.shutdown(cancel_futures=True)
+                in_flight = [(item, future)] + list(pending)
+                pending.clear()
+                for queued, queued_future in in_flight:
+                    if not queued_future.done() or queued_future.cancelled() or queued_future.exception():
+                        queued_future = Future()
+                        queued_future.set_result(translate_isolated(queued))
+                    pending.append((queued, queued_future))
+                executor = ProcessPoolExecutor(max_workers=workers)
+                item, future = pending.popleft()
+                result = future.result()
+
+            total += 1
+            failed += not result["ok"]
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+    finally:
+        executor.shutdown(cancel_futures=True)
+    return total, failed
+
+
 def main():
     if len(sys.argv) >= 2 and sys.argv[1] in ('--version', '-V'):
         print(f"sui-lang {get_version()}")
@@ -438,6 +687,8 @@ def main():
         print("Usage:")
         print("  py2sui <file.py>            # Show converted code")
         print("  py2sui <file.py> -o out.sui # Output to file")
+        print("  py2sui --batch <dir|file.jsonl|-> [-o out.jsonl] [--workers N]")
+        print("                              # Translate a corpus in parallel to JSONL")
         print("  py2sui --version            # Show version")
         print("")
         print("Sample:")
@@ -477,6 +728,26 @@ while x < 10:
         print(result)
         return
 
+    if sys.argv[1] == '--batch':
+        if len(sys.argv) < 3:
+            print("Error: --batch requires a directory, JSONL file or '-'", file=sys.stderr)
+            sys.exit(1)
+        workers = None
+        if '--workers' in sys.argv:
+            workers = int(sys.argv[sys.argv.index('--workers') + 1])
+        out = sys.stdout
+        if '-o' in sys.argv:
+            out = open(sys.argv[sys.argv.index('-o') + 1], 'w', encoding='utf-8')
+        start = time.perf_counter()
+        try:
+            total, failed = run_batch(iter_batch_items(sys.argv[2]), out, workers)
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        print(f"✓ Translated {total - failed}/{total} items in {time.perf_counter() - start:.2f}s"
+              f" ({failed} failed)", file=sys.stderr)
+        return
+
     filename = sys.argv[1]
 
     with open(filename, 'r') as f:
@@ -31,7 +31,7 @@ def run_repl():
     from sui import SuiInterpreter, validate_line
 
     print("Sui REPL (empty line to execute, .exit / .quit / .reset)")
-    interp = SuiInterpreter()
+    interp = SuiInterpreter(input='line')
     buffer: list[str] = []
     prompt = ">>> "
 
@@ -51,7 +51,7 @@ def run_repl():
         if not buffer and stripped in {'.exit', '.quit'}:
             break
         if not buffer and stripped == '.reset':
-            interp = SuiInterpreter()
+            interp = SuiInterpreter(input='line')
             print("State reset.")
             continue
 
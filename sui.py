@@ -4,9 +4,20 @@ Sui (粋) Interpreter
 A line-based programming language optimized for LLM code generation
 """
 
+import ast
+import functools
+import hashlib
+import importlib.util
+import inspect
+import mmap
+import os
 import sys
+import textwrap
+import time
+from array import array
+from collections import deque
 from dataclasses import dataclass, field
-from typing import Any, Optional
+from typing import Any, Iterable, Optional
 from repl import run_repl
 
 def get_version() -> str:
@@ -35,15 +46,533 @@ class Context:
     returned: bool = False
 
 
+# Instructions that write their first operand
+RESULT_TARGET_OPS = {'=', '+', '-', '*', '/', '%', '<', '>', '~', '!', '&', '|', '$', '[', ']', ','}
+
+# Sui arrays are int64 storage until they hold a value that doesn't fit, then lists
+ARRAY_TYPECODES = {'q': int, 'd': float}
+
+# Arrays this large start sparse; chunks of SPARSE_CHUNK elements are allocated
+# on first write, and the array turns dense once SPARSE_DENSE_RATIO of them exist
+SPARSE_MIN_SIZE = 1 << 16
+SPARSE_CHUNK_BITS = 12
+SPARSE_CHUNK = 1 << SPARSE_CHUNK_BITS
+SPARSE_DENSE_RATIO = 0.5
+
+
+class SparseArray:
+    """A large zero-filled Sui array whose memory grows with the elements written"""
+    __slots__ = ('length', 'chunks')
+
+    def __init__(self, length: int):
+        self.length = length
+        self.chunks: dict[int, array | list] = {}
+
+    def __len__(self) -> int:
+        return self.length
+
+    def _locate(self, idx: int) -> int:
+        if idx < 0:
+            idx += self.length
+        if not 0 <= idx < self.length:
+            raise IndexError("list index out of range")
+        return idx
+
+    def __getitem__(self, idx: int) -> Any:
+        idx = self._locate(idx)
+        chunk = self.chunks.get(idx >> SPARSE_CHUNK_BITS)
+        return 0 if chunk is None else chunk[idx & (SPARSE_CHUNK - 1)]
+
+    def __setitem__(self, idx: int, value: Any):
+        idx = self._locate(idx)
+        key, offset = idx >> SPARSE_CHUNK_BITS, idx & (SPARSE_CHUNK - 1)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = self.chunks[key] = new_array(min(SPARSE_CHUNK, self.length - (key << SPARSE_CHUNK_BITS)))
+        if type(chunk) is array and type(value) is int:
+            try:
+                chunk[offset] = value
+                return
+            except OverflowError:
+                pass
+        if type(chunk) is array:
+            chunk = self.chunks[key] = chunk.tolist()
+        chunk[offset] = value
+
+    def __iter__(self):
+        for key in range((self.length + SPARSE_CHUNK - 1) >> SPARSE_CHUNK_BITS):
+            chunk = self.chunks.get(key)
+            if chunk is None:
+                yield from [0] * min(SPARSE_CHUNK, self.length - (key << SPARSE_CHUNK_BITS))
+            else:
+                yield from chunk
+
+    def __repr__(self) -> str:
+        return repr(self.tolist())
+
+    def dense_ready(self) -> bool:
+        """Whether enough chunks exist that dense storage is no larger"""
+        return (len(self.chunks) << SPARSE_CHUNK_BITS) >= self.length * SPARSE_DENSE_RATIO
+
+    def to_dense(self) -> array | list:
+        """The same elements as array('q'), or a list if any chunk holds other values"""
+        typed = all(type(chunk) is array for chunk in self.chunks.values())
+        dense = new_array(self.length) if typed else [0] * self.length
+        for key, chunk in self.chunks.items():
+            start = key << SPARSE_CHUNK_BITS
+            dense[start:start + len(chunk)] = chunk if typed else list(chunk)
+        return dense
+
+    def tolist(self) -> list:
+        return list(self)
+
+
+# memoryview arrays are int64/float64 files mapped with map_array
+ARRAY_TYPES = (list, array, SparseArray, memoryview)
+
+
+def new_array(size: int) -> array:
+    """A zero-filled Sui array"""
+    return array('q', bytes(8 * max(size, 0)))
+
+
+def typecode(arr: Any) -> Optional[str]:
+    """'q' or 'd' for typed storage, None for lists"""
+    if type(arr) is array:
+        return arr.typecode
+    if type(arr) is memoryview:
+        return arr.format
+    return None
+
+
+def file_typecode(path: str) -> str:
+    """Element type of a binary array file: float64 for .f64, otherwise int64"""
+    return 'd' if path.endswith('.f64') else 'q'
+
+
+def map_array(path: str) -> memoryview | array:
+    """
+    Map a binary array file (native-endian int64, or float64 for .f64) as a
+    Sui array. Elements are read straight from the page cache; writes stay
+    private to the process.
+    """
+    code = file_typecode(path)
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size % 8:
+            raise RuntimeError(f"{path}: size {size} is not a multiple of 8 bytes")
+        if size == 0:
+            return array(code)
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    return memoryview(mapped).cast(code)
+
+
+def write_array(value: Any, path: str):
+    """Write a Sui array to a binary file (int64, or float64 for .f64) in one write"""
+    code = file_typecode(path)
+    if type(value) is SparseArray:
+        value = value.to_dense()
+    if typecode(value) == code:
+        data = value
+    else:
+        items = value.tolist() if type(value) is not list else value
+        allowed = (int,) if code == 'q' else (int, float)
+        if not all(type(x) in allowed for x in items):
+            raise RuntimeError(f"{path}: array holds values that aren't {'int64' if code == 'q' else 'numbers'}"
+                               + (" (write floats to a .f64 file)" if code == 'q' else ""))
+        try:
+            data = array(code, items)
+        except OverflowError:
+            raise RuntimeError(f"{path}: array holds ints outside int64")
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def to_plain(value: Any) -> Any:
+    """Copy typed Sui arrays (also nested ones) into lists for display"""
+    if type(value) in (array, memoryview):
+        return value.tolist()
+    if type(value) is SparseArray:
+        return to_plain(value.tolist())
+    if type(value) is list and any(isinstance(x, ARRAY_TYPES) for x in value):
+        return [to_plain(x) for x in value]
+    return value
+
+
+class OutputSink:
+    """Destination for values printed with `.` (this base class drops them)"""
+
+    def write(self, value: Any):
+        """Accept one output value"""
+
+    def flush(self):
+        """Deliver anything still buffered"""
+
+    def clear(self):
+        """Forget values kept from an earlier run"""
+
+    def getvalue(self) -> list:
+        """Values kept for the caller (what run() returns)"""
+        return []
+
+
+NullSink = OutputSink
+
+# Values a buffered StdoutSink collects before writing them as one block
+STDOUT_BLOCK = 4096
+
+
+class StdoutSink(OutputSink):
+    """
+    Print one value per line to `stream` (default: sys.stdout at write time).
+    Buffered sinks write blocks of STDOUT_BLOCK lines; the default buffers
+    unless the stream is a TTY.
+    """
+
+    def __init__(self, stream=None, buffered: Optional[bool] = None):
+        self.stream = stream
+        if buffered is None:
+            isatty = getattr(stream or sys.stdout, 'isatty', None)
+            buffered = not (isatty and isatty())
+        self.buffered = buffered
+        self.pending: list[str] = []
+
+    def write(self, value: Any):
+        if not self.buffered:
+            stream = self.stream or sys.stdout
+            stream.write(f"{value}\n")
+            stream.flush()
+            return
+        self.pending.append(str(value))
+        if len(self.pending) >= STDOUT_BLOCK:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            (self.stream or sys.stdout).write('\n'.join(self.pending) + '\n')
+            self.pending = []
+
+
+class CaptureSink(OutputSink):
+    """Keep every value in a list, passing each on to `forward` if given"""
+
+    def __init__(self, forward: Optional[OutputSink] = None):
+        self.forward = forward
+        self.values: list = []
+
+    def write(self, value: Any):
+        self.values.append(value)
+        if self.forward is not None:
+            self.forward.write(value)
+
+    def flush(self):
+        if self.forward is not None:
+            self.forward.flush()
+
+    def clear(self):
+        self.values = []
+
+    def getvalue(self) -> list:
+        return self.values
+
+
+class RingSink(OutputSink):
+    """Keep only the last `size` values"""
+
+    def __init__(self, size: int):
+        self.values: deque = deque(maxlen=size)
+
+    def write(self, value: Any):
+        self.values.append(value)
+
+    def clear(self):
+        self.values.clear()
+
+    def getvalue(self) -> list:
+        return list(self.values)
+
+
+class CallbackSink(OutputSink):
+    """Call `func(value)` for every value"""
+
+    def __init__(self, func):
+        self.func = func
+
+    def write(self, value: Any):
+        self.func(value)
+
+
+def make_sink(output: Any = None) -> OutputSink:
+    """
+    Build an output sink from a sink, a callable or a spec string:
+    'stdout', 'line' (unbuffered stdout), 'capture', 'ring:N' or 'null'.
+    None prints to stdout and also keeps every value, as run() always did.
+    """
+    if output is None:
+        return CaptureSink(StdoutSink())
+    if isinstance(output, OutputSink):
+        return output
+    if callable(output):
+        return CallbackSink(output)
+    kind, _, size = str(output).partition(':')
+    if kind == 'stdout' and not size:
+        return StdoutSink()
+    if kind == 'line' and not size:
+        return StdoutSink(buffered=False)
+    if kind == 'capture' and not size:
+        return CaptureSink()
+    if kind == 'null' and not size:
+        return NullSink()
+    if kind == 'ring' and size.isdigit() and int(size) > 0:
+        return RingSink(int(size))
+    raise ValueError(f"Unknown output sink: {output} (expected stdout, line, capture, ring:N or null)")
+
+
+def parse_input(text: str) -> Any:
+    """A line of input as an int, else a float, else the string itself"""
+    try:
+        return int(text)
+    except ValueError:
+        try:
+            return float(text)
+        except ValueError:
+            return text
+
+
+def parse_input_lines(lines: list) -> list:
+    """parse_input for a block of lines (str or bytes), with an all-integer fast path"""
+    if lines and type(lines[0]) is bytes:
+        lines = [line.decode('utf-8') for line in lines]
+    lines = [line[:-1] if line.endswith('\r') else line for line in lines]
+    try:
+        return list(map(int, lines))
+    except ValueError:
+        return [parse_input(line) for line in lines]
+
+
+class InputSource:
+    """Where `,` takes values from; read() raises EOFError when none are left"""
+
+    def read(self) -> Any:
+        raise EOFError("EOF when reading a line")
+
+
+# Bytes a StreamInput asks for at a time
+INPUT_BLOCK = 1 << 16
+
+
+class StreamInput(InputSource):
+    """
+    One value per line of a text or binary stream (default: sys.stdin).
+    Reads take whatever is available up to INPUT_BLOCK bytes (read1), so
+    interactive input isn't held back, and each block is parsed at once.
+    """
+
+    def __init__(self, stream=None, block_size: int = INPUT_BLOCK):
+        self.stream = stream
+        self.block_size = block_size
+        self.values: list = []
+        self.pos = 0
+        self.partial = None
+        self.eof = False
+
+    def read(self) -> Any:
+        while self.pos >= len(self.values):
+            if self.eof:
+                raise EOFError("EOF when reading a line")
+            self.fill()
+        value = self.values[self.pos]
+        self.pos += 1
+        return value
+
+    def fill(self):
+        """Read and parse the next block"""
+        stream = self.stream or sys.stdin
+        raw = getattr(stream, 'buffer', stream)
+        block = getattr(raw, 'read1', raw.read)(self.block_size)
+        if self.partial is None:
+            self.partial = block[:0]
+        if not block:
+            self.eof = True
+            lines = [self.partial] if self.partial else []
+        else:
+            lines = (self.partial + block).split(b'\n' if type(block) is bytes else '\n')
+            self.partial = lines.pop()
+        self.values = parse_input_lines(lines)
+        self.pos = 0
+
+
+class LineInput(InputSource):
+    """One value per input() call, for sharing the terminal with a REPL"""
+
+    def read(self) -> Any:
+        return parse_input(input())
+
+
+class IterableInput(InputSource):
+    """Values from an iterable; strings are parsed like input lines, numbers kept"""
+
+    def __init__(self, values):
+        self.values = iter(values)
+
+    def read(self) -> Any:
+        for value in self.values:
+            return parse_input(value) if isinstance(value, str) else value
+        raise EOFError("EOF when reading a line")
+
+
+def make_source(source: Any = None) -> InputSource:
+    """
+    Build an input source from a source, 'stdin' (the default), 'line'
+    (input() per value), a file object, a NumPy array or any iterable
+    """
+    if isinstance(source, InputSource):
+        return source
+    if source is None:
+        return StreamInput()
+    if isinstance(source, str):
+        if source == 'stdin':
+            return StreamInput()
+        if source == 'line':
+            return LineInput()
+        raise ValueError(f"Unknown input source: {source} (expected stdin or line)")
+    if hasattr(source, 'read'):
+        return StreamInput(source)
+    if hasattr(source, 'ravel') and hasattr(source, 'tolist'):
+        # NumPy arrays: convert once instead of per element
+        return IterableInput(source.ravel().tolist())
+    return IterableInput(source)
+
+
+# Instructions a counted loop body may contain to run as NumPy operations
+VECTOR_OPS = {'=', '+', '-', '*', '/', '%', '<', '>', '~', '!', '&', '|', ']', '{'}
+
+# Fewer iterations than this stay scalar; conversion would cost more than it saves
+VECTOR_MIN_TRIPS = 32
+
+INT64_LIMIT = 2 ** 63
+FLOAT_EXACT_LIMIT = 2 ** 53
+
+_numpy_module = None
+
+
+def _numpy():
+    """NumPy, imported on first use (None if not installed)"""
+    global _numpy_module
+    if _numpy_module is None:
+        try:
+            import numpy
+            _numpy_module = numpy
+        except ImportError:
+            _numpy_module = False
+    return _numpy_module or None
+
+
+@dataclass
+class CountedLoop:
+    """
+    A loop `: L / exit test / body / + i i 1 / @ L` whose body only reads and
+    writes arrays at the counter (plus a loop-invariant offset)
+    """
+    start: int  # index of the `: L` line
+    end: int  # index of the `@ L` line
+    counter: str
+    bound: str
+    inclusive: bool  # runs while counter <= bound
+    body: list[list[str]]
+    reductions: set[str]
+    offsets: dict[str, tuple[int, str]]  # index temp -> (sign, invariant operand)
+
+
+class _VectorFallback(Exception):
+    """Raised when a counted loop must run on the scalar path"""
+
+
+@dataclass
+class Limits:
+    """Resource caps for a run; None means unlimited"""
+    steps: Optional[int] = None  # instructions, checked at backward jumps and calls
+    array_cells: Optional[int] = None  # elements of all arrays created with `[`
+    depth: Optional[int] = None  # nested function calls
+    output: Optional[int] = None  # values printed with `.`
+
+
+class SuiLimitError(RuntimeError):
+    """A run went past one of its Limits (`limit` names the field, `value` its cap)"""
+
+    def __init__(self, limit: str, value: int):
+        super().__init__(f"{limit} limit exceeded ({value})")
+        self.limit = limit
+        self.value = value
+
+
+class StepLimitExceeded(SuiLimitError):
+    """More instructions than Limits.steps"""
+
+
+class ArrayLimitExceeded(SuiLimitError):
+    """More array cells than Limits.array_cells"""
+
+
+class DepthLimitExceeded(SuiLimitError):
+    """Calls nested deeper than Limits.depth"""
+
+
+class OutputLimitExceeded(SuiLimitError):
+    """More output values than Limits.output"""
+
+
+class TimeLimitExceeded(SuiLimitError):
+    """Ran past the interpreter's timeout (value in seconds)"""
+
+
+# Instructions between clock checks when a run has a timeout
+DEADLINE_CHECK_STEPS = 10_000
+
+
+def _cap(value: Optional[int]) -> float:
+    """A limit as a number to compare against (infinite when unset)"""
+    return float('inf') if value is None else value
+
+
 class SuiInterpreter:
     """Sui language interpreter"""
 
-    def __init__(self):
+    def __init__(self, output: Any = None, input: Any = None, limits: Optional[Limits] = None,
+                 cache: Any = None, timeout: Optional[float] = None):
+        """
+        output: where `.` sends values, anything make_sink accepts
+        input: where `,` reads values from, anything make_source accepts
+        limits: resource caps; going past one raises a SuiLimitError
+        cache: a suicache.ResultCache (or its directory) that answers repeated
+               runs of programs without `,` or array files
+        timeout: seconds each run() may take before TimeLimitExceeded; the
+                 clock is read every DEADLINE_CHECK_STEPS instructions
+        """
         self.global_vars: dict[int, Any] = {}
         self.functions: dict[int, Function] = {}
         self.context_stack: list[Context] = []
         self.context: Context = Context()
-        self.output: list = []
+        self.sink = make_sink(output)
+        self.source = make_source(input)
+        if isinstance(cache, str):
+            from suicache import ResultCache
+            cache = ResultCache(cache)
+        self.cache = cache
+        self.counted_loops: dict[int, tuple[list, dict[int, CountedLoop]]] = {}
+        self.vectorized_loops = 0
+        self.steps = 0  # instructions executed (vectorized loops count every iteration)
+        self.array_cells = 0
+        self.output_count = 0
+        self.limits = limits or Limits()
+        self.timeout = timeout
+        self.deadline: Optional[float] = None
+        self.step_limit = _cap(self.limits.steps)
+        # The only cap the hot loop checks; with a timeout it is also a clock checkpoint
+        self.step_cap = self.step_limit
+        self.cell_cap = _cap(self.limits.array_cells)
+        self.depth_cap = _cap(self.limits.depth)
+        self.output_cap = _cap(self.limits.output)
 
     def parse(self, code: str) -> list[list[str]]:
         """
@@ -127,6 +656,26 @@ class SuiInterpreter:
 
             i += 1
 
+    def extract_main(self, lines: list[list[str]]) -> list[list[str]]:
+        """Return the top-level lines outside function definitions"""
+        main_lines = []
+        i = 0
+        while i < len(lines):
+            if lines[i][0] == '#':
+                # Skip function definition
+                depth = 1
+                i += 1
+                while i < len(lines) and depth > 0:
+                    if lines[i][0] == '#' and len(lines[i]) > 3 and lines[i][-1] == '{':
+                        depth += 1
+                    elif lines[i][0] == '}':
+                        depth -= 1
+                    i += 1
+            else:
+                main_lines.append(lines[i])
+                i += 1
+        return main_lines
+
     def resolve(self, val: str) -> Any:
         """Resolve a value"""
         if val.startswith('v'):
@@ -248,23 +797,7 @@ class SuiInterpreter:
             call_args = [self.resolve(a) for a in tokens[3:]]
 
             if func_id in self.functions:
-                func = self.functions[func_id]
-
-                # Save context
-                self.context_stack.append(self.context)
-                self.context = Context(args=call_args)
-
-                # Execute function
-                self.execute_block(func.body)
-
-                # Get return value
-                return_val = self.context.return_value
-
-                # Restore context
-                self.context = self.context_stack.pop()
-
-                # Store result
-                self.assign(result_var, return_val)
+                self.assign(result_var, self.call_function(func_id, call_args))
 
         elif op == '^':
             # Return: ^ value
@@ -275,7 +808,10 @@ class SuiInterpreter:
         elif op == '[':
             # Array create: [ var size
             size = int(self.resolve(tokens[2]))
-            self.assign(tokens[1], [0] * size)
+            self.array_cells += max(size, 0)
+            if self.array_cells > self.cell_cap:
+                raise ArrayLimitExceeded('array_cells', self.limits.array_cells)
+            self.assign(tokens[1], SparseArray(size) if size >= SPARSE_MIN_SIZE else new_array(size))
 
         elif op == ']':
             # Array read: ] result arr idx
@@ -288,29 +824,89 @@ class SuiInterpreter:
             if len(tokens) >= 4:
                 arr = self.resolve(tokens[1])
                 idx = int(self.resolve(tokens[2]))
-                if isinstance(arr, list) and idx < len(arr):
-                    arr[idx] = self.resolve(tokens[3])
+                if isinstance(arr, ARRAY_TYPES) and idx < len(arr):
+                    self.store(arr, idx, self.resolve(tokens[3]))
 
         elif op == '.':
             # Output: . value
-            val = self.resolve(tokens[1])
-            self.output.append(val)
-            print(val)
+            self.output_count += 1
+            if self.output_count > self.output_cap:
+                raise OutputLimitExceeded('output', self.limits.output)
+            self.sink.write(to_plain(self.resolve(tokens[1])))
 
         elif op == ',':
             # Input: , var
-            val = input()
-            try:
-                val = int(val)
-            except ValueError:
-                try:
-                    val = float(val)
-                except ValueError:
-                    pass
-            self.assign(tokens[1], val)
+            self.sink.flush()
+            self.assign(tokens[1], self.source.read())
 
         return True, None
 
+    def store(self, arr: list | array, idx: int, value: Any):
+        """Write arr[idx], promoting typed storage to a list when the value doesn't fit"""
+        if type(arr) is list:
+            arr[idx] = value
+            return
+        if type(arr) is SparseArray:
+            arr[idx] = value
+            if arr.dense_ready():
+                self.replace_array(arr, arr.to_dense())
+            return
+        if type(value) is ARRAY_TYPECODES[typecode(arr)]:
+            try:
+                arr[idx] = value
+                return
+            except (OverflowError, ValueError):
+                pass
+        promoted = arr.tolist()
+        promoted[idx] = value
+        self.replace_array(arr, promoted)
+
+    def replace_array(self, old: array | SparseArray, new: array | list):
+        """Point every variable and list element holding `old` at `new`"""
+        contexts = self.context_stack + [self.context]
+        pending: list = [self.global_vars] + [c.local_vars for c in contexts] + [c.args for c in contexts]
+        seen: set[int] = set()
+        while pending:
+            container = pending.pop()
+            if id(container) in seen:
+                continue
+            seen.add(id(container))
+            items = container.items() if isinstance(container, dict) else enumerate(container)
+            for key, value in list(items):
+                if value is old:
+                    container[key] = new
+                elif type(value) is list:
+                    pending.append(value)
+                elif type(value) is SparseArray:
+                    pending += [chunk for chunk in value.chunks.values() if type(chunk) is list]
+        for c in contexts:
+            if c.return_value is old:
+                c.return_value = new
+
+    def call_function(self, func_id: int, call_args: list) -> Any:
+        """Call a defined function and return its return value"""
+        func = self.functions[func_id]
+        if len(self.context_stack) >= self.depth_cap:
+            raise DepthLimitExceeded('depth', self.limits.depth)
+        # Callers' steps are added when their blocks end, but each has run at least its `$`
+        if self.steps + len(self.context_stack) > self.step_cap:
+            self._past_step_cap(self.steps + len(self.context_stack))
+
+        # Save context
+        self.context_stack.append(self.context)
+        self.context = Context(args=call_args)
+
+        # Execute function
+        self.execute_block(func.body)
+
+        # Get return value
+        return_val = self.context.return_value
+
+        # Restore context
+        self.context = self.context_stack.pop()
+
+        return return_val
+
     def execute_block(self, lines: list[list[str]]):
         """Execute a block of instructions"""
         # Collect label positions
@@ -318,32 +914,357 @@ class SuiInterpreter:
         for i, tokens in enumerate(lines):
             if tokens and tokens[0] == ':':
                 labels[int(tokens[1])] = i
+        loops = self.find_counted_loops(lines, labels) if labels else {}
 
         i = 0
-        while i < len(lines):
-            if self.context.returned:
-                break
-
-            cont, jump_label = self.execute_line(lines[i])
-
-            if not cont:
-                break
+        prev = -1
+        steps = 0
+        try:
+            while i < len(lines):
+                if self.context.returned:
+                    break
+
+                # Entering (not looping back into) a counted loop: try it as NumPy first
+                if loops and i in loops and prev != loops[i].end:
+                    self.run_counted_loop(loops[i])
+
+                steps += 1
+                cont, jump_label = self.execute_line(lines[i])
+
+                if not cont:
+                    break
+
+                prev = i
+                if jump_label is not None and jump_label in labels:
+                    i = labels[jump_label]
+                    # Loops need a backward jump, so the budget is checked there
+                    if i <= prev:
+                        self.steps += steps
+                        steps = 0
+                        if self.steps > self.step_cap:
+                            self._past_step_cap(self.steps)
+                else:
+                    i += 1
+        finally:
+            self.steps += steps
+
+    def _past_step_cap(self, steps: int):
+        """Steps went past step_cap: the step limit, or a checkpoint for the deadline"""
+        if self.deadline is None or steps > self.step_limit:
+            raise StepLimitExceeded('steps', self.limits.steps)
+        if time.monotonic() > self.deadline:
+            raise TimeLimitExceeded('time', self.timeout)
+        self.step_cap = min(self.step_limit, steps + DEADLINE_CHECK_STEPS)
+
+    def find_counted_loops(self, lines: list[list[str]], labels: dict[int, int]) -> dict[int, CountedLoop]:
+        """Find vectorizable counted loops in a block, keyed by label line (cached per block)"""
+        cached = self.counted_loops.get(id(lines))
+        if cached is not None and cached[0] is lines:
+            return cached[1]
+        loops = {}
+        for label, start in labels.items():
+            loop = self.match_counted_loop(lines, labels, label, start)
+            if loop is not None:
+                loops[start] = loop
+        self.counted_loops[id(lines)] = (lines, loops)
+        return loops
+
+    def match_counted_loop(self, lines: list[list[str]], labels: dict[int, int],
+                           label: int, start: int) -> Optional[CountedLoop]:
+        """Match `: L / exit test / body / + i i 1 / @ L` with no carried dependencies"""
+        end = start + 1
+        while end < len(lines) and lines[end][0] not in (':', '#', '}', '@', '^', '$'):
+            end += 1
+        if end >= len(lines) or lines[end] != ['@', str(label)]:
+            return None
+        block = lines[start + 1:end]
+        if len(block) < 4 or any(len(tokens) < 2 for tokens in block):
+            return None
+
+        # Exit test: `< c i n / ! d c / ? d X`, `~ c i n / ? c X` or `> c i m / ? c X`
+        first = block[0]
+        if len(first) != 4 or first[0] not in ('<', '~', '>'):
+            return None
+        if first[0] == '<':
+            if block[1] != ['!', block[1][1], first[1]] or len(block[2]) != 3 or block[2][:2] != ['?', block[1][1]]:
+                return None
+            header_len = 3
+        else:
+            if len(block[1]) != 3 or block[1][:2] != ['?', first[1]]:
+                return None
+            header_len = 2
+        exit_label = int(block[header_len - 1][2])
+        if exit_label not in labels or start < labels[exit_label] <= end:
+            return None
+        counter, bound = first[2], first[3]
+        if counter[:1] not in ('v', 'g') or block[-1] not in (['+', counter, counter, '1'], ['+', counter, '1', counter]):
+            return None
+
+        header = block[:header_len]
+        body = block[header_len:-1]
+        flags = {tokens[1] for tokens in header if tokens[0] != '?'}
+        writes: dict[str, int] = {}
+        for tokens in body:
+            if tokens[0] not in VECTOR_OPS or (tokens[0] == '{' and len(tokens) != 4):
+                return None
+            if tokens[0] != '{':
+                writes[tokens[1]] = writes.get(tokens[1], 0) + 1
+        if bound in writes or bound in flags or counter in writes or counter in flags:
+            return None
+
+        reductions = set()
+        for tokens in body:
+            acc = tokens[1]
+            if (tokens[0] == '+' and len(tokens) == 4 and acc[:1] in ('v', 'g') and writes[acc] == 1
+                    and (tokens[2] == acc) != (tokens[3] == acc)
+                    and sum(t.count(acc) for t in block) == 2):
+                reductions.add(acc)
+
+        def invariant(token: str) -> bool:
+            return token not in writes and token not in flags and not token.startswith('"')
+
+        defined: set[str] = set()
+        offsets: dict[str, tuple[int, str]] = {}
+        for tokens in body:
+            op = tokens[0]
+            if op in (']', '{'):
+                array, index = (tokens[2], tokens[3]) if op == ']' else (tokens[1], tokens[2])
+                if array[:1] not in ('v', 'g', 'a') or not invariant(array):
+                    return None
+                if index != counter and (index not in offsets or writes[index] != 1):
+                    return None
+                reads = [tokens[3]] if op == '{' else []
+            elif tokens[1] in reductions:
+                reads = [tokens[3] if tokens[2] == tokens[1] else tokens[2]]
+            else:
+                if len(tokens) != (3 if op in ('=', '!') else 4):
+                    return None
+                reads = tokens[2:]
+            for token in reads:
+                if token != counter and not invariant(token) and token not in defined:
+                    return None
+            if op == '{' or tokens[1] in reductions:
+                continue
+            defined.add(tokens[1])
+            if op == '+' and counter in tokens[2:] and tokens[2] != tokens[3]:
+                other = tokens[3] if tokens[2] == counter else tokens[2]
+                if invariant(other):
+                    offsets[tokens[1]] = (1, other)
+            elif op == '-' and tokens[2] == counter and invariant(tokens[3]):
+                offsets[tokens[1]] = (-1, tokens[3])
+
+        if not any(tokens[0] in (']', '{') for tokens in body):
+            return None
+        return CountedLoop(start, end, counter, bound, first[0] == '>', body, reductions, offsets)
+
+    def run_counted_loop(self, loop: CountedLoop) -> bool:
+        """
+        Run all but the last iteration of a counted loop as NumPy operations.
 
-            if jump_label is not None and jump_label in labels:
-                i = labels[jump_label]
+        The scalar loop then runs the final iteration, which leaves every
+        temporary and exit flag with its scalar value. Returns False, having
+        changed nothing, when the values at hand would behave differently
+        (non-numeric data, out of range indexes, int64 overflow, ...).
+        """
+        first = self.resolve(loop.counter)
+        limit = self.resolve(loop.bound)
+        if type(first) is not int or type(limit) is not int:
+            return False
+        count = limit - first + loop.inclusive - 1
+        if count < VECTOR_MIN_TRIPS or max(abs(first), abs(first + count)) >= INT64_LIMIT:
+            return False
+        if self.steps + count * (loop.end - loop.start + 1) > self.step_limit:
+            # Let the scalar loop stop at the budget
+            return False
+        np = _numpy()
+        if np is None:
+            return False
+        try:
+            stores, sums = self._vectorize(np, loop, first, count)
+        except _VectorFallback:
+            return False
+
+        for target, lo, values in stores:
+            hi = lo + len(values)
+            if type(target) is list:
+                target[lo:hi] = values.tolist()
+            elif values.dtype == (np.int64 if typecode(target) == 'q' else np.float64):
+                np.frombuffer(target, dtype=values.dtype)[lo:hi] = values
             else:
-                i += 1
+                promoted = target.tolist()
+                promoted[lo:hi] = values.tolist()
+                self.replace_array(target, promoted)
+        for acc, total in sums.items():
+            self.assign(acc, total)
+        self.assign(loop.counter, first + count)
+        self.vectorized_loops += 1
+        self.steps += count * (loop.end - loop.start + 1)
+        return True
+
+    def _vectorize(self, np, loop: CountedLoop, first: int, count: int) -> tuple[list, dict]:
+        """Evaluate a counted loop body over all iterations at once without side effects"""
+        # Values are (scalar or vector, bound) where bound is the largest
+        # magnitude an int can reach, or None for floats
+        values: dict[str, tuple] = {
+            loop.counter: (np.arange(first, first + count, dtype=np.int64), max(abs(first), abs(first + count)))
+        }
+        arrays: dict[int, dict] = {}
+
+        def operand(token: str) -> tuple:
+            if token in values:
+                return values[token]
+            value = self.resolve(token)
+            if type(value) is int and abs(value) < INT64_LIMIT:
+                return value, abs(value)
+            if type(value) is float:
+                return value, None
+            raise _VectorFallback
+
+        def access(array_token: str, index_token: str) -> tuple[dict, slice]:
+            target = self.resolve(array_token)
+            if type(target) not in ARRAY_TYPES:
+                raise _VectorFallback
+            if type(target) is SparseArray:
+                # Worth vectorizing only if the loop covers most of it anyway
+                if count * 2 < len(target):
+                    raise _VectorFallback
+                dense = target.to_dense()
+                self.replace_array(target, dense)
+                target = dense
+            offset = 0
+            if index_token != loop.counter:
+                sign, amount = loop.offsets[index_token]
+                amount = self.resolve(amount)
+                if type(amount) is not int:
+                    raise _VectorFallback
+                offset = sign * amount
+            lo = first + offset
+            if lo < 0 or lo + count > len(target):
+                raise _VectorFallback
+            entry = arrays.get(id(target))
+            if entry is None:
+                try:
+                    data = np.array(target)
+                except ValueError:
+                    raise _VectorFallback
+                if data.dtype == np.int64:
+                    bound = max(abs(int(data.max())), abs(int(data.min())))
+                elif data.dtype == np.float64 and (type(target) is not list or all(type(x) is float for x in target)):
+                    bound = None
+                else:
+                    raise _VectorFallback
+                entry = arrays[id(target)] = {"list": target, "data": data, "bound": bound,
+                                              "offsets": set(), "stored": False}
+            entry["offsets"].add(offset)
+            return entry, slice(lo, lo + count)
+
+        def check(bound):
+            if bound is not None and bound >= INT64_LIMIT:
+                raise _VectorFallback
+            return bound
+
+        for tokens in loop.body:
+            op = tokens[0]
+            if op == ']':
+                entry, positions = access(tokens[2], tokens[3])
+                values[tokens[1]] = (entry["data"][positions].copy(), entry["bound"])
+            elif op == '{':
+                entry, positions = access(tokens[1], tokens[2])
+                value, bound = operand(tokens[3])
+                if bound is None and entry["bound"] is not None and not entry["stored"]:
+                    # Floats into a fresh int array (e.g. from `[`): the stored range becomes float
+                    entry["data"] = entry["data"].astype(np.float64)
+                    entry["bound"] = None
+                elif (bound is None) != (entry["bound"] is None):
+                    raise _VectorFallback
+                entry["data"][positions] = value
+                if bound is not None:
+                    entry["bound"] = max(entry["bound"], bound)
+                entry["stored"] = True
+            elif tokens[1] in loop.reductions:
+                other = tokens[3] if tokens[2] == tokens[1] else tokens[2]
+                values[tokens[1]] = operand(other)
+            elif op == '=':
+                values[tokens[1]] = operand(tokens[2])
+            elif op == '!':
+                value, _ = operand(tokens[2])
+                values[tokens[1]] = (np.equal(value, 0).astype(np.int64), 1)
+            else:
+                a, a_bound = operand(tokens[2])
+                b, b_bound = operand(tokens[3])
+                if (a_bound is None) != (b_bound is None):
+                    # Python compares and converts ints to float exactly; NumPy only below 2**53
+                    if max(a_bound or 0, b_bound or 0) >= FLOAT_EXACT_LIMIT:
+                        raise _VectorFallback
+                is_float = a_bound is None or b_bound is None
+                if op == '+':
+                    values[tokens[1]] = (np.add(a, b), None if is_float else check(a_bound + b_bound))
+                elif op == '-':
+                    values[tokens[1]] = (np.subtract(a, b), None if is_float else check(a_bound + b_bound))
+                elif op == '*':
+                    values[tokens[1]] = (np.multiply(a, b), None if is_float else check(a_bound * b_bound))
+                elif op in ('/', '%'):
+                    if not np.all(b != 0):
+                        raise _VectorFallback
+                    if op == '/':
+                        # Exact int to float conversion keeps true division correctly rounded
+                        if max(a_bound or 0, b_bound or 0) >= FLOAT_EXACT_LIMIT:
+                            raise _VectorFallback
+                        values[tokens[1]] = (np.true_divide(a, b), None)
+                    elif is_float:
+                        raise _VectorFallback
+                    else:
+                        # np.mod takes the divisor's sign like Python
+                        values[tokens[1]] = (np.mod(a, b), b_bound)
+                else:
+                    compare = {'<': np.less, '>': np.greater, '~': np.equal,
+                               '&': np.logical_and, '|': np.logical_or}[op]
+                    values[tokens[1]] = (compare(a, b).astype(np.int64), 1)
+
+        stores = []
+        for entry in arrays.values():
+            if entry["stored"]:
+                # Reading a stored array at another offset would depend on iteration order
+                if len(entry["offsets"]) != 1:
+                    raise _VectorFallback
+                lo = first + next(iter(entry["offsets"]))
+                stores.append((entry["list"], lo, entry["data"][lo:lo + count]))
+
+        sums = {}
+        for acc in loop.reductions:
+            start = self.resolve(acc)
+            value, bound = values[acc]
+            terms = np.broadcast_to(value, (count,))
+            if type(start) is int and bound is not None and abs(start) + count * bound < INT64_LIMIT:
+                sums[acc] = start + int(terms.sum())
+            elif type(start) in (int, float):
+                # Float sums keep the interpreter's left-to-right rounding
+                for term in terms.tolist():
+                    start += term
+                sums[acc] = start
+            else:
+                raise _VectorFallback
+        return stores, sums
 
-    def run(self, code: str, args: list = None) -> list:
+    def run(self, code: str, args: list = None, arrays: Optional[dict[str, Any]] = None) -> list:
         """
         Execute code
         args: Command-line arguments (accessible as g100=argc, g101=argv[0], ...)
+        arrays: Initial variables, e.g. {'g5': 'data.i64'}; paths are mapped with map_array
+        Returns the values the output sink keeps (all of them by default)
         """
-        self.output = []
+        self.sink.clear()
         self.global_vars = {}
         self.functions = {}
         self.context = Context()
         self.context_stack = []
+        self.counted_loops = {}
+        self.steps = 0
+        self.array_cells = 0
+        self.output_count = 0
+        if self.timeout is not None:
+            self.deadline = time.monotonic() + self.timeout
+            self.step_cap = min(self.step_limit, DEADLINE_CHECK_STEPS)
 
         # Set command-line arguments as global variables
         # g100 = argc (number of arguments)
@@ -361,32 +1282,56 @@ class SuiInterpreter:
         else:
             self.global_vars[100] = 0
 
+        for var, value in (arrays or {}).items():
+            self.assign(var, map_array(value) if isinstance(value, str) else value)
+
         lines = self.parse(code)
 
+        key = None
+        sink = self.sink
+        if self.cache is not None and not arrays and not any(tokens[0] == ',' for tokens in lines):
+            try:
+                key = self.cache.key(lines, args=args, limits=self.limits)
+            except ValueError:
+                pass
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None and cached.get("status") == "ok":
+                for value in cached["output"]:
+                    sink.write(value)
+                sink.flush()
+                self.steps = cached["steps"]
+                return sink.getvalue()
+            # Keep every value for the cache whatever the sink keeps
+            tee = self.sink = CaptureSink(forward=sink)
+        start = time.perf_counter()
+
         # Collect function definitions
         self.collect_functions(lines)
 
         # Execute non-function code
-        main_lines = []
-        i = 0
-        while i < len(lines):
-            if lines[i][0] == '#':
-                # Skip function definition
-                depth = 1
-                i += 1
-                while i < len(lines) and depth > 0:
-                    if lines[i][0] == '#' and len(lines[i]) > 3 and lines[i][-1] == '{':
-                        depth += 1
-                    elif lines[i][0] == '}':
-                        depth -= 1
-                    i += 1
-            else:
-                main_lines.append(lines[i])
-                i += 1
-
-        self.execute_block(main_lines)
-
-        return self.output
+        try:
+            self.execute_block(self.extract_main(lines))
+        finally:
+            self.sink.flush()
+            self.sink = sink
+
+        if key is not None:
+            self.cache.put(key, {"status": "ok", "error": None, "elapsed": round(time.perf_counter() - start, 6),
+                                 "steps": self.steps, "output": tee.values})
+        return sink.getvalue()
+
+    @property
+    def output(self) -> list:
+        """Values kept by the output sink"""
+        return self.sink.getvalue()
+
+    def dump_array(self, var: str, path: str):
+        """Write array variable `var` to a binary file (see write_array)"""
+        value = self.resolve(var)
+        if not isinstance(value, ARRAY_TYPES):
+            raise RuntimeError(f"{var} is not an array")
+        write_array(value, path)
 
 
     def run_snippet(self, code: str) -> list:
@@ -394,7 +1339,7 @@ class SuiInterpreter:
         Execute code without resetting interpreter/global state (for REPL use).
         """
         # Keep vars/functions as-is, but clear transient state
-        self.output = []
+        self.sink.clear()
         self.context.returned = False
         self.context.return_value = None
         self.context_stack = []
@@ -405,24 +1350,11 @@ class SuiInterpreter:
         self.collect_functions(lines)
 
         # Execute non-function code
-        main_lines = []
-        i = 0
-        while i < len(lines):
-            if lines[i][0] == '#':
-                depth = 1
-                i += 1
-                while i < len(lines) and depth > 0:
-                    if lines[i][0] == '#' and len(lines[i]) > 3 and lines[i][-1] == '{':
-                        depth += 1
-                    elif lines[i][0] == '}':
-                        depth -= 1
-                    i += 1
-            else:
-                main_lines.append(lines[i])
-                i += 1
-
-        self.execute_block(main_lines)
-        return self.output
+        try:
+            self.execute_block(self.extract_main(lines))
+        finally:
+            self.sink.flush()
+        return self.sink.getvalue()
 
 
 def validate_line(line: str) -> tuple[bool, str]:
@@ -472,6 +1404,531 @@ def validate_line(line: str) -> tuple[bool, str]:
     return True, ""
 
 
+# Backends for `sui run`, and the features each compiled one can't run the
+# way the interpreter does
+BACKENDS = ('auto', 'interp', 'py', 'wasm', 'tiered')
+WASM_UNSUPPORTED = {
+    'float': "float values",
+    'division': "'/' (true division)",
+    'modulo': "'%' (Python sign rules)",
+    'string_ops': "string values beyond printing",
+    'input': "',' input (may be text)",
+    'text_args': "non-integer arguments",
+    'dynamic_call': "calls to undefined functions",
+    'logic': "'&'/'|' (logical, Wasm is bitwise)",
+    'array_values': "arrays printed, compared or tested (Wasm sees a pointer)",
+    'implicit_return': "functions that can end without '^' (None in the interpreter)",
+    'wide_literal': "integer literals outside i32",
+    'mixed_types': "variables holding both strings and numbers",
+}
+PY_UNSUPPORTED = {
+    'spaced_string': "string literals containing spaces",
+    'global_write': "functions assigning globals",
+    'float_args': "float arguments",
+}
+
+
+def canonical_lines(lines: list[list[str]]) -> list[list[str]]:
+    """
+    Renumber densely in order of first use: locals and labels separately for
+    the main code and each top-level function (a nested definition shares its
+    parent's numbering, since the parent's label table spans it), globals below
+    g100 (argv slots stay), and function IDs unless a call takes its ID from a variable
+    """
+    dynamic_calls = any(tokens[0] == '$' and len(tokens) > 2 and not tokens[2].isdigit() for tokens in lines)
+    functions: dict[int, str] = {}
+    global_vars: dict[int, str] = {}
+    labels: dict[int, str] = {}
+    local_vars: dict[int, str] = {}
+    outer: tuple = ({}, {})
+    depth = 0
+    result = []
+    for tokens in lines:
+        op = tokens[0]
+        if op == '#' and tokens[-1] == '{':
+            if depth == 0:
+                outer = (labels, local_vars)
+                labels, local_vars = {}, {}
+            depth += 1
+        renamed = []
+        for token in tokens:
+            if token[1:].isdigit() and token[0] in 'vg':
+                idx = int(token[1:])
+                if token[0] == 'v':
+                    token = local_vars.setdefault(idx, f"v{len(local_vars)}")
+                elif idx < 100:
+                    token = global_vars.setdefault(idx, f"g{len(global_vars)}")
+            renamed.append(token)
+        label_at = 2 if op == '?' else 1 if op in (':', '@') else None
+        if label_at is not None and len(renamed) > label_at:
+            renamed[label_at] = labels.setdefault(int(renamed[label_at]), str(len(labels)))
+        func_at = 1 if op == '#' else 2 if op == '$' else None
+        if not dynamic_calls and func_at is not None and len(renamed) > func_at:
+            renamed[func_at] = functions.setdefault(int(renamed[func_at]), str(len(functions)))
+        result.append(renamed)
+        if op == '}' and depth > 0:
+            depth -= 1
+            if depth == 0:
+                labels, local_vars = outer
+    return result
+
+
+def canonicalize(code: str) -> str:
+    """
+    The same program with comments and extra whitespace removed and locals,
+    globals, labels and functions renumbered (see canonical_lines).
+    Raises ValueError for a label or function ID that isn't an integer.
+    """
+    lines = SuiInterpreter(output='null').parse(code)
+    return '\n'.join(' '.join(tokens) for tokens in canonical_lines(lines)) + '\n'
+
+
+def count_tokens(text: str) -> tuple[int, str]:
+    """LLM tokens in text with tiktoken (cl100k_base) if it is installed, else Sui tokens"""
+    if importlib.util.find_spec('tiktoken') is not None:
+        try:
+            import tiktoken
+            return len(tiktoken.get_encoding('cl100k_base').encode(text)), "cl100k_base tokens"
+        except Exception:
+            # The encoding is downloaded on first use, which can fail offline
+            pass
+    interp = SuiInterpreter(output='null')
+    return sum(len(interp._tokenize_line(line)) for line in text.split('\n')), "Sui tokens"
+
+
+def _is_number(token: str) -> bool:
+    try:
+        float(token)
+        return True
+    except ValueError:
+        return False
+
+
+# Operand positions that may hold an array without reading it as a value
+ARRAY_OPERANDS = {'=': (2,), ']': (2,), '{': (1,), '^': (1,)}
+
+
+def array_vars(lines: list[list[str]], functions: dict, known: Iterable[str] = ()) -> set[str]:
+    """
+    Variables that may hold an array: `[` results and `known` ones, plus what
+    they are copied, passed or returned into (names are shared across functions)
+    """
+    found = set(known)
+    returns_array = set()
+    changed = True
+    while changed:
+        size = len(found), len(returns_array)
+        for tokens in lines:
+            op = tokens[0]
+            if op == '[' or (op == '=' and len(tokens) > 2 and tokens[2] in found):
+                found.add(tokens[1])
+            elif op == '$' and len(tokens) > 2 and tokens[2].isdigit():
+                if int(tokens[2]) in returns_array:
+                    found.add(tokens[1])
+                found.update(f"a{i}" for i, arg in enumerate(tokens[3:]) if arg in found)
+        for fid, func in functions.items():
+            if any(t[0] == '^' and len(t) > 1 and t[1] in found for t in func.body):
+                returns_array.add(fid)
+        changed = (len(found), len(returns_array)) != size
+    return found
+
+
+def program_features(code: str, args: Optional[list] = None, arrays: Iterable[str] = ()) -> set[str]:
+    """
+    Statically collect the language features a program (and its arguments) uses;
+    `arrays` names globals loaded from array files
+    """
+    from sui2wasm import Sui2WatTranspiler
+
+    interp = SuiInterpreter()
+    lines = interp.parse(code)
+    interp.collect_functions(lines)
+    blocks = [func.body for func in interp.functions.values()] + [interp.extract_main(lines)]
+    features = set()
+
+    for tokens in lines:
+        op = tokens[0]
+        if op == '/':
+            features.add('division')
+        elif op == '%':
+            features.add('modulo')
+        elif op == ',':
+            features.add('input')
+        elif op in ('&', '|'):
+            features.add('logic')
+        elif op == '$' and (len(tokens) < 3 or not tokens[2].isdigit()
+                            or int(tokens[2]) not in interp.functions):
+            features.add('dynamic_call')
+        for token in tokens[1:]:
+            if token.startswith('"'):
+                features.add('string')
+                if any(c in token for c in ' \t'):
+                    features.add('spaced_string')
+            elif '.' in token and _is_number(token):
+                features.add('float')
+            elif token.lstrip('-').isdigit() and not -2 ** 31 <= int(token) < 2 ** 31:
+                features.add('wide_literal')
+
+    # Strings are fine in Wasm as long as they are only assigned and printed
+    transpiler = Sui2WatTranspiler()
+    string_vars = transpiler.infer_string_vars(lines)
+    for tokens in lines:
+        if tokens[0] not in ('=', '.') and any(t.startswith('"') or t in string_vars for t in tokens[1:]):
+            features.add('string_ops')
+    if transpiler.string_reachable_vars(lines) - string_vars:
+        features.add('mixed_types')
+
+    # An array in Wasm is an i32 pointer, so only indexing and passing it around match
+    may_be_array = array_vars(lines, interp.functions, arrays)
+    for tokens in lines:
+        op = tokens[0]
+        if op in ('#', ':', '@', '}'):
+            continue
+        first = 3 if op == '$' else 2 if op in RESULT_TARGET_OPS else 1
+        allowed = range(3, len(tokens)) if op == '$' else ARRAY_OPERANDS.get(op, ())
+        if any(tokens[i] in may_be_array and i not in allowed for i in range(first, len(tokens))):
+            features.add('array_values')
+
+    # A function that runs off its end returns None in the interpreter and 0 in Wasm
+    for func in interp.functions.values():
+        if not func.body or func.body[-1][0] not in ('^', '@'):
+            features.add('implicit_return')
+
+    for block in blocks:
+        labels = {}
+        for i, tokens in enumerate(block):
+            if tokens[0] == ':':
+                labels.setdefault(tokens[1], i)
+        for i, tokens in enumerate(block):
+            if tokens[0] in ('@', '?') and labels.get(tokens[-1], i + 1) <= i:
+                features.add('loop')
+
+    for func in interp.functions.values():
+        if any(t[0] in RESULT_TARGET_OPS and len(t) > 1 and t[1].startswith('g') for t in func.body):
+            features.add('global_write')
+
+    # A cycle in the call graph means recursion
+    calls = {fid: {int(t[2]) for t in func.body if t[0] == '$' and len(t) > 2 and t[2].isdigit()}
+             for fid, func in interp.functions.items()}
+    for start in calls:
+        pending, seen = list(calls[start]), set()
+        while pending:
+            fid = pending.pop()
+            if fid == start:
+                features.add('recursion')
+                break
+            if fid not in seen:
+                seen.add(fid)
+                pending += calls.get(fid, ())
+
+    uses_args = any(t.startswith('g') and t[1:].isdigit() and int(t[1:]) > 100
+                    for tokens in lines for t in tokens[1:])
+    for arg in (args or []) if uses_args else []:
+        arg = str(arg)
+        if arg.lstrip('-').isdigit():
+            if not -2 ** 31 <= int(arg) < 2 ** 31:
+                features.add('text_args')
+        elif _is_number(arg):
+            features.update(('text_args', 'float_args'))
+        else:
+            features.add('text_args')
+    return features
+
+
+def select_backend(code: str, args: Optional[list] = None,
+                   wasm_available: bool = True, arrays: Iterable[str] = ()) -> tuple[str, str]:
+    """
+    Pick the fastest backend that supports every feature the program uses.
+    Wasm is picked for integer programs whose only remaining difference is
+    i32 overflow or array bounds; run it with run_backend(..., fallback=True)
+    so those cases rerun on the interpreter.
+    Returns: (backend, reason)
+    """
+    features = program_features(code, args, arrays)
+    if not features & {'loop', 'recursion'}:
+        return 'interp', "no loops or recursion to amortize compilation"
+
+    wasm_blockers = [WASM_UNSUPPORTED[f] for f in sorted(features) if f in WASM_UNSUPPORTED]
+    if not wasm_blockers and wasm_available:
+        return 'wasm', "integer program with loops or recursion; reruns on the interpreter past i32"
+    skipped = "wasm: " + (", ".join(wasm_blockers) if wasm_blockers else "wasmtime not installed")
+
+    py_blockers = [PY_UNSUPPORTED[f] for f in sorted(features) if f in PY_UNSUPPORTED]
+    if not py_blockers:
+        return 'py', f"loops or recursion; skipped {skipped}"
+    return 'interp', f"skipped {skipped}; py: {', '.join(py_blockers)}"
+
+
+def arrays_fit_wasm(arrays: dict[str, str], dumps: dict[str, str]) -> bool:
+    """Whether array files can be passed to Wasm (i32 globals, dumps of loaded arrays only)"""
+    if any(var[0] != 'g' for var in arrays) or not set(dumps) <= set(arrays):
+        return False
+    for path in arrays.values():
+        if file_typecode(path) != 'q':
+            return False
+        data = map_array(path)
+        if len(data) and not -2 ** 31 <= min(data) <= max(data) < 2 ** 31:
+            return False
+    return True
+
+
+# Backends that enforce Limits, and the `sui run` option for each Limits field
+LIMITED_BACKENDS = ('interp', 'py')
+LIMIT_OPTIONS = {
+    '--max-steps=': 'steps',
+    '--max-cells=': 'array_cells',
+    '--max-depth=': 'depth',
+    '--max-output=': 'output',
+}
+
+
+def run_backend(code: str, backend: str, args: Optional[list] = None,
+                arrays: Optional[dict[str, str]] = None, dumps: Optional[dict[str, str]] = None,
+                output: str = 'stdout', limits: Optional[Limits] = None, fallback: bool = False):
+    """
+    Run a program on the given backend (not 'auto'), loading and dumping array
+    files; values kept by the output sink (e.g. ring:N) are printed at the end.
+    With fallback, Wasm runs checked and its output is held back; if it traps
+    (i32 overflow, a bad array index, a deep recursion) or the module doesn't
+    compile, the interpreter runs the program from the start instead.
+    """
+    args = [str(a) for a in args or []]
+    kept: list = []
+    if limits is not None and backend not in LIMITED_BACKENDS:
+        raise RuntimeError("--max-* limits need the interp or py backend")
+    if backend == 'py':
+        if arrays or dumps:
+            raise RuntimeError("--array/--dump need the interp, tiered or wasm backend")
+        if output != 'stdout':
+            raise RuntimeError("--output needs the interp, tiered or wasm backend")
+        from sui2py import Sui2PyTranspiler
+        python_code = Sui2PyTranspiler(limits).transpile(code)
+        old_argv = sys.argv
+        sys.argv = ['sui'] + args
+        try:
+            exec(python_code, {'__name__': '__main__'})
+        finally:
+            sys.argv = old_argv
+    elif backend == 'wasm' and fallback:
+        from suiwasm import SuiWasmRuntime, Trap, WasmtimeError
+        try:
+            _, values = SuiWasmRuntime(output='capture').run(code, args=args, arrays=arrays, dumps=dumps, checked=True)
+        except (Trap, WasmtimeError, RuntimeError):
+            return run_backend(code, 'interp', args, arrays, dumps, output, limits)
+        sink = make_sink(output)
+        for value in values:
+            sink.write(value)
+        sink.flush()
+        kept = sink.getvalue()
+    elif backend == 'wasm':
+        from suiwasm import SuiWasmRuntime
+        _, kept = SuiWasmRuntime(output=output).run(code, args=args, arrays=arrays, dumps=dumps)
+    else:
+        if backend == 'tiered':
+            from suiwasm import SuiTieredRuntime
+            interp = SuiTieredRuntime(output=output)
+        else:
+            interp = SuiInterpreter(output=output, limits=limits)
+        kept = interp.run(code, args=args, arrays=arrays)
+        for var, path in (dumps or {}).items():
+            interp.dump_array(var, path)
+    for value in kept:
+        print(value)
+
+
+# Python syntax @jit hands to py2sui; anything else runs as plain Python
+JIT_NODES = (
+    ast.FunctionDef, ast.arguments, ast.arg, ast.Return, ast.Assign, ast.AugAssign,
+    ast.If, ast.While, ast.For, ast.Pass, ast.Compare, ast.BoolOp, ast.UnaryOp, ast.BinOp,
+    ast.Name, ast.Load, ast.Store, ast.Constant, ast.Call,
+    ast.And, ast.Or, ast.Not, ast.USub, ast.UAdd, ast.Add, ast.Sub, ast.Mult,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+)
+
+# Compiled modules by SHA-256 of the function source: (sui_code, module, fallback_reason, returns_bool)
+_jit_cache: dict[str, tuple] = {}
+_jit_runtime = None
+
+
+def _always_returns(body: list) -> bool:
+    """Whether every path through a block ends in a return"""
+    if not body:
+        return False
+    last = body[-1]
+    if isinstance(last, ast.Return):
+        return True
+    return isinstance(last, ast.If) and _always_returns(last.body) and _always_returns(last.orelse)
+
+
+def _jit_is_bool(node: ast.AST, func_def: ast.FunctionDef, returns_bool: bool) -> bool:
+    """Whether an expression evaluates to a Python bool (Sui only has 1/0)"""
+    if isinstance(node, ast.Call):
+        return returns_bool and isinstance(node.func, ast.Name) and node.func.id == func_def.name
+    return (isinstance(node, ast.Compare) or (isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not))
+            or (isinstance(node, ast.Constant) and type(node.value) is bool))
+
+
+def _jit_returns_bool(func_def: ast.FunctionDef) -> Optional[bool]:
+    """Whether every return gives a bool (False: none does), or None when they are mixed"""
+    kinds = {_jit_is_bool(node.value, func_def, False) for node in ast.walk(func_def)
+             if isinstance(node, ast.Return) and node.value is not None
+             and not (isinstance(node.value, ast.Call) and isinstance(node.value.func, ast.Name)
+                      and node.value.func.id == func_def.name)}
+    return None if len(kinds) > 1 else kinds == {True}
+
+
+def _jit_loop_unsupported(func_def: ast.FunctionDef) -> Optional[str]:
+    """Why a range() loop wouldn't keep Python's semantics once lowered, or None"""
+    loops = [node for node in ast.walk(func_def) if isinstance(node, ast.For)]
+    for loop in loops:
+        if not (isinstance(loop.iter, ast.Call) and isinstance(loop.iter.func, ast.Name)
+                and loop.iter.func.id == 'range' and 1 <= len(loop.iter.args) <= 2
+                and isinstance(loop.target, ast.Name)):
+            return "only range(end) and range(start, end) loops are supported"
+        # py2sui re-reads the bound and counts with the target itself, so both must stay put
+        fixed = {loop.target.id} | {node.id for arg in loop.iter.args for node in ast.walk(arg)
+                                    if isinstance(node, ast.Name)}
+        for stmt in loop.body:
+            for node in ast.walk(stmt):
+                if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store) and node.id in fixed:
+                    return f"'{node.id}' is assigned inside a range() loop that depends on it"
+    # After the loop the target holds the end, not Python's last value
+    inside = {id(node) for loop in loops for stmt in loop.body for node in ast.walk(stmt)}
+    targets = {loop.target.id for loop in loops}
+    for node in ast.walk(func_def):
+        if (isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load) and node.id in targets
+                and id(node) not in inside):
+            return f"loop variable '{node.id}' is read outside its loop"
+    return None
+
+
+def _jit_unsupported(func_def: ast.FunctionDef) -> Optional[str]:
+    """Why a function can't be compiled with identical results, or None if it can"""
+    spec = func_def.args
+    if spec.vararg or spec.kwarg or spec.kwonlyargs or spec.posonlyargs or spec.defaults:
+        return "only plain positional parameters are supported"
+    if not _always_returns(func_def.body):
+        return "every path must return a value"
+    returns_bool = _jit_returns_bool(func_def)
+    if returns_bool is None:
+        return "returns both bools and ints"
+    for node in ast.walk(func_def):
+        # Only a returned bool is converted back; stored or passed on it would become 1/0
+        values = [node.value] if isinstance(node, ast.Assign) else node.args if isinstance(node, ast.Call) else []
+        if any(_jit_is_bool(value, func_def, returns_bool) for value in values):
+            return "bools are only supported as conditions and return values"
+    known = {arg.arg for arg in spec.args}
+    for node in ast.walk(func_def):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+            known.add(node.id)
+    range_calls = {id(node.iter) for node in ast.walk(func_def) if isinstance(node, ast.For)}
+    # `and`/`or` lower to branches in if/while tests; as values they'd become Sui `&`/`|`
+    conditions = set()
+    pending = [node.test for node in ast.walk(func_def) if isinstance(node, (ast.If, ast.While))]
+    while pending:
+        test = pending.pop()
+        if isinstance(test, ast.BoolOp):
+            conditions.add(id(test))
+            pending += test.values
+        elif isinstance(test, ast.UnaryOp) and isinstance(test.op, ast.Not):
+            pending.append(test.operand)
+    for node in ast.walk(func_def):
+        if not isinstance(node, JIT_NODES) or (isinstance(node, ast.FunctionDef) and node is not func_def):
+            return f"unsupported syntax: {type(node).__name__}"
+        if isinstance(node, ast.BoolOp) and id(node) not in conditions:
+            return "'and'/'or' are only supported as if/while conditions"
+        if isinstance(node, (ast.For, ast.While)) and node.orelse:
+            return "loop else clauses are not supported"
+        if isinstance(node, ast.Constant) and type(node.value) not in (int, bool):
+            return f"unsupported constant: {node.value!r}"
+        if isinstance(node, ast.Return) and node.value is None:
+            return "bare return"
+        if isinstance(node, ast.Call):
+            name = node.func.id if isinstance(node.func, ast.Name) else None
+            if node.keywords or not (name == func_def.name or (name == 'range' and id(node) in range_calls)):
+                return "only self-recursive calls and range() loops are supported"
+        elif isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load) and node.id not in known:
+            if node.id != func_def.name and node.id != 'range':
+                return f"reads non-local name '{node.id}'"
+    return _jit_loop_unsupported(func_def)
+
+
+def _jit_compile(source: str) -> tuple:
+    """Lower a function's source to a Wasm module, or explain why it stays Python"""
+    global _jit_runtime
+    func_def = ast.parse(source).body[0]
+    if not isinstance(func_def, ast.FunctionDef):
+        return None, None, "only def functions are supported", False
+    func_def.decorator_list = []
+    reason = _jit_unsupported(func_def)
+    if reason:
+        return None, None, reason, False
+    from py2sui import Py2SuiTranspiler
+    try:
+        sui_code = Py2SuiTranspiler().transpile(ast.unparse(func_def))
+    except (NotImplementedError, SyntaxError) as e:
+        return None, None, str(e), False
+    from suiwasm import TIERED_UNSAFE_OPS, WASMTIME_AVAILABLE, SuiWasmRuntime
+    for line in sui_code.split('\n')[1:-1]:
+        tokens = line.split()
+        if tokens[0] in TIERED_UNSAFE_OPS:
+            return sui_code, None, f"'{tokens[0]}' differs between Python and i32 Wasm", False
+    if not WASMTIME_AVAILABLE:
+        return sui_code, None, "wasmtime is not installed", False
+    if _jit_runtime is None:
+        _jit_runtime = SuiWasmRuntime()
+    module = _jit_runtime.compile_module(_jit_runtime.engine, sui_code, checked=True)
+    return sui_code, module, None, _jit_returns_bool(func_def)
+
+
+def jit(func):
+    """
+    Decorator that runs a small integer Python function as Wasm.
+
+    The source is lowered with py2sui and compiled with sui2wasm. Functions
+    using anything else, and calls whose arguments aren't 32-bit ints, run
+    the original Python. The module is checked, so a call whose arithmetic
+    leaves i32 traps and runs the original Python too.
+    """
+    try:
+        source = textwrap.dedent(inspect.getsource(func))
+        key = hashlib.sha256(source.encode()).hexdigest()
+        if key not in _jit_cache:
+            _jit_cache[key] = _jit_compile(source)
+        sui_code, module, reason, returns_bool = _jit_cache[key]
+    except (OSError, TypeError, IndexError, AttributeError) as e:
+        sui_code, module, reason, returns_bool = None, None, f"source unavailable: {e}", False
+
+    if module is None:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return func(*args, **kwargs)
+    else:
+        from suiwasm import I32_MAX, I32_MIN, Store, Trap, TrapCode
+        store = Store(_jit_runtime.engine)
+        compiled = _jit_runtime.link(_jit_runtime.engine, store, module).exports(store)["f0"]
+        argc = len(compiled.type(store).params)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if kwargs or len(args) != argc or not all(
+                    type(a) is int and I32_MIN <= a <= I32_MAX for a in args):
+                return func(*args, **kwargs)
+            try:
+                result = compiled(store, *args)
+                return bool(result) if returns_bool else result
+            except Trap as e:
+                if e.trap_code == TrapCode.STACK_OVERFLOW:
+                    raise RecursionError(f"maximum recursion depth exceeded in Wasm: {e}") from None
+            # A result left i32; the function is pure, so Python can start over
+            return func(*args)
+
+    wrapper.py_func = func
+    wrapper.sui_code = sui_code
+    wrapper.fallback_reason = reason
+    return wrapper
+
+
 def _print_help():
     print("Sui (粋) - Programming Language for LLMs")
     print("=" * 50)
@@ -479,9 +1936,28 @@ def _print_help():
     print("Usage:")
     print("  sui                 # Start REPL (default when no args)")
     print("  sui <file.sui> [args...]")
+    print("  sui run [--backend=B] [--verbose] <file.sui> [args...]")
+    print("                      # B: auto (default), interp, py, wasm, tiered")
+    print("  sui run --array g5=in.i64 --dump g6=out.i64 <file.sui>")
+    print("                      # Map binary int64 (.f64: float64) files as arrays")
+    print("  sui --output=O <file.sui>")
+    print("                      # O: stdout (default), line, null, ring:N (print last N)")
+    print("  sui --max-steps=N --max-cells=N --max-depth=N --max-output=N <file.sui>")
+    print("                      # Stop with an error past N instructions, array cells,")
+    print("                      # nested calls or printed values (interp and py backends)")
+    print("  sui --backend=tiered <file.sui> [args...]")
+    print("                      # Start interpreting, switch to Wasm once compiled")
+    print("  sui batch <jobs.jsonl|-> [-o out.jsonl] [--workers N] [--timeout SEC]")
+    print("                      # Run many programs in parallel, JSONL in and out")
+    print("  sui serve [--port N | --socket PATH] [--workers N] [--isolate]")
+    print("                      # Run programs sent as JSON lines in warm workers")
+    print("  sui cache stats|clear|key <file.sui>")
+    print("                      # Inspect the result cache used by sui batch --cache")
     print("  sui --help          # Show this help")
     print("  sui --repl          # Force REPL mode")
     print("  sui --validate <file.sui>")
+    print("  sui --canonicalize <file.sui> [-o out.sui]")
+    print("                      # Strip comments, renumber densely, report savings")
     print("")
     print("Argument access:")
     print("  g100 = argument count (argc)")
@@ -586,6 +2062,89 @@ def main():
             print("✓ Validation successful")
             return
 
+    if args[0] == '--canonicalize':
+        if len(args) < 2:
+            print("Error: no input file", file=sys.stderr)
+            sys.exit(1)
+        with open(args[1], 'r') as f:
+            code = f.read()
+        try:
+            canonical = canonicalize(code)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        if '-o' in args:
+            with open(args[args.index('-o') + 1], 'w') as f:
+                f.write(canonical)
+        else:
+            sys.stdout.write(canonical)
+        before, unit = count_tokens(code)
+        after, _ = count_tokens(canonical)
+        size, new_size = len(code.encode('utf-8')), len(canonical.encode('utf-8'))
+        print(f"✓ {unit}: {before} → {after} ({before - after} saved),"
+              f" bytes: {size} → {new_size} ({size - new_size} saved)", file=sys.stderr)
+        return
+
+    if args[0] == 'batch':
+        import suibatch
+        suibatch.main(args[1:])
+        return
+
+    if args[0] == 'serve':
+        import suiserve
+        suiserve.main(args[1:])
+        return
+
+    if args[0] == 'cache':
+        import suicache
+        suicache.main(args[1:])
+        return
+
+    # `sui run` picks a backend automatically; plain `sui <file>` interprets
+    backend = 'interp'
+    verbose = False
+    if args[0] == 'run':
+        backend = 'auto'
+        args = args[1:]
+    arrays: dict[str, str] = {}
+    dumps: dict[str, str] = {}
+    output = 'stdout'
+    limits: Optional[Limits] = None
+    while args and (args[0] in ('--verbose', '-v', '--array', '--dump')
+                    or args[0].startswith(('--backend=', '--output=') + tuple(LIMIT_OPTIONS))):
+        if args[0].startswith(tuple(LIMIT_OPTIONS)):
+            option, _, value = args[0].partition('=')
+            if not value.isdigit():
+                print(f"Error: {option} expects a non-negative integer", file=sys.stderr)
+                sys.exit(1)
+            limits = limits or Limits()
+            setattr(limits, LIMIT_OPTIONS[option + '='], int(value))
+        elif args[0].startswith('--backend='):
+            backend = args[0].split('=', 1)[1]
+        elif args[0].startswith('--output='):
+            output = args[0].split('=', 1)[1]
+            try:
+                make_sink(output)
+            except ValueError as e:
+                print(f"Error: {e}", file=sys.stderr)
+                sys.exit(1)
+        elif args[0] in ('--array', '--dump'):
+            var, _, path = args[1].partition('=') if len(args) > 1 else ('', '', '')
+            if not path or var[:1] not in ('g', 'v') or not var[1:].isdigit():
+                print(f"Error: {args[0]} expects VAR=FILE, e.g. g5=data.i64", file=sys.stderr)
+                sys.exit(1)
+            (arrays if args[0] == '--array' else dumps)[var] = path
+            args = args[1:]
+        else:
+            verbose = True
+        args = args[1:]
+    if backend not in BACKENDS:
+        print(f"Unknown backend: {backend} (expected {'|'.join(BACKENDS)})", file=sys.stderr)
+        sys.exit(1)
+    if not args:
+        print("Error: no input file", file=sys.stderr)
+        sys.exit(1)
+
     # Unknown option -> fallback to help
     if args[0].startswith('-'):
         print(f"Unknown option: {args[0]}", file=sys.stderr)
@@ -599,8 +2158,32 @@ def main():
     # Pass additional arguments to the program
     program_args = args[1:]
 
-    interp = SuiInterpreter()
-    interp.run(code, args=program_args)
+    wasm_available = importlib.util.find_spec('wasmtime') is not None
+    fallback = backend == 'auto'
+    if backend == 'auto':
+        backend, reason = select_backend(code, program_args, wasm_available, arrays or ())
+        if (arrays or dumps) and backend != 'interp' and not (backend == 'wasm' and arrays_fit_wasm(arrays, dumps)):
+            backend, reason = 'interp', "array files need the interpreter"
+        elif backend == 'py' and output != 'stdout':
+            backend, reason = 'interp', "--output needs the interpreter"
+        elif limits is not None and backend not in LIMITED_BACKENDS:
+            backend, reason = 'interp', "--max-* limits need the interpreter"
+        if verbose:
+            print(f"[sui] backend: {backend} ({reason})", file=sys.stderr)
+    elif verbose:
+        print(f"[sui] backend: {backend}", file=sys.stderr)
+    if backend in ('wasm', 'tiered') and not wasm_available:
+        print(f"Error: wasmtime is required for --backend={backend}", file=sys.stderr)
+        print("Install with: pip install sui-lang[wasm]", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        run_backend(code, backend, program_args, arrays, dumps, output, limits, fallback)
+    except (OSError, RuntimeError) as e:
+        if not (arrays or dumps or output != 'stdout' or limits):
+            raise
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,704 @@
+#!/usr/bin/env python3
+"""
+Sui (粋) to C Compiler
+Compile Sui code to portable C, build it with the system C compiler and
+call the result from Python via ctypes
+"""
+
+import ctypes
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from typing import Any, Optional
+
+def get_version() -> str:
+    """Get package version"""
+    try:
+        from importlib.metadata import version
+        return version("sui-lang")
+    except Exception:
+        return "0.4.1"
+
+
+# Inferred value types: 64-bit integer, double, or heap array
+INT, FLOAT, ARRAY = 'i', 'd', 'a'
+C_TYPES = {INT: 'int64_t', FLOAT: 'double', ARRAY: 'sui_elem_t *'}
+CTYPES_TYPES = {INT: ctypes.c_int64, FLOAT: ctypes.c_double, ARRAY: ctypes.c_void_p}
+
+ARITH_OPS = {'+': '+', '-': '-', '*': '*'}
+COMPARE_OPS = {'<': '<', '>': '>', '~': '=='}
+
+# Runtime support shared by every generated program. Arrays carry their
+# length in the 8 bytes before the first element; reads and writes follow
+# the interpreter (negative indexes count from the end, out of range reads
+# give 0 and out of range writes are ignored).
+RUNTIME = r'''
+#include <math.h>
+#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+static void sui_fail(const char *msg) {
+    fflush(stdout);
+    fprintf(stderr, "Error: %s\n", msg);
+    exit(1);
+}
+
+sui_elem_t *sui_alloc(int64_t n) {
+    if (n < 0) n = 0;
+    int64_t *p = calloc((size_t)n + 1, 8);
+    if (!p) sui_fail("out of memory");
+    p[0] = n;
+    return (sui_elem_t *)(p + 1);
+}
+
+int64_t sui_len(sui_elem_t *a) {
+    return a ? ((int64_t *)a)[-1] : 0;
+}
+
+static inline sui_elem_t sui_get(sui_elem_t *a, int64_t i) {
+    int64_t n = sui_len(a);
+    if (i < 0) i += n;
+    return (i >= 0 && i < n) ? a[i] : 0;
+}
+
+static inline void sui_set(sui_elem_t *a, int64_t i, sui_elem_t v) {
+    int64_t n = sui_len(a);
+    if (i < 0) i += n;
+    if (i >= 0 && i < n) a[i] = v;
+}
+
+static inline int64_t sui_mod(int64_t a, int64_t b) {
+    if (b == 0) sui_fail("integer modulo by zero");
+    int64_t r = a % b;
+    return (r != 0 && ((r < 0) != (b < 0))) ? r + b : r;
+}
+
+static inline double sui_fmod(double a, double b) {
+    if (b == 0) sui_fail("float modulo");
+    double r = fmod(a, b);
+    return (r != 0 && ((r < 0) != (b < 0))) ? r + b : r;
+}
+
+static inline double sui_div(double a, double b) {
+    if (b == 0) sui_fail("division by zero");
+    return a / b;
+}
+
+/* Shortest round-trip formatting, like Python's repr(float) */
+static void sui_format_d(double x, char *buf, size_t size) {
+    if (isnan(x)) { snprintf(buf, size, "nan"); return; }
+    if (isinf(x)) { snprintf(buf, size, x > 0 ? "inf" : "-inf"); return; }
+    int prec = 1;
+    for (; prec < 17; prec++) {
+        snprintf(buf, size, "%.*e", prec - 1, x);
+        if (strtod(buf, NULL) == x) break;
+    }
+    snprintf(buf, size, "%.*e", prec - 1, x);
+    int exp = atoi(strchr(buf, 'e') + 1);
+    if (exp < -4 || exp >= 16) return;
+    int decimals = prec - 1 - exp;
+    snprintf(buf, size, "%.*f", decimals < 1 ? 1 : decimals, x);
+}
+
+static void sui_print_i(int64_t x) { printf("%lld\n", (long long)x); }
+
+static void sui_print_d(double x) {
+    char buf[64];
+    sui_format_d(x, buf, sizeof buf);
+    puts(buf);
+}
+
+static void sui_print_a(sui_elem_t *a) {
+    int64_t n = sui_len(a);
+    putchar('[');
+    for (int64_t i = 0; i < n; i++) {
+        if (i) fputs(", ", stdout);
+#if SUI_FLOAT_ARRAYS
+        char buf[64];
+        sui_format_d(a[i], buf, sizeof buf);
+        fputs(buf, stdout);
+#else
+        printf("%lld", (long long)a[i]);
+#endif
+    }
+    puts("]");
+}
+
+static char *sui_read_line(void) {
+    static char buf[4096];
+    fflush(stdout);
+    if (!fgets(buf, sizeof buf, stdin)) return NULL;
+    return buf;
+}
+
+static int64_t sui_read_i(void) {
+    char *line = sui_read_line();
+    return line ? (int64_t)strtod(line, NULL) : 0;
+}
+
+static double sui_read_d(void) {
+    char *line = sui_read_line();
+    return line ? strtod(line, NULL) : 0;
+}
+'''
+
+
+def find_compiler() -> str:
+    """Return the C compiler command ($CC or cc)"""
+    return os.environ.get('CC', 'cc')
+
+
+class Sui2CTranspiler:
+    """Sui to C transpiler with static int64/double/array type inference"""
+
+    def __init__(self):
+        self.output: list[str] = []
+        self.indent = 0
+        self.functions: dict[int, dict] = {}
+        self.main_lines: list[list[str]] = []
+        self.types: dict[tuple, str] = {}
+        self.nested_arrays = False
+        self.used_globals: set[int] = set()
+
+    def emit(self, line: str):
+        """Emit a line with proper indentation"""
+        self.output.append("    " * self.indent + line)
+
+    def parse_line(self, line: str) -> list[str] | None:
+        """Parse a single line"""
+        if ';' in line:
+            line = line[:line.index(';')]
+        line = line.strip()
+        if not line:
+            return None
+
+        tokens = []
+        i = 0
+        while i < len(line):
+            if line[i] in ' \t':
+                i += 1
+                continue
+            if line[i] == '"':
+                j = i + 1
+                while j < len(line) and line[j] != '"':
+                    if line[j] == '\\':
+                        j += 2
+                    else:
+                        j += 1
+                tokens.append(line[i:j + 1])
+                i = j + 1
+                continue
+            j = i
+            while j < len(line) and line[j] not in ' \t':
+                j += 1
+            tokens.append(line[i:j])
+            i = j
+        return tokens if tokens else None
+
+    # ---- Type inference ----
+
+    def key(self, scope, token: str) -> tuple:
+        """Type-table key of a variable token (globals are shared by all scopes)"""
+        if token.startswith('g'):
+            return ('g', token)
+        return (scope, token)
+
+    def is_var(self, token: str) -> bool:
+        """Check if a token names a variable"""
+        return token[:1] in ('v', 'g', 'a') and token[1:].isdigit()
+
+    def value_type(self, scope, token: str) -> Optional[str]:
+        """Type of an operand, or None if not known yet"""
+        if self.is_var(token):
+            return self.types.get(self.key(scope, token))
+        if token.startswith('"'):
+            raise NotImplementedError("sui2c: strings are only supported as '.' operands")
+        try:
+            if '.' in token:
+                float(token)
+                return FLOAT
+            int(token)
+            return INT
+        except ValueError:
+            raise NotImplementedError(f"sui2c: unsupported operand: {token}")
+
+    def unify(self, key: tuple, new: Optional[str], loose: bool = False) -> bool:
+        """
+        Widen a variable's type to include `new`; returns True if it changed.
+        `loose` lets array pointers pass through integer array elements.
+        """
+        if new is None:
+            return False
+        current = self.types.get(key)
+        if current is None:
+            self.types[key] = new
+            return True
+        if current == new:
+            return False
+        if {current, new} == {INT, FLOAT}:
+            self.types[key] = FLOAT
+            return current == INT
+        if loose and {current, new} == {INT, ARRAY}:
+            self.nested_arrays = True
+            return False
+        raise NotImplementedError(f"sui2c: {key[1]} is used both as an array and a number")
+
+    def infer_block(self, scope, lines: list[list[str]]) -> bool:
+        """Run one inference pass over a block; returns True if any type changed"""
+        changed = False
+        for tokens in lines:
+            op = tokens[0]
+            if op == '=':
+                changed |= self.unify(self.key(scope, tokens[1]), self.value_type(scope, tokens[2]))
+            elif op in ARITH_OPS or op == '%':
+                operands = [self.value_type(scope, t) for t in tokens[2:4]]
+                if ARRAY in operands:
+                    raise NotImplementedError(f"sui2c: arithmetic on an array: {' '.join(tokens)}")
+                changed |= self.unify(self.key(scope, tokens[1]), FLOAT if FLOAT in operands else INT)
+            elif op == '/':
+                changed |= self.unify(self.key(scope, tokens[1]), FLOAT)
+            elif op in COMPARE_OPS or op in ('!', '&', '|'):
+                for t in tokens[2:]:
+                    self.value_type(scope, t)
+                changed |= self.unify(self.key(scope, tokens[1]), INT)
+            elif op == '$':
+                func_id = int(tokens[2])
+                if func_id not in self.functions:
+                    continue
+                for i, arg in enumerate(tokens[3:3 + self.functions[func_id]['argc']]):
+                    changed |= self.unify((func_id, f"a{i}"), self.value_type(scope, arg))
+                changed |= self.unify(self.key(scope, tokens[1]), self.types.get(('ret', func_id)))
+            elif op == '^' and scope is not None:
+                changed |= self.unify(('ret', scope), self.value_type(scope, tokens[1]))
+            elif op == '[':
+                changed |= self.unify(self.key(scope, tokens[1]), ARRAY)
+            elif op == ']':
+                changed |= self.unify(self.key(scope, tokens[2]), ARRAY)
+                changed |= self.unify(self.key(scope, tokens[1]), self.types.get(('elem',)), loose=True)
+            elif op == '{' and len(tokens) >= 4:
+                changed |= self.unify(self.key(scope, tokens[1]), ARRAY)
+                value = self.value_type(scope, tokens[3])
+                changed |= self.unify(('elem',), INT if value == ARRAY else value, loose=True)
+                if value == ARRAY:
+                    self.nested_arrays = True
+            elif op == ',':
+                changed |= self.unify(self.key(scope, tokens[1]), INT)
+            elif op == '.' and not tokens[1].startswith('"'):
+                self.value_type(scope, tokens[1])
+        return changed
+
+    def infer_types(self):
+        """Infer a type for every variable, argument and return value"""
+        self.types = {('g', 'g100'): INT}
+        changed = True
+        while changed:
+            changed = self.infer_block(None, self.main_lines)
+            for func_id, info in self.functions.items():
+                changed |= self.infer_block(func_id, info['body'])
+        if self.nested_arrays and self.types.get(('elem',)) == FLOAT:
+            raise NotImplementedError("sui2c: arrays of arrays can't also hold floats")
+
+    def type_of(self, scope, token: str) -> str:
+        """Resolved type of an operand (unknown variables are integers)"""
+        if self.is_var(token):
+            return self.types.get(self.key(scope, token), INT)
+        return self.value_type(scope, token)
+
+    def signature(self, func_id: int) -> tuple[list[str], str]:
+        """Parameter types and return type of fN"""
+        argc = self.functions[func_id]['argc']
+        params = [self.types.get((func_id, f"a{i}"), INT) for i in range(argc)]
+        return params, self.types.get(('ret', func_id), INT)
+
+    # ---- Code generation ----
+
+    def value(self, scope, token: str, target: Optional[str] = None) -> str:
+        """C expression for an operand, converted to `target` if given"""
+        if self.is_var(token):
+            expr = token
+        elif '.' in token:
+            expr = repr(float(token))
+        else:
+            expr = f"INT64_C({int(token)})"
+        source = self.type_of(scope, token)
+        if target == ARRAY and source != ARRAY:
+            return f"((sui_elem_t *)(intptr_t)({expr}))"
+        if target in (INT, FLOAT) and source == ARRAY:
+            return f"((int64_t)(intptr_t)({expr}))"
+        if target == INT and source == FLOAT:
+            return f"((int64_t)({expr}))"
+        return expr
+
+    def elem_type(self) -> str:
+        """Element type of all arrays in the program"""
+        return FLOAT if self.types.get(('elem',)) == FLOAT else INT
+
+    def transpile_block(self, scope, lines: list[list[str]]):
+        """Transpile a function body or the main block"""
+        # The interpreter jumps to the last definition of a repeated label
+        label_at = {}
+        for i, tokens in enumerate(lines):
+            if tokens[0] == ':':
+                label_at[tokens[1]] = i
+
+        for i, tokens in enumerate(lines):
+            op = tokens[0]
+            target = tokens[1] if len(tokens) > 1 else None
+            dest = self.type_of(scope, target) if target and self.is_var(target) else None
+
+            if op == '=':
+                self.emit(f"{target} = {self.value(scope, tokens[2], dest)};")
+            elif op in ARITH_OPS:
+                a, b = (self.value(scope, t, dest) for t in tokens[2:4])
+                self.emit(f"{target} = {a} {ARITH_OPS[op]} {b};")
+            elif op == '%':
+                func = 'sui_fmod' if dest == FLOAT else 'sui_mod'
+                a, b = (self.value(scope, t, dest) for t in tokens[2:4])
+                self.emit(f"{target} = {func}({a}, {b});")
+            elif op == '/':
+                a, b = (self.value(scope, t, FLOAT) for t in tokens[2:4])
+                self.emit(f"{target} = sui_div({a}, {b});")
+            elif op in COMPARE_OPS:
+                a, b = (self.value(scope, t) for t in tokens[2:4])
+                self.emit(f"{target} = ({a} {COMPARE_OPS[op]} {b});")
+            elif op == '!':
+                self.emit(f"{target} = !({self.value(scope, tokens[2])});")
+            elif op in ('&', '|'):
+                a, b = (self.value(scope, t) for t in tokens[2:4])
+                self.emit(f"{target} = ({a}) {op * 2} ({b});")
+            elif op == '?':
+                if tokens[2] in label_at:
+                    self.emit(f"if ({self.value(scope, tokens[1])}) goto L{tokens[2]};")
+            elif op == '@':
+                if tokens[1] in label_at:
+                    self.emit(f"goto L{tokens[1]};")
+            elif op == ':':
+                if label_at[tokens[1]] == i:
+                    self.emit(f"L{tokens[1]}:;")
+            elif op == '$':
+                func_id = int(tokens[2])
+                if func_id not in self.functions:
+                    self.emit(f"/* f{func_id} is not defined */")
+                    continue
+                params, ret = self.signature(func_id)
+                given = tokens[3:3 + len(params)]
+                args = [self.value(scope, t, p) for t, p in zip(given, params)]
+                args += ["0"] * (len(params) - len(given))
+                call = f"f{func_id}({', '.join(args)})"
+                if ret == ARRAY and dest != ARRAY:
+                    call = f"((int64_t)(intptr_t){call})"
+                elif ret != ARRAY and dest == ARRAY:
+                    call = f"((sui_elem_t *)(intptr_t){call})"
+                self.emit(f"{target} = {call};")
+            elif op == '^':
+                if scope is None:
+                    self.emit("return;")
+                else:
+                    _, ret = self.signature(scope)
+                    self.emit(f"return {self.value(scope, tokens[1], ret)};")
+            elif op == '[':
+                self.emit(f"{target} = sui_alloc((int64_t)({self.value(scope, tokens[2])}));")
+            elif op == ']':
+                index = self.value(scope, tokens[3], INT)
+                read = f"sui_get({self.value(scope, tokens[2])}, {index})"
+                if dest == ARRAY:
+                    read = f"((sui_elem_t *)(intptr_t){read})"
+                self.emit(f"{target} = {read};")
+            elif op == '{':
+                if len(tokens) >= 4:
+                    index = self.value(scope, tokens[2], INT)
+                    val = self.value(scope, tokens[3], self.elem_type())
+                    self.emit(f"sui_set({self.value(scope, tokens[1])}, {index}, {val});")
+            elif op == '.':
+                if target.startswith('"'):
+                    text = target[1:-1].replace('\\', '\\\\').replace('"', '\\"')
+                    self.emit(f'puts("{text}");')
+                else:
+                    kind = self.type_of(scope, target)
+                    self.emit(f"sui_print_{kind}({self.value(scope, target)});")
+            elif op == ',':
+                reader = 'sui_read_d' if dest == FLOAT else 'sui_read_i'
+                self.emit(f"{target} = {reader}();")
+
+    def declare_locals(self, scope, lines: list[list[str]], params: set[str]):
+        """Declare the v/a variables a block uses, zero-initialized"""
+        names = sorted({t for tokens in lines for t in tokens[1:]
+                        if self.is_var(t) and not t.startswith('g') and t not in params},
+                       key=lambda t: (t[0], int(t[1:])))
+        for name in names:
+            kind = self.type_of(scope, name)
+            self.emit(f"{C_TYPES[kind]} {name} = 0;")
+
+    def transpile(self, code: str) -> str:
+        """Transpile Sui code to C"""
+        self.output = []
+        self.functions = {}
+        self.nested_arrays = False
+
+        lines = []
+        for line in code.strip().split('\n'):
+            parsed = self.parse_line(line)
+            if parsed:
+                lines.append(parsed)
+
+        self.main_lines = []
+        i = 0
+        while i < len(lines):
+            if lines[i][0] == '#':
+                func_id = int(lines[i][1])
+                argc = int(lines[i][2])
+                body = []
+                i += 1
+                depth = 1
+                while i < len(lines) and depth > 0:
+                    if lines[i][0] == '#':
+                        depth += 1
+                    elif lines[i][0] == '}':
+                        depth -= 1
+                        if depth == 0:
+                            break
+                    body.append(lines[i])
+                    i += 1
+                self.functions[func_id] = {'argc': argc, 'body': body}
+            else:
+                self.main_lines.append(lines[i])
+            i += 1
+
+        self.infer_types()
+        self.used_globals = {int(t[1:]) for tokens in lines for t in tokens[1:]
+                             if t.startswith('g') and t[1:].isdigit()}
+
+        self.emit("/* Auto-generated from Sui */")
+        if self.elem_type() == FLOAT:
+            self.emit("typedef double sui_elem_t;")
+            self.emit("#define SUI_FLOAT_ARRAYS 1")
+        else:
+            self.emit("typedef long long sui_elem_t;")
+            self.emit("#define SUI_FLOAT_ARRAYS 0")
+        self.output += RUNTIME.strip('\n').split('\n')
+        self.emit("")
+
+        if self.used_globals:
+            self.emit("/* Global variables */")
+            for g in sorted(self.used_globals):
+                self.emit(f"{C_TYPES[self.type_of(None, f'g{g}')]} g{g} = 0;")
+            self.emit("")
+
+        for func_id in sorted(self.functions):
+            self.emit(self.prototype(func_id) + ";")
+        self.emit("")
+
+        for func_id, info in sorted(self.functions.items()):
+            self.emit(self.prototype(func_id) + " {")
+            self.indent += 1
+            self.declare_locals(func_id, info['body'], {f"a{i}" for i in range(info['argc'])})
+            self.transpile_block(func_id, info['body'])
+            self.emit("return 0;")
+            self.indent -= 1
+            self.emit("}")
+            self.emit("")
+
+        self.emit("void sui_main(void) {")
+        self.indent += 1
+        self.declare_locals(None, self.main_lines, set())
+        self.transpile_block(None, self.main_lines)
+        self.emit("fflush(stdout);")
+        self.indent -= 1
+        self.emit("}")
+        self.emit("")
+
+        # Command-line entry point, left out of shared libraries
+        self.emit("#ifndef SUI_LIBRARY")
+        self.emit("int main(int argc, char **argv) {")
+        self.indent += 1
+        if 100 in self.used_globals:
+            self.emit("g100 = argc - 1;")
+        for g in sorted(g for g in self.used_globals if g > 100):
+            parse = 'strtod' if self.type_of(None, f"g{g}") == FLOAT else '(int64_t)strtod'
+            self.emit(f"if (argc > {g - 100}) g{g} = {parse}(argv[{g - 100}], NULL);")
+        self.emit("sui_main();")
+        self.emit("return 0;")
+        self.indent -= 1
+        self.emit("}")
+        self.emit("#endif")
+
+        return '\n'.join(self.output)
+
+    def prototype(self, func_id: int) -> str:
+        """C prototype of fN"""
+        params, ret = self.signature(func_id)
+        args = ", ".join(f"{C_TYPES[p]} a{i}" for i, p in enumerate(params)) or "void"
+        return f"{C_TYPES[ret]} f{func_id}({args})"
+
+
+def build(c_code: str, output: str, shared: bool = False):
+    """Compile C code with the system C compiler"""
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "sui.c")
+        with open(source, 'w') as f:
+            f.write(c_code)
+        command = [find_compiler(), '-O2', '-fwrapv', '-o', output, source, '-lm']
+        if shared:
+            command[1:1] = ['-shared', '-fPIC', '-DSUI_LIBRARY']
+        try:
+            result = subprocess.run(command, capture_output=True, text=True)
+        except FileNotFoundError:
+            raise RuntimeError(f"C compiler not found: {command[0]} (set CC to override)")
+    if result.returncode != 0:
+        raise RuntimeError(f"C compilation failed:\n{result.stderr}")
+
+
+class SuiNativeLibrary:
+    """A Sui program compiled to a shared library and loaded with ctypes"""
+
+    def __init__(self, path: str, transpiler: Sui2CTranspiler):
+        self.lib = ctypes.CDLL(path)
+        self.transpiler = transpiler
+        self.lib.sui_alloc.restype = ctypes.c_void_p
+        self.lib.sui_alloc.argtypes = [ctypes.c_int64]
+        self.lib.sui_len.restype = ctypes.c_int64
+        self.lib.sui_len.argtypes = [ctypes.c_void_p]
+        self.elem = ctypes.c_double if transpiler.elem_type() == FLOAT else ctypes.c_int64
+        for func_id in transpiler.functions:
+            params, ret = transpiler.signature(func_id)
+            func = getattr(self.lib, f"f{func_id}")
+            func.argtypes = [CTYPES_TYPES[p] for p in params]
+            func.restype = CTYPES_TYPES[ret]
+
+    def main(self, args: Optional[list] = None):
+        """Run the program's top-level code"""
+        args = [str(a) for a in args or []]
+        if 100 in self.transpiler.used_globals:
+            self.set_global(100, len(args))
+        for i, arg in enumerate(args):
+            if 101 + i in self.transpiler.used_globals:
+                self.set_global(101 + i, float(arg))
+        self.lib.sui_main()
+
+    def call(self, func_id: int, *args) -> Any:
+        """
+        Call fN; lists passed for array parameters are copied in and back
+        out, and an array result comes back as a list
+        """
+        params, ret = self.transpiler.signature(func_id)
+        values = list(args) + [0] * (len(params) - len(args))
+        converted = []
+        copies = []
+        for value, kind in zip(values, params):
+            if kind == ARRAY and isinstance(value, list):
+                ptr = self.array_from_list(value)
+                copies.append((value, ptr))
+                converted.append(ptr)
+            else:
+                converted.append(value)
+        result = getattr(self.lib, f"f{func_id}")(*converted)
+        for values_list, ptr in copies:
+            values_list[:] = self.array_to_list(ptr)
+        if ret == ARRAY:
+            return self.array_to_list(result)
+        return result
+
+    def array_from_list(self, values: list) -> int:
+        """Copy a list into a new native Sui array and return its pointer"""
+        ptr = self.lib.sui_alloc(len(values))
+        (self.elem * len(values)).from_address(ptr)[:] = values
+        return ptr
+
+    def array_to_list(self, ptr: Optional[int]) -> list:
+        """Copy a native Sui array into a list"""
+        if not ptr:
+            return []
+        length = self.lib.sui_len(ptr)
+        return list((self.elem * length).from_address(ptr))
+
+    def get_global(self, idx: int) -> Any:
+        """Read global gN"""
+        kind = self.transpiler.type_of(None, f"g{idx}")
+        return CTYPES_TYPES[kind].in_dll(self.lib, f"g{idx}").value
+
+    def set_global(self, idx: int, value):
+        """Write global gN"""
+        kind = self.transpiler.type_of(None, f"g{idx}")
+        if kind == INT:
+            value = int(value)
+        CTYPES_TYPES[kind].in_dll(self.lib, f"g{idx}").value = value
+
+
+def load(sui_code: str) -> SuiNativeLibrary:
+    """Compile Sui code to a shared library and load it"""
+    transpiler = Sui2CTranspiler()
+    c_code = transpiler.transpile(sui_code)
+    tmp = tempfile.mkdtemp(prefix="sui2c-")
+    try:
+        path = os.path.join(tmp, "libsui.so")
+        build(c_code, path, shared=True)
+        return SuiNativeLibrary(path, transpiler)
+    finally:
+        # The loaded library stays mapped after its file is removed
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def main():
+    if len(sys.argv) >= 2 and sys.argv[1] in ('--version', '-V'):
+        print(f"sui-lang {get_version()}")
+        return
+
+    if len(sys.argv) < 2 or sys.argv[1] in ('--help', '-h'):
+        print("Sui (粋) to C Compiler")
+        print("=" * 50)
+        print("")
+        print("Usage:")
+        print("  sui2c <file.sui>                # Show generated C code")
+        print("  sui2c <file.sui> -o out.c       # Output to file")
+        print("  sui2c <file.sui> --shared lib.so  # Build a shared library")
+        print("  sui2c <file.sui> --run [args]   # Compile natively and execute")
+        print("  sui2c --version                 # Show version")
+        print("")
+        print("Requirements:")
+        print("  cc           A C compiler (override with CC)")
+        return
+
+    filename = sys.argv[1]
+
+    with open(filename, 'r') as f:
+        code = f.read()
+
+    try:
+        c_code = Sui2CTranspiler().transpile(code)
+    except NotImplementedError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        if '-o' in sys.argv:
+            out_file = sys.argv[sys.argv.index('-o') + 1]
+            with open(out_file, 'w') as f:
+                f.write(c_code)
+            print(f"✓ Output saved to {out_file}")
+
+        elif '--shared' in sys.argv:
+            out_file = sys.argv[sys.argv.index('--shared') + 1]
+            build(c_code, out_file, shared=True)
+            print(f"✓ Built {out_file}")
+
+        elif '--run' in sys.argv:
+            run_args = sys.argv[sys.argv.index('--run') + 1:]
+            with tempfile.TemporaryDirectory() as tmp:
+                exe = os.path.join(tmp, "sui")
+                build(c_code, exe)
+                sys.stdout.flush()
+                sys.exit(subprocess.run([exe] + run_args).returncode)
+
+        else:
+            print(c_code)
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
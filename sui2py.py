@@ -16,13 +16,119 @@ def get_version() -> str:
         return "0.4.1"
 
 
+# Emitted when the program uses `,`: like the interpreter's StreamInput, stdin
+# is read in blocks and parsed a block at a time (int, else float, else str)
+INPUT_RUNTIME = '''
+def _parse_input(text):
+    try:
+        return int(text)
+    except ValueError:
+        try:
+            return float(text)
+        except ValueError:
+            return text
+
+def _input_values():
+    read1 = getattr(getattr(sys.stdin, "buffer", None), "read1", None)
+    if read1 is None:
+        # A replaced stdin (e.g. io.StringIO) has no byte buffer; read it line by line
+        for line in iter(sys.stdin.readline, ""):
+            yield _parse_input(line.removesuffix("\\n").removesuffix("\\r"))
+        return
+    partial = b""
+    while True:
+        block = read1(1 << 16)
+        lines = (partial + block).split(b"\\n") if block else [partial] if partial else []
+        partial = lines.pop() if block else b""
+        lines = [line.decode("utf-8").removesuffix("\\r") for line in lines]
+        try:
+            values = list(map(int, lines))
+        except ValueError:
+            values = list(map(_parse_input, lines))
+        yield from values
+        if not block:
+            return
+
+_inputs = _input_values()
+
+def _read():
+    for value in _inputs:
+        return value
+    raise EOFError("EOF when reading a line")
+'''
+
+# Emitted when the transpiler is given limits; the error classes mirror sui.py's
+LIMITS_RUNTIME = '''
+from itertools import repeat as _repeat
+from operator import length_hint as _length_hint
+
+class SuiLimitError(RuntimeError):
+    def __init__(self, limit, value):
+        super().__init__(f"{{limit}} limit exceeded ({{value}})")
+        self.limit = limit
+        self.value = value
+
+class StepLimitExceeded(SuiLimitError):
+    pass
+
+class ArrayLimitExceeded(SuiLimitError):
+    pass
+
+class DepthLimitExceeded(SuiLimitError):
+    pass
+
+class OutputLimitExceeded(SuiLimitError):
+    pass
+
+_steps = _cells = _outputs = _depth = 0
+
+def _new_array(size):
+    global _cells
+    _cells += max(size, 0)
+    if _cells > {array_cells}:
+        raise ArrayLimitExceeded("array_cells", {array_cells})
+    return [0] * size
+
+def _print(value):
+    global _outputs
+    _outputs += 1
+    if _outputs > {output}:
+        raise OutputLimitExceeded("output", {output})
+    print(value)
+'''
+
+
+LIMIT_ERRORS = ('StepLimitExceeded', 'ArrayLimitExceeded', 'DepthLimitExceeded', 'OutputLimitExceeded')
+
+
 class Sui2PyTranspiler:
     """Sui to Python transpiler"""
 
-    def __init__(self):
+    def __init__(self, limits=None):
+        """limits: sui.Limits (or anything with its fields) to enforce in the generated code"""
         self.indent = 0
         self.output: list[str] = []
         self.functions: dict[int, dict] = {}
+        self.limits = limits
+        self.max_steps = getattr(limits, 'steps', None)
+        self.max_depth = getattr(limits, 'depth', None)
+        self.state_sizes: dict[int, int] = {}
+        self.current_state = 0
+        # Loops in functions count in a local, synced with the global `_steps` around calls
+        self.step_var = '_steps'
+        # Loops without calls count passes with an iterator instead (see transpile_block)
+        self.step_ticks = False
+
+    def emit_back_edge(self, target: int):
+        """Every loop ends in a backward jump, so the budget is charged there with the states it repeats"""
+        if self.max_steps is not None and not self.step_ticks and target <= self.current_state:
+            self.emit_step_check(sum(self.state_sizes.get(sid, 0) for sid in range(target, self.current_state + 1)))
+
+    def emit_step_check(self, count: int):
+        """Charge `count` instructions against the step budget"""
+        if self.max_steps is not None and count:
+            self.emit(f"if ({self.step_var} := {self.step_var} + {count}) > {self.max_steps}:")
+            self.emit(f"    raise StepLimitExceeded('steps', {self.max_steps})")
 
     def emit(self, line: str):
         """Emit a line of code with proper indentation"""
@@ -60,11 +166,6 @@ class Sui2PyTranspiler:
 
         # Use state machine pattern if labels exist
         if labels:
-            self.emit("_state = -1")
-            self.emit("while True:")
-            self.indent += 1
-            self.emit("_state += 1")
-
             # Map labels to state numbers
             state_map = {-1: 0}
             state_num = 1
@@ -90,33 +191,55 @@ class Sui2PyTranspiler:
                         states[current] = []
                     states[current].append(tokens)
 
+            # Without calls nothing else spends the budget while the loop runs, so
+            # the loop iterates over its share of it: each pass is charged its
+            # largest state up front, and the unused passes are refunded on exit.
+            # The check then costs no bytecode per pass
+            self.step_ticks = self.max_steps is not None and not any(tokens[0] == '$' for tokens in lines)
+            if self.step_ticks:
+                weight = max(1, *(len(body) for body in states.values()))
+                self.emit(f"_ticks = _repeat(None, ({self.max_steps} - _steps) // {weight})")
+                self.emit("try:")
+                self.indent += 1
+            self.emit("_state = -1")
+            self.emit("for _ in _ticks:" if self.step_ticks else "while True:")
+            self.indent += 1
+            self.emit("_state += 1")
+
             # Generate code for each state
             for state_id in sorted(states.keys()):
                 self.emit(f"if _state == {state_id}:")
                 self.indent += 1
 
                 state_lines = states[state_id]
+                self.state_sizes = {sid: len(body) for sid, body in states.items()}
+                self.current_state = state_id
                 if not state_lines:
                     self.emit("pass")
                 else:
                     for tokens in state_lines:
                         self.transpile_instruction(tokens, state_map, is_function)
 
-                # State transition
-                if state_lines and state_lines[-1][0] not in ['?', '@', '^']:
+                # State transition (empty states and untaken `?` fall through too)
+                if not state_lines or state_lines[-1][0] not in ['@', '^']:
                     next_state = state_id + 1
                     if next_state in states:
                         self.emit(f"_state = {next_state} - 1")
                         self.emit("continue")
                     else:
                         self.emit("break")
-                elif not state_lines:
-                    self.emit("break")
 
                 self.indent -= 1
 
             self.emit("break")
             self.indent -= 1
+            if self.step_ticks:
+                self.emit("else:")
+                self.emit(f"    raise StepLimitExceeded('steps', {self.max_steps})")
+                self.indent -= 1
+                self.emit("finally:")
+                self.emit(f"    _steps += (({self.max_steps} - _steps) // {weight} - _length_hint(_ticks)) * {weight}")
+                self.step_ticks = False
         else:
             # Simple case: no labels
             for tokens in lines:
@@ -173,6 +296,7 @@ class Sui2PyTranspiler:
             if label in state_map:
                 self.emit(f"if {cond}:")
                 self.indent += 1
+                self.emit_back_edge(state_map[label])
                 self.emit(f"_state = {state_map[label]} - 1")
                 self.emit("continue")
                 self.indent -= 1
@@ -181,6 +305,7 @@ class Sui2PyTranspiler:
             # Unconditional jump
             label = int(tokens[1])
             if label in state_map:
+                self.emit_back_edge(state_map[label])
                 self.emit(f"_state = {state_map[label]} - 1")
                 self.emit("continue")
 
@@ -193,7 +318,12 @@ class Sui2PyTranspiler:
             result = tokens[1]
             func_id = tokens[2]
             args = ", ".join(self.resolve_value(a) for a in tokens[3:])
-            self.emit(f"{result} = f{func_id}({args})")
+            if self.step_var != '_steps':
+                self.emit(f"_steps = {self.step_var}")
+                self.emit(f"{result} = f{func_id}({args})")
+                self.emit(f"{self.step_var} = _steps")
+            else:
+                self.emit(f"{result} = f{func_id}({args})")
 
         elif op == '^':
             # Return
@@ -201,7 +331,10 @@ class Sui2PyTranspiler:
 
         elif op == '[':
             # Array create
-            self.emit(f"{tokens[1]} = [0] * {self.resolve_value(tokens[2])}")
+            if self.limits is not None:
+                self.emit(f"{tokens[1]} = _new_array({self.resolve_value(tokens[2])})")
+            else:
+                self.emit(f"{tokens[1]} = [0] * {self.resolve_value(tokens[2])}")
 
         elif op == ']':
             # Array read
@@ -214,19 +347,11 @@ class Sui2PyTranspiler:
 
         elif op == '.':
             # Output
-            self.emit(f"print({self.resolve_value(tokens[1])})")
+            self.emit(f"{'print' if self.limits is None else '_print'}({self.resolve_value(tokens[1])})")
 
         elif op == ',':
             # Input
-            self.emit(f"_input = input()")
-            self.emit(f"try:")
-            self.indent += 1
-            self.emit(f"{tokens[1]} = int(_input)")
-            self.indent -= 1
-            self.emit(f"except ValueError:")
-            self.indent += 1
-            self.emit(f"{tokens[1]} = _input")
-            self.indent -= 1
+            self.emit(f"{tokens[1]} = _read()")
 
         elif op == '#':
             # Function definition (handled separately)
@@ -292,6 +417,15 @@ class Sui2PyTranspiler:
         self.indent -= 1
         self.indent -= 1
         self.emit("")
+        if any(tokens[0] == ',' for tokens in lines):
+            self.output += INPUT_RUNTIME.strip('\n').split('\n')
+            self.emit("")
+        if self.limits is not None:
+            caps = {name: 'float("inf")' if value is None else value
+                    for name in ('array_cells', 'output')
+                    for value in [getattr(self.limits, name, None)]}
+            self.output += LIMITS_RUNTIME.format(**caps).strip('\n').split('\n')
+            self.emit("")
 
         # Output function definitions
         for func_id, func_info in sorted(self.functions.items()):
@@ -302,10 +436,35 @@ class Sui2PyTranspiler:
             self.emit(f"def f{func_id}({args_str}):")
             self.indent += 1
 
+            loops = any(tokens[0] == ':' for tokens in body)
+            local_steps = self.max_steps is not None and loops and any(tokens[0] == '$' for tokens in body)
+            if self.limits is not None:
+                self.emit("global _steps, _depth")
+                # Calls are charged too, so recursion without loops stays on budget
+                self.emit_step_check(1 if loops else len(body) + 1)
+            if self.max_depth is not None:
+                self.emit("_depth += 1")
+                self.emit(f"if _depth > {self.max_depth}:")
+                self.emit("    _depth -= 1")
+                self.emit(f"    raise DepthLimitExceeded('depth', {self.max_depth})")
+            if local_steps:
+                self.emit("_local_steps = _steps")
+                self.step_var = '_local_steps'
+            if self.max_depth is not None or local_steps:
+                self.emit("try:")
+                self.indent += 1
             if body:
                 self.transpile_block(body, is_function=True)
             else:
                 self.emit("pass")
+            if self.max_depth is not None or local_steps:
+                self.indent -= 1
+                self.emit("finally:")
+                if self.max_depth is not None:
+                    self.emit("    _depth -= 1")
+                if local_steps:
+                    self.emit("    _steps = _local_steps")
+            self.step_var = '_steps'
 
             self.indent -= 1
             self.emit("")
@@ -350,6 +509,8 @@ def main():
         print("  sui2py <file.sui>           # Show converted code")
         print("  sui2py <file.sui> -o out.py # Output to file")
         print("  sui2py <file.sui> --run     # Convert and execute")
+        print("  sui2py --max-steps=N <file.sui> --run")
+        print("                              # Also --max-cells, --max-depth, --max-output")
         print("  sui2py --version            # Show version")
         print("")
         print("Sample:")
@@ -369,12 +530,22 @@ def main():
         print(result)
         return
 
+    limits = None
+    from sui import LIMIT_OPTIONS, Limits
+    while len(sys.argv) > 2 and sys.argv[1].startswith(tuple(LIMIT_OPTIONS)):
+        option, _, value = sys.argv.pop(1).partition('=')
+        if not value.isdigit():
+            print(f"Error: {option} expects a non-negative integer", file=sys.stderr)
+            sys.exit(1)
+        limits = limits or Limits()
+        setattr(limits, LIMIT_OPTIONS[option + '='], int(value))
+
     filename = sys.argv[1]
 
     with open(filename, 'r') as f:
         code = f.read()
 
-    transpiler = Sui2PyTranspiler()
+    transpiler = Sui2PyTranspiler(limits)
     python_code = transpiler.transpile(code)
 
     if '-o' in sys.argv:
@@ -394,9 +565,15 @@ def main():
         old_argv = sys_module.argv
         sys_module.argv = [filename] + run_args
 
-        exec(python_code, {'__name__': '__main__'})
-
-        sys_module.argv = old_argv
+        try:
+            exec(python_code, {'__name__': '__main__'})
+        except RuntimeError as e:
+            if limits is None or type(e).__name__ not in LIMIT_ERRORS:
+                raise
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        finally:
+            sys_module.argv = old_argv
 
     else:
         # Output to stdout
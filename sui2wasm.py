@@ -9,7 +9,61 @@ import sys
 import subprocess
 import tempfile
 import os
-from typing import Optional
+from typing import Iterable, Optional
+
+# Element-wise ops that have a direct i32x4 counterpart
+SIMD_BINOPS = {'+': 'i32x4.add', '-': 'i32x4.sub', '*': 'i32x4.mul'}
+SIMD_CMPOPS = {'<': 'i32x4.lt_s', '>': 'i32x4.gt_s', '~': 'i32x4.eq'}
+SIMD_LANES = 4
+
+# Host functions a module may import, beyond print_i32
+HOST_IMPORTS = {
+    'print_str': '(import "env" "print_str" (func $print_str (param i32)))',
+    'read_i32': '(import "env" "read_i32" (func $read_i32 (result i32)))',
+    'arg_count': '(import "env" "arg_count" (func $arg_count (result i32)))',
+    'arg_i32': '(import "env" "arg_i32" (func $arg_i32 (param i32) (result i32)))',
+}
+
+# Helpers for checked modules: trap where i32 results would differ from the interpreter's
+CHECKED_HELPERS = [
+    ";; Narrow an i64 result to i32, trapping if it doesn't fit",
+    "(func $_narrow (param $x i64) (result i32)",
+    "  (if (i64.ne (local.get $x) (i64.extend_i32_s (i32.wrap_i64 (local.get $x))))",
+    "    (then (unreachable)))",
+    "  (i32.wrap_i64 (local.get $x))",
+    ")",
+]
+CHECKED_ARRAY_HELPERS = [
+    ";; Allocate an array with its length in the word before it, growing memory as needed",
+    "(func $_alloc (param $n i32) (result i32)",
+    "  (local $ptr i32) (local $end i64) (local $pages i32)",
+    "  (if (i32.lt_s (local.get $n) (i32.const 0)) (then (unreachable)))",
+    "  (local.set $ptr (global.get $heap_ptr))",
+    "  (local.set $end (i64.add (i64.extend_i32_u (local.get $ptr))",
+    "                           (i64.mul (i64.extend_i32_u (i32.add (local.get $n) (i32.const 1))) (i64.const 4))))",
+    "  (if (i64.gt_u (local.get $end) (i64.const 0xffff0000)) (then (unreachable)))",
+    "  (local.set $pages (i32.sub (i32.wrap_i64 (i64.shr_u (i64.add (local.get $end) (i64.const 65535)) (i64.const 16)))",
+    "                             (memory.size)))",
+    "  (if (i32.gt_s (local.get $pages) (i32.const 0))",
+    "    (then (if (i32.eq (memory.grow (local.get $pages)) (i32.const -1)) (then (unreachable)))))",
+    "  (i32.store (local.get $ptr) (local.get $n))",
+    "  (global.set $heap_ptr (i32.wrap_i64 (local.get $end)))",
+    "  (i32.add (local.get $ptr) (i32.const 4))",
+    ")",
+    ";; Address of element i, trapping outside 0..length-1",
+    "(func $_index (param $ptr i32) (param $i i32) (result i32)",
+    "  (if (i32.ge_u (local.get $i) (i32.load (i32.sub (local.get $ptr) (i32.const 4))))",
+    "    (then (unreachable)))",
+    "  (i32.add (local.get $ptr) (i32.mul (local.get $i) (i32.const 4)))",
+    ")",
+]
+
+# Instructions that end by storing tokens[1], and the operand each pushes first
+RESULT_OPS = {'=', '+', '-', '*', '/', '%', '<', '>', '~', '!', '&', '|', '$', ']', ','}
+FIRST_OPERAND = {
+    '=': 2, '+': 2, '-': 2, '*': 2, '/': 2, '%': 2, '<': 2, '>': 2, '~': 2,
+    '!': 2, '&': 2, '|': 2, '?': 1, '^': 1, '.': 1, '$': 3, ']': 2, '{': 1,
+}
 
 def get_version() -> str:
     """Get package version"""
@@ -23,12 +77,30 @@ def get_version() -> str:
 class Sui2WatTranspiler:
     """Sui to WAT transpiler"""
 
-    def __init__(self):
+    def __init__(self, simd: bool = True, reuse_locals: bool = True, batch_exports: Iterable[int] = (),
+                 exports: Optional[Iterable[str]] = None, checked: bool = False):
         self.output: list[str] = []
         self.indent = 0
         self.functions: dict[int, dict] = {}
         self.used_globals: set[int] = set()
         self.use_memory = False
+        # Checked modules trap on i32 overflow and bad array indexes instead of
+        # wrapping or reading past an array (SIMD loops, which wrap, are off)
+        self.checked = checked
+        self.simd = simd and not checked
+        self.reuse_locals = reuse_locals
+        self.batch_exports = set(batch_exports)
+        # None exports every function and global; otherwise only these names
+        # (e.g. "f0", "g2") are exported and unreachable functions are dropped
+        self.exports = None if exports is None else set(exports)
+        self.stack_vars: set[str] = set()
+        self.strings: dict[str, int] = {}
+        self.data_size = 0
+        self.string_vars: set[str] = set()
+        self.global_string_vars: set[str] = set()
+        self.imports: set[str] = set()
+        self.simd_locals: list[str] = []
+        self.simd_loops = 0
 
     def emit(self, line: str):
         """Emit a line with proper indentation"""
@@ -74,14 +146,108 @@ class Sui2WatTranspiler:
             if op in ['[', ']', '{']:
                 self.use_memory = True
             for token in tokens[1:]:
-                if token.startswith('g'):
+                if token.startswith('"'):
+                    self.add_string(token)
+                elif token.startswith('g'):
                     try:
                         self.used_globals.add(int(token[1:]))
                     except ValueError:
                         pass
 
+    def is_exported(self, name: str) -> bool:
+        """Check if a function or global should be exported"""
+        return self.exports is None or name in self.exports
+
+    def prune_functions(self, main_lines: list[list[str]]):
+        """Drop functions unreachable from main and the requested exports"""
+        def callees(lines):
+            return {int(t[2]) for t in lines if t[0] == '$' and len(t) > 2 and t[2].isdigit()}
+
+        pending = callees(main_lines) | self.batch_exports
+        pending |= {int(name[1:]) for name in self.exports if name[:1] == 'f' and name[1:].isdigit()}
+        reachable = set()
+        while pending:
+            func_id = pending.pop()
+            if func_id in reachable or func_id not in self.functions:
+                continue
+            reachable.add(func_id)
+            pending |= callees(self.functions[func_id]['body'])
+        self.functions = {fid: info for fid, info in self.functions.items() if fid in reachable}
+
+        # Globals and strings referenced only by dropped functions go too
+        self.used_globals = set()
+        self.use_memory = False
+        self.strings = {}
+        self.data_size = 0
+        self.collect_info(main_lines)
+        for info in self.functions.values():
+            self.collect_info(info['body'])
+        self.used_globals |= {int(name[1:]) for name in self.exports if name[:1] == 'g' and name[1:].isdigit()}
+
+    def add_string(self, literal: str):
+        """Reserve a length-prefixed data segment slot for a string literal"""
+        if literal in self.strings:
+            return
+        self.strings[literal] = self.data_size
+        size = 4 + len(literal[1:-1].encode('utf-8'))
+        self.data_size += (size + 3) // 4 * 4
+        self.use_memory = True
+
+    def data_segment(self) -> str:
+        """Build the data segment holding all string literals"""
+        data = bytearray(self.data_size)
+        for literal, offset in self.strings.items():
+            raw = literal[1:-1].encode('utf-8')
+            data[offset:offset + 4] = len(raw).to_bytes(4, 'little')
+            data[offset + 4:offset + 4 + len(raw)] = raw
+        escaped = ''.join(f'\\{b:02x}' for b in data)
+        return f'(data (i32.const 0) "{escaped}")'
+
+    def assignment_sources(self, lines: list[list[str]]) -> dict[str, list[str | None]]:
+        """Map each assigned variable to its `=` sources (None for any other assignment)"""
+        sources: dict[str, list[str | None]] = {}
+        for tokens in lines:
+            op = tokens[0]
+            if op in RESULT_OPS or op == '[':
+                source = tokens[2] if op == '=' and len(tokens) > 2 else None
+                sources.setdefault(tokens[1], []).append(source)
+        return sources
+
+    def string_reachable_vars(self, lines: list[list[str]], known: set[str] = frozenset()) -> set[str]:
+        """Find variables that a string literal (or a `known` string variable) can be copied into"""
+        sources = self.assignment_sources(lines)
+        # A copy cycle on its own holds no string
+        reached: set[str] = set()
+        changed = True
+        while changed:
+            changed = False
+            for var, srcs in sources.items():
+                if var not in reached and any(src and (src.startswith('"') or src in reached or src in known)
+                                              for src in srcs):
+                    reached.add(var)
+                    changed = True
+        return reached
+
+    def infer_string_vars(self, lines: list[list[str]], known: set[str] = frozenset()) -> set[str]:
+        """Find variables whose every assignment is a string literal or another string variable"""
+        sources = self.assignment_sources(lines)
+        reached = self.string_reachable_vars(lines, known)
+        candidates = {var for var in reached if all(sources[var])}
+        changed = True
+        while changed:
+            changed = False
+            for var in list(candidates):
+                if not all(src.startswith('"') or src in candidates or src in known
+                           for src in sources[var]):
+                    candidates.discard(var)
+                    changed = True
+        return candidates
+
     def resolve_value(self, val: str) -> str:
         """Resolve a value to WAT code"""
+        if val in self.stack_vars:
+            # Already on the operand stack
+            return ""
         if val.startswith('v'):
             idx = int(val[1:])
             return f"(local.get $v{idx})"
@@ -92,7 +258,7 @@ class Sui2WatTranspiler:
             idx = int(val[1:])
             return f"(local.get $a{idx})"
         elif val.startswith('"'):
-            return "(i32.const 0)"
+            return f"(i32.const {self.strings[val]})"
         elif '.' in val:
             return f"(i32.const {int(float(val))})"
         else:
@@ -103,6 +269,9 @@ class Sui2WatTranspiler:
 
     def set_var(self, var: str) -> str:
         """Generate WAT instruction to set a variable"""
+        if var in self.stack_vars:
+            # Left on the operand stack for the next instruction
+            return ""
         if var.startswith('v'):
             idx = int(var[1:])
             return f"(local.set $v{idx})"
@@ -126,15 +295,20 @@ class Sui2WatTranspiler:
             for label in sorted(labels):
                 state_map[label] = state_num
                 state_num += 1
+            state_labels = {state: label for label, state in state_map.items()}
+            self.simd_locals = []
 
             states: dict[int, list] = {0: []}
             current_state = 0
+            # Falling off a state continues with the label that follows it in the source
+            fallthrough: dict[int, int] = {}
             
             for tokens in lines:
                 if not tokens:
                     continue
                 if tokens[0] == ':':
                     label_id = int(tokens[1])
+                    fallthrough.setdefault(current_state, state_map[label_id])
                     current_state = state_map[label_id]
                     if current_state not in states:
                         states[current_state] = []
@@ -157,6 +331,11 @@ class Sui2WatTranspiler:
                 
                 state_lines = states[state_id]
                 has_jump = False
+
+                if self.simd and state_id in state_labels:
+                    simd_code = self.vectorize_loop(state_labels[state_id], state_lines)
+                    for line in simd_code or []:
+                        result.append(f"        {line}")
                 
                 for tokens in state_lines:
                     if tokens[0] == '?':
@@ -195,8 +374,8 @@ class Sui2WatTranspiler:
                             result.append(f"        {inst}")
                 
                 if not has_jump:
-                    next_state = state_id + 1
-                    if next_state in states:
+                    next_state = fallthrough.get(state_id)
+                    if next_state is not None:
                         result.append(f"        (local.set $_state (i32.const {next_state}))")
                         result.append(f"        (br $loop)")
                     else:
@@ -208,6 +387,9 @@ class Sui2WatTranspiler:
             result.append("    (br $exit)")
             result.append("  )")
             result.append(")")
+
+            for name in reversed(self.simd_locals):
+                result.insert(1, f"(local {name} v128)")
         else:
             for tokens in lines:
                 if not tokens or tokens[0] == '}':
@@ -229,8 +411,228 @@ class Sui2WatTranspiler:
                     for inst in insts:
                         result.append(inst)
 
+        return [line for line in result if line.strip()]
+
+    def vectorize_loop(self, label: int, lines: list[list[str]]) -> list[str] | None:
+        """
+        Emit an i32x4 fast path for a counted array loop, or None if the loop doesn't qualify.
+
+        Recognised shape (one state, header + straight-line body + increment):
+            : L / < c i n / ! d c / ? d END / ...body... / + i i 1 / @ L
+        The header may also be `~ c i n / ? c END` or `> c i m / ? c END`.
+        The body may use `]`/`{` indexed by i, + - * < > ~ ! on per-iteration
+        temporaries, and `+ r r x` reductions. The original scalar loop runs
+        afterwards as the tail and always executes the final iteration, so
+        temporaries and header flags end with their scalar values.
+        """
+        if len(lines) < 4 or lines[-1] != ['@', str(label)]:
+            return None
+
+        header = self._match_loop_header(lines)
+        if header is None:
+            return None
+        counter, bound, cmp_op, header_len = header
+
+        step = lines[-2]
+        if step not in (['+', counter, counter, '1'], ['+', counter, '1', counter]):
+            return None
+        body = lines[header_len:-2]
+
+        written = {tokens[1] for tokens in lines[:-1] if tokens[0] not in ('{', '?', '@')}
+        if bound in written or any(tokens[0] in ('?', '@', ':') for tokens in body):
+            return None
+        if counter in {tokens[1] for tokens in body if tokens[0] != '{'}:
+            return None
+
+        reductions = self._find_reductions(body, lines[:header_len], counter)
+
+        loop_id = self.simd_loops + 1
+        new_locals: list[str] = []
+        vec_names: dict[str, str] = {}
+        acc_names: dict[str, str] = {}
+        loads: list[str] = []
+        stores: list[str] = []
+        code: list[str] = []
+
+        def vec_local(token: str, prefix: str = "x4") -> str:
+            name = f"$_{prefix}_{loop_id}_{token}"
+            if name not in new_locals:
+                new_locals.append(name)
+            return name
+
+        def operand(val: str) -> list[str] | None:
+            if val in vec_names:
+                return [f"(local.get {vec_names[val]})"]
+            if val == counter:
+                return [self.resolve_value(val), "(i32x4.splat)",
+                        "(v128.const i32x4 0 1 2 3)", "(i32x4.add)"]
+            if val in written or val.startswith('"') or '.' in val:
+                return None
+            if val[:1] not in ('v', 'g', 'a'):
+                try:
+                    int(val)
+                except ValueError:
+                    return None
+            return [self.resolve_value(val), "(i32x4.splat)"]
+
+        def address(arr: str) -> list[str] | None:
+            if arr in written or arr[:1] not in ('v', 'g', 'a'):
+                return None
+            return [self.resolve_value(arr), self.resolve_value(counter),
+                    "(i32.const 4)", "(i32.mul)", "(i32.add)"]
+
+        for tokens in body:
+            op = tokens[0]
+            if tokens[1] in reductions:
+                other = tokens[3] if tokens[2] == tokens[1] else tokens[2]
+                val_code = operand(other)
+                if val_code is None:
+                    return None
+                acc = acc_names.setdefault(tokens[1], vec_local(tokens[1], "acc"))
+                code += [f"(local.get {acc})"] + val_code + ["(i32x4.add)", f"(local.set {acc})"]
+                continue
+
+            if op == ']':
+                if len(tokens) < 4 or tokens[3] != counter:
+                    return None
+                addr = address(tokens[2])
+                if addr is None:
+                    return None
+                loads.append(tokens[2])
+                code += addr + ["(v128.load)"]
+            elif op == '{':
+                if len(tokens) < 4 or tokens[2] != counter:
+                    return None
+                addr = address(tokens[1])
+                val_code = operand(tokens[3])
+                if addr is None or val_code is None:
+                    return None
+                stores.append(tokens[1])
+                code += addr + val_code + ["(v128.store)"]
+                continue
+            elif op == '=':
+                val_code = operand(tokens[2])
+                if val_code is None:
+                    return None
+                code += val_code
+            elif op in SIMD_BINOPS or op in SIMD_CMPOPS:
+                a_code, b_code = operand(tokens[2]), operand(tokens[3])
+                if a_code is None or b_code is None:
+                    return None
+                if op in SIMD_BINOPS:
+                    code += a_code + b_code + [f"({SIMD_BINOPS[op]})"]
+                else:
+                    # Lane masks are -1/0; negate to get Sui's 1/0
+                    code += a_code + b_code + [f"({SIMD_CMPOPS[op]})", "(i32x4.neg)"]
+            elif op == '!':
+                a_code = operand(tokens[2])
+                if a_code is None:
+                    return None
+                code += a_code + ["(v128.const i32x4 0 0 0 0)", "(i32x4.eq)", "(i32x4.neg)"]
+            else:
+                return None
+
+            vec_names[tokens[1]] = vec_local(tokens[1])
+            code.append(f"(local.set {vec_names[tokens[1]]})")
+
+        if not loads and not stores:
+            return None
+        self.use_memory = True
+        self.simd_loops = loop_id
+        self.simd_locals += new_locals
+
+        # Only run while at least one iteration is left for the scalar tail
+        counter_code = self.resolve_value(counter)
+        bound_code = self.resolve_value(bound)
+        guard = [counter_code, f"(i32.const {SIMD_LANES})", "(i32.add)", bound_code, f"(i32.{cmp_op})"]
+
+        # Arrays overlapping by less than a vector would see reordered accesses
+        alias_checks = []
+        for store in dict.fromkeys(stores):
+            for other in dict.fromkeys(stores + loads):
+                if other != store:
+                    alias_checks.append((store, other))
+        entry = list(guard)
+        for store, other in alias_checks:
+            diff = [self.resolve_value(store), self.resolve_value(other), "(i32.sub)"]
+            entry += diff + ["(i32.eqz)"]
+            entry += diff + [f"(i32.const {SIMD_LANES * 4 - 1})", "(i32.add)",
+                             f"(i32.const {SIMD_LANES * 8 - 2})", "(i32.gt_u)", "(i32.or)", "(i32.and)"]
+
+        result = [f";; SIMD loop for label {label} ({SIMD_LANES} lanes, scalar tail below)"]
+        result += entry
+        result.append("(if")
+        result.append("  (then")
+        for acc in acc_names.values():
+            result.append("    (v128.const i32x4 0 0 0 0)")
+            result.append(f"    (local.set {acc})")
+        result.append(f"    (loop $simd{loop_id}")
+        for line in code:
+            result.append(f"      {line}")
+        result.append(f"      {counter_code}")
+        result.append(f"      (i32.const {SIMD_LANES})")
+        result.append("      (i32.add)")
+        result.append(f"      {self.set_var(counter)}")
+        for line in guard:
+            result.append(f"      {line}")
+        result.append(f"      (br_if $simd{loop_id})")
+        result.append("    )")
+        for var, acc in acc_names.items():
+            result.append(f"    {self.resolve_value(var)}")
+            for lane in range(SIMD_LANES):
+                result.append(f"    (local.get {acc})")
+                result.append(f"    (i32x4.extract_lane {lane})")
+                result.append("    (i32.add)")
+            result.append(f"    {self.set_var(var)}")
+        result.append("  )")
+        result.append(")")
         return result
 
+    def _match_loop_header(self, lines: list[list[str]]) -> tuple[str, str, str, int] | None:
+        """Match a loop exit test, returning (counter, bound, guard comparison, header length)"""
+        first = lines[0]
+        if len(first) < 4:
+            return None
+        if (first[0] == '<' and len(lines[1]) >= 3 and lines[1][:3] == ['!', lines[1][1], first[1]]
+                and len(lines[2]) >= 3 and lines[2][:2] == ['?', lines[1][1]]):
+            # Continue while counter < bound
+            counter, bound, cmp_op, header_len = first[2], first[3], 'lt_s', 3
+        elif first[0] == '~' and len(lines[1]) >= 3 and lines[1][:2] == ['?', first[1]]:
+            # Continue until counter == bound
+            counter, bound, cmp_op, header_len = first[2], first[3], 'lt_s', 2
+        elif first[0] == '>' and len(lines[1]) >= 3 and lines[1][:2] == ['?', first[1]]:
+            # Continue while counter <= bound
+            counter, bound, cmp_op, header_len = first[2], first[3], 'le_s', 2
+        else:
+            return None
+        if counter[:1] not in ('v', 'g'):
+            return None
+        if bound[:1] not in ('v', 'g', 'a'):
+            try:
+                int(bound)
+            except ValueError:
+                return None
+        return counter, bound, cmp_op, header_len
+
+    def _find_reductions(self, body: list[list[str]], header: list[list[str]], counter: str) -> set[str]:
+        """Find `+ r r x` accumulators that are not otherwise touched in the loop"""
+        writes: dict[str, int] = {}
+        for tokens in body:
+            if tokens[0] != '{':
+                writes[tokens[1]] = writes.get(tokens[1], 0) + 1
+
+        reductions = set()
+        for tokens in body:
+            if tokens[0] != '+' or len(tokens) < 4 or tokens[1] == counter:
+                continue
+            acc = tokens[1]
+            if acc[:1] not in ('v', 'g') or (tokens[2] == acc) == (tokens[3] == acc) or writes[acc] != 1:
+                continue
+            reads = sum(t.count(acc) for t in body + header) - 2
+            if reads == 0:
+                reductions.add(acc)
+        return reductions
+
     def transpile_instruction(self, tokens: list[str]) -> list[str]:
         """Transpile a single instruction to WAT"""
         if not tokens:
@@ -244,6 +646,16 @@ class Sui2WatTranspiler:
             result.append(val_code)
             result.append(self.set_var(tokens[1]))
 
+        elif op in ['+', '-', '*'] and self.checked:
+            op_map = {'+': 'i64.add', '-': 'i64.sub', '*': 'i64.mul'}
+            result.append(self.resolve_value(tokens[2]))
+            result.append("(i64.extend_i32_s)")
+            result.append(self.resolve_value(tokens[3]))
+            result.append("(i64.extend_i32_s)")
+            result.append(f"({op_map[op]})")
+            result.append("(call $_narrow)")
+            result.append(self.set_var(tokens[1]))
+
         elif op in ['+', '-', '*', '/', '%']:
             a_code = self.resolve_value(tokens[2])
             b_code = self.resolve_value(tokens[3])
@@ -290,7 +702,22 @@ class Sui2WatTranspiler:
 
         elif op == '.':
             result.append(self.resolve_value(tokens[1]))
-            result.append("(call $print_i32)")
+            if tokens[1].startswith('"') or tokens[1] in self.string_vars:
+                result.append("(call $print_str)")
+                self.imports.add('print_str')
+            else:
+                result.append("(call $print_i32)")
+
+        elif op == ',':
+            result.append("(call $read_i32)")
+            result.append(self.set_var(tokens[1]))
+            self.imports.add('read_i32')
+
+        elif op == '[' and self.checked:
+            result.append(self.resolve_value(tokens[2]))
+            result.append("(call $_alloc)")
+            result.append(self.set_var(tokens[1]))
+            self.use_memory = True
 
         elif op == '[':
             size_code = self.resolve_value(tokens[2])
@@ -307,9 +734,12 @@ class Sui2WatTranspiler:
         elif op == ']':
             result.append(self.resolve_value(tokens[2]))
             result.append(self.resolve_value(tokens[3]))
-            result.append("(i32.const 4)")
-            result.append("(i32.mul)")
-            result.append("(i32.add)")
+            if self.checked:
+                result.append("(call $_index)")
+            else:
+                result.append("(i32.const 4)")
+                result.append("(i32.mul)")
+                result.append("(i32.add)")
             result.append("(i32.load)")
             result.append(self.set_var(tokens[1]))
             self.use_memory = True
@@ -318,37 +748,171 @@ class Sui2WatTranspiler:
             if len(tokens) >= 4:
                 result.append(self.resolve_value(tokens[1]))
                 result.append(self.resolve_value(tokens[2]))
-                result.append("(i32.const 4)")
-                result.append("(i32.mul)")
-                result.append("(i32.add)")
+                if self.checked:
+                    result.append("(call $_index)")
+                else:
+                    result.append("(i32.const 4)")
+                    result.append("(i32.mul)")
+                    result.append("(i32.add)")
                 result.append(self.resolve_value(tokens[3]))
                 result.append("(i32.store)")
                 self.use_memory = True
 
         return result
 
+    def uses_defs(self, tokens: list[str]) -> tuple[list[str], list[str]]:
+        """Return the local variables read and written by an instruction"""
+        op = tokens[0]
+        if op in ('{', '?', '^', '.'):
+            uses, defs = tokens[1:], []
+        elif op == '$':
+            uses, defs = tokens[3:], tokens[1:2]
+        elif op in RESULT_OPS or op in ('[', ','):
+            uses, defs = tokens[2:], tokens[1:2]
+        else:
+            uses, defs = [], []
+        return ([t for t in uses if self.is_local(t)], [t for t in defs if self.is_local(t)])
+
+    def is_local(self, token: str) -> bool:
+        """Check if a token names a local variable (vN)"""
+        return token.startswith('v') and token[1:].isdigit()
+
+    def analyze_liveness(self, lines: list[list[str]]) -> list[set[str]]:
+        """Compute the set of locals live after each instruction of a block"""
+        labels = {int(tokens[1]): i for i, tokens in enumerate(lines) if tokens[0] == ':'}
+        count = len(lines)
+        succs: list[list[int]] = []
+        for i, tokens in enumerate(lines):
+            op = tokens[0]
+            nxt = [i + 1] if i + 1 < count else []
+            if op == '^':
+                succs.append([])
+            elif op in ('@', '?'):
+                target = int(tokens[1] if op == '@' else tokens[2])
+                # Unknown labels fall back to state 0 in the state machine
+                jump = [labels.get(target, 0)]
+                succs.append(jump if op == '@' and target in labels else jump + nxt)
+            else:
+                succs.append(nxt)
+
+        info = [self.uses_defs(tokens) for tokens in lines]
+        live_in: list[set[str]] = [set() for _ in lines]
+        live_out: list[set[str]] = [set() for _ in lines]
+        changed = True
+        while changed:
+            changed = False
+            for i in range(count - 1, -1, -1):
+                out = set()
+                for succ in succs[i]:
+                    out |= live_in[succ]
+                uses, defs = info[i]
+                new_in = (out - set(defs)) | set(uses)
+                if out != live_out[i] or new_in != live_in[i]:
+                    live_out[i], live_in[i] = out, new_in
+                    changed = True
+        return live_out
+
+    def find_stack_vars(self, lines: list[list[str]]) -> set[str]:
+        """
+        Find locals that are written once and read once by the very next
+        instruction as its first operand, so the value can stay on the stack
+        instead of a local.set/local.get pair.
+        """
+        def_count: dict[str, int] = {}
+        use_count: dict[str, int] = {}
+        for tokens in lines:
+            uses, defs = self.uses_defs(tokens)
+            for t in defs:
+                def_count[t] = def_count.get(t, 0) + 1
+            for t in uses:
+                use_count[t] = use_count.get(t, 0) + 1
+
+        stack_vars = set()
+        for tokens, following in zip(lines, lines[1:]):
+            if tokens[0] not in RESULT_OPS or not self.is_local(tokens[1]):
+                continue
+            var = tokens[1]
+            pos = FIRST_OPERAND.get(following[0])
+            if pos is None or len(following) <= pos or following[pos] != var:
+                continue
+            if following[0] == '{' and len(following) < 4:
+                continue
+            if def_count[var] == 1 and use_count.get(var, 0) == 1:
+                stack_vars.add(var)
+        return stack_vars
+
+    def allocate_locals(self, lines: list[list[str]]) -> list[list[str]]:
+        """
+        Rename locals so that variables with disjoint live ranges share a slot.
+
+        Builds an interference graph from liveness and colours it greedily in
+        first-use order; each slot keeps the name of its first variable.
+        Variables that are never read, and string variables, keep their own slot.
+        """
+        live_out = self.analyze_liveness(lines)
+        interference: dict[str, set[str]] = {}
+        order: list[str] = []
+        read: set[str] = set()
+        for i, tokens in enumerate(lines):
+            uses, defs = self.uses_defs(tokens)
+            read.update(uses)
+            for t in uses + defs:
+                if t not in interference:
+                    interference[t] = set()
+                    order.append(t)
+            for d in defs:
+                for other in live_out[i]:
+                    # A copy doesn't make source and destination interfere
+                    if other != d and not (tokens[0] == '=' and other == tokens[2]):
+                        interference[d].add(other)
+                        interference.setdefault(other, set()).add(d)
+
+        slots: list[tuple[str, set[str]]] = []
+        rename: dict[str, str] = {}
+        for var in order:
+            if var in self.stack_vars or var in self.string_vars or var not in read:
+                continue
+            for name, members in slots:
+                if not interference[var] & members:
+                    members.add(var)
+                    rename[var] = name
+                    break
+            else:
+                slots.append((var, {var}))
+                rename[var] = var
+
+        return [[tokens[0]] + [rename.get(t, t) for t in tokens[1:]] for tokens in lines]
+
+    def prepare_locals(self, lines: list[list[str]]) -> tuple[list[list[str]], list[int]]:
+        """Apply stack forwarding and slot reuse, returning the new block and its locals"""
+        self.string_vars = self.global_string_vars | {
+            var for var in self.infer_string_vars(lines, self.global_string_vars) if self.is_local(var)
+        }
+        if self.reuse_locals:
+            self.stack_vars = self.find_stack_vars(lines)
+            lines = self.allocate_locals(lines)
+        else:
+            self.stack_vars = set()
+        local_vars: set[int] = set()
+        for tokens in lines:
+            for token in tokens[1:]:
+                if self.is_local(token) and token not in self.stack_vars:
+                    local_vars.add(int(token[1:]))
+        return lines, sorted(local_vars)
+
     def transpile_function(self, func_id: int, argc: int, body: list[list[str]]) -> list[str]:
         """Transpile a function to WAT"""
         result = []
-        
-        local_vars: set[int] = set()
-        for tokens in body:
-            if not tokens:
-                continue
-            for token in tokens:
-                if token.startswith('v'):
-                    try:
-                        local_vars.add(int(token[1:]))
-                    except ValueError:
-                        pass
+        body, local_vars = self.prepare_locals(body)
 
         params = " ".join(f"(param $a{i} i32)" for i in range(argc))
-        result.append(f'(func $f{func_id} (export "f{func_id}") {params} (result i32)')
+        export = f' (export "f{func_id}")' if self.is_exported(f"f{func_id}") else ""
+        result.append(f'(func $f{func_id}{export} {params} (result i32)')
         
-        for v in sorted(local_vars):
+        for v in local_vars:
             result.append(f"  (local $v{v} i32)")
         
-        body_code = self.transpile_block(body, local_vars, is_function=True)
+        body_code = self.transpile_block(body, set(local_vars), is_function=True)
         for line in body_code:
             result.append(f"  {line}")
         
@@ -357,12 +921,37 @@ class Sui2WatTranspiler:
         
         return result
 
+    def transpile_batch_wrapper(self, func_id: int, argc: int) -> list[str]:
+        """
+        Build batch_fN(in, out, n): call fN once per row of an (n, argc) i32
+        array at `in` and store each result in the i32 array at `out`
+        """
+        result = [f'(func $batch_f{func_id} (export "batch_f{func_id}") (param $in i32) (param $out i32) (param $n i32)']
+        result.append("  (local $i i32)")
+        result.append("  (block $done")
+        result.append("    (loop $next")
+        result.append("      (br_if $done (i32.ge_s (local.get $i) (local.get $n)))")
+        result.append("      (i32.add (local.get $out) (i32.mul (local.get $i) (i32.const 4)))")
+        for j in range(argc):
+            result.append(f"      (i32.load (i32.add (local.get $in) (i32.mul (i32.add (i32.mul (local.get $i) (i32.const {argc})) (i32.const {j})) (i32.const 4))))")
+        result.append(f"      (call $f{func_id})")
+        result.append("      (i32.store)")
+        result.append("      (local.set $i (i32.add (local.get $i) (i32.const 1)))")
+        result.append("      (br $next)")
+        result.append("    )")
+        result.append("  )")
+        result.append(")")
+        return result
+
     def transpile(self, code: str) -> str:
         """Transpile Sui code to WAT"""
         self.output = []
         self.used_globals = set()
         self.use_memory = False
         self.functions = {}
+        self.strings = {}
+        self.data_size = 0
+        self.imports = set()
         
         lines_raw = code.strip().split('\n')
         lines = []
@@ -394,65 +983,103 @@ class Sui2WatTranspiler:
                 self.collect_info(body)
             i += 1
 
+        main_lines = []
+        i = 0
+        while i < len(lines):
+            if lines[i][0] == '#':
+                depth = 1
+                i += 1
+                while i < len(lines) and depth > 0:
+                    if lines[i][0] == '#':
+                        depth += 1
+                    elif lines[i][0] == '}':
+                        depth -= 1
+                    i += 1
+            else:
+                main_lines.append(lines[i])
+                i += 1
+
+        if self.exports is not None:
+            self.prune_functions(main_lines)
+
+        self.global_string_vars = {var for var in self.infer_string_vars(lines) if var.startswith('g')}
+
+        # Generate code first so the imports it needs are known
+        function_code = []
+        for func_id, func_info in sorted(self.functions.items()):
+            function_code += self.transpile_function(func_id, func_info['argc'], func_info['body'])
+            function_code.append("")
+            if func_id in self.batch_exports:
+                function_code += self.transpile_batch_wrapper(func_id, func_info['argc'])
+                function_code.append("")
+                self.use_memory = True
+
+        main_lines, main_locals = self.prepare_locals(main_lines)
+        main_code = [f"(local $v{v} i32)" for v in main_locals]
+        main_code += self.transpile_block(main_lines, set(main_locals))
+
+        # Command-line arguments are fetched from the host before the program runs
+        arg_globals = sorted(g for g in self.used_globals if g >= 100)
+        arg_init = []
+        for g in arg_globals:
+            if g == 100:
+                arg_init.append("(call $arg_count)")
+                self.imports.add('arg_count')
+            else:
+                arg_init.append(f"(i32.const {g - 101})")
+                arg_init.append("(call $arg_i32)")
+                self.imports.add('arg_i32')
+            arg_init.append(f"(global.set $g{g})")
+        first_inst = 0
+        while first_inst < len(main_code) and main_code[first_inst].startswith("(local "):
+            first_inst += 1
+        main_code[first_inst:first_inst] = arg_init
+
         self.emit("(module")
         self.indent += 1
 
         self.emit(";; External function imports")
-        self.emit('(import "env" "print_i32" (func $print_i32 (param i32)))')
+        # A pruned module drops print_i32 too when nothing reachable prints
+        if self.exports is None or any("$print_i32" in line for line in function_code + main_code):
+            self.emit('(import "env" "print_i32" (func $print_i32 (param i32)))')
+        for name, decl in HOST_IMPORTS.items():
+            if name in self.imports:
+                self.emit(decl)
         self.emit("")
 
         if self.use_memory:
+            heap_start = (self.data_size + 15) // 16 * 16
+            pages = max(1, -(-heap_start // 65536))
             self.emit(";; Linear memory for arrays")
-            self.emit("(memory 1)")
-            self.emit("(global $heap_ptr (mut i32) (i32.const 0))")
+            self.emit(f"(memory {pages})")
+            self.emit('(export "memory" (memory 0))')
+            self.emit(f"(global $heap_ptr (export \"heap_ptr\") (mut i32) (i32.const {heap_start}))")
+            if self.strings:
+                self.emit(";; String literals (length-prefixed UTF-8)")
+                self.emit(self.data_segment())
             self.emit("")
 
         if self.used_globals:
             self.emit(";; Global variables")
             for g in sorted(self.used_globals):
-                self.emit(f"(global $g{g} (export \"g{g}\") (mut i32) (i32.const 0))")
+                export = f' (export "g{g}")' if self.is_exported(f"g{g}") else ""
+                self.emit(f"(global $g{g}{export} (mut i32) (i32.const 0))")
+            self.emit("")
+
+        if self.checked:
+            for line in CHECKED_HELPERS + (CHECKED_ARRAY_HELPERS if self.use_memory else []):
+                self.emit(line)
             self.emit("")
 
         if self.functions:
             self.emit(";; Function definitions")
-            for func_id, func_info in sorted(self.functions.items()):
-                func_lines = self.transpile_function(func_id, func_info['argc'], func_info['body'])
-                for line in func_lines:
-                    self.emit(line)
-                self.emit("")
+            for line in function_code:
+                self.emit(line)
 
         self.emit(";; Main function")
         self.emit("(func $main (export \"main\") (result i32)")
         self.indent += 1
-
-        main_locals: set[int] = set()
-        main_lines = []
-        i = 0
-        while i < len(lines):
-            if lines[i][0] == '#':
-                depth = 1
-                i += 1
-                while i < len(lines) and depth > 0:
-                    if lines[i][0] == '#':
-                        depth += 1
-                    elif lines[i][0] == '}':
-                        depth -= 1
-                    i += 1
-            else:
-                main_lines.append(lines[i])
-                for token in lines[i]:
-                    if token.startswith('v'):
-                        try:
-                            main_locals.add(int(token[1:]))
-                        except ValueError:
-                            pass
-                i += 1
-
-        for v in sorted(main_locals):
-            self.emit(f"(local $v{v} i32)")
-
-        body_code = self.transpile_block(main_lines, main_locals)
-        for line in body_code:
+        for line in main_code:
             self.emit(line)
 
         self.emit("(i32.const 0)")
@@ -465,11 +1092,33 @@ class Sui2WatTranspiler:
         return '\n'.join(self.output)
 
 
-def compile_to_wasm(sui_code: str) -> bytes | None:
-    """Compile Sui code to Wasm binary"""
-    transpiler = Sui2WatTranspiler()
-    wat_code = transpiler.transpile(sui_code)
-    
+def read_leb128(data: bytes, pos: int) -> tuple[int, int]:
+    """Read an unsigned LEB128 integer, returning (value, next position)"""
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, pos
+
+
+def strip_custom_sections(wasm_bytes: bytes) -> bytes:
+    """Remove custom sections (names, producers, ...) from a Wasm binary"""
+    out = bytearray(wasm_bytes[:8])
+    pos = 8
+    while pos < len(wasm_bytes):
+        section_id = wasm_bytes[pos]
+        size, body = read_leb128(wasm_bytes, pos + 1)
+        if section_id != 0:
+            out += wasm_bytes[pos:body + size]
+        pos = body + size
+    return bytes(out)
+
+
+def wat_to_wasm(wat_code: str, keep_names: bool = False) -> bytes | None:
+    """Assemble WAT with wat2wasm, falling back to wasmtime if installed"""
     try:
         with tempfile.NamedTemporaryFile(mode='w', suffix='.wat', delete=False) as f:
             f.write(wat_code)
@@ -477,11 +1126,10 @@ def compile_to_wasm(sui_code: str) -> bytes | None:
         
         wasm_path = wat_path.replace('.wat', '.wasm')
         
-        result = subprocess.run(
-            ['wat2wasm', wat_path, '-o', wasm_path],
-            capture_output=True,
-            text=True
-        )
+        command = ['wat2wasm', wat_path, '-o', wasm_path]
+        if keep_names:
+            command.append('--debug-names')
+        result = subprocess.run(command, capture_output=True, text=True)
         
         if result.returncode != 0:
             print(f"Error: wat2wasm failed: {result.stderr}", file=sys.stderr)
@@ -493,15 +1141,31 @@ def compile_to_wasm(sui_code: str) -> bytes | None:
         os.unlink(wat_path)
         os.unlink(wasm_path)
         
-        return wasm_bytes
-        
     except FileNotFoundError:
-        print("Error: wat2wasm not found. Install wabt: brew install wabt", file=sys.stderr)
-        return None
+        os.unlink(wat_path)
+        try:
+            import wasmtime
+        except ImportError:
+            print("Error: wat2wasm not found. Install wabt: brew install wabt", file=sys.stderr)
+            return None
+        try:
+            wasm_bytes = wasmtime.wat2wasm(wat_code)
+        except Exception as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return None
     except Exception as e:
         print(f"Error: {e}", file=sys.stderr)
         return None
 
+    return wasm_bytes if keep_names else strip_custom_sections(wasm_bytes)
+
+
+def compile_to_wasm(sui_code: str, simd: bool = True, batch_exports: Iterable[int] = (),
+                    exports: Optional[Iterable[str]] = None, keep_names: bool = False) -> bytes | None:
+    """Compile Sui code to Wasm binary"""
+    transpiler = Sui2WatTranspiler(simd=simd, batch_exports=batch_exports, exports=exports)
+    return wat_to_wasm(transpiler.transpile(sui_code), keep_names=keep_names)
+
 
 def main():
     if len(sys.argv) >= 2 and sys.argv[1] in ('--version', '-V'):
@@ -509,16 +1173,20 @@ def main():
         return
     
     if len(sys.argv) < 2 or sys.argv[1] in ['-h', '--help']:
-        print("Usage: sui2wasm <input.sui> [-o <output.wasm>]")
+        print("Usage: sui2wasm <input.sui> [-o <output.wasm>] [--no-simd] [--batch f0,f1] [--exports=f0,g0]")
         print()
         print("Compile Sui code to WebAssembly binary.")
         print()
         print("Options:")
         print("  -o FILE      Output file (default: input.wasm)")
+        print("  --no-simd    Don't vectorize array loops (for engines without SIMD)")
+        print("  --batch LIST Export batch_fN(in, out, n) wrappers for these functions")
+        print("  --exports=LIST  Export only these functions/globals; drop unreachable code")
+        print("  --keep-names Keep the debug name section")
         print("  --version    Show version")
         print()
         print("Requirements:")
-        print("  wat2wasm     Install via: brew install wabt")
+        print("  wat2wasm     Install via: brew install wabt (or pip install sui-lang[wasm])")
         sys.exit(0 if '-h' in sys.argv or '--help' in sys.argv else 1)
     
     input_file = sys.argv[1]
@@ -536,7 +1204,25 @@ def main():
         print(f"Error: File not found: {input_file}", file=sys.stderr)
         sys.exit(1)
     
-    wasm_bytes = compile_to_wasm(sui_code)
+    batch_exports = []
+    if '--batch' in sys.argv:
+        idx = sys.argv.index('--batch')
+        if idx + 1 < len(sys.argv):
+            batch_exports = [int(name.lstrip('f')) for name in sys.argv[idx + 1].split(',') if name]
+
+    exports = None
+    for arg in sys.argv[2:]:
+        if arg.startswith('--exports='):
+            exports = [name for name in arg.split('=', 1)[1].split(',') if name]
+            for name in exports:
+                if name[:1] not in ('f', 'g') or not name[1:].isdigit():
+                    print(f"Error: Invalid export name: {name} (expected fN or gN)", file=sys.stderr)
+                    sys.exit(1)
+
+    simd = '--no-simd' not in sys.argv
+    keep_names = '--keep-names' in sys.argv
+    wasm_bytes = compile_to_wasm(sui_code, simd=simd, batch_exports=batch_exports,
+                                 exports=exports, keep_names=keep_names)
     
     if wasm_bytes is None:
         sys.exit(1)
@@ -544,7 +1230,12 @@ def main():
     with open(output_file, 'wb') as f:
         f.write(wasm_bytes)
     
-    print(f"✓ Compiled to {output_file} ({len(wasm_bytes)} bytes)")
+    if exports is None:
+        print(f"✓ Compiled to {output_file} ({len(wasm_bytes)} bytes)")
+    else:
+        full_bytes = compile_to_wasm(sui_code, simd=simd, batch_exports=batch_exports, keep_names=keep_names)
+        before = len(full_bytes) if full_bytes else 0
+        print(f"✓ Compiled to {output_file} ({before} -> {len(wasm_bytes)} bytes)")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Sui (粋) Batch Runner
+Run many Sui programs across a process pool, reading jobs and writing
+results as JSON lines
+"""
+
+import importlib.util
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Iterable, Iterator, Optional, TextIO
+
+from sui import Limits, SuiInterpreter, TimeLimitExceeded, get_version
+
+# Seconds a job may run before it is stopped (`sui batch --timeout`)
+DEFAULT_TIMEOUT = 10.0
+
+
+def output_matches(output: list, expected: Any) -> bool:
+    """Compare output values with a job's expected list, or with its text (one value per line)"""
+    if isinstance(expected, list):
+        return output == expected
+    return '\n'.join(str(value) for value in output) == str(expected).rstrip('\n')
+
+
+def pool_context():
+    """
+    Start method for worker pools in processes that also run threads: a fork
+    server (spawn where there is none) rather than forking a process whose
+    locks a child could inherit held
+    """
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    context = multiprocessing.get_context(method)
+    if method == 'forkserver':
+        wasm = ['suiwasm'] if importlib.util.find_spec('wasmtime') else []
+        context.set_forkserver_preload(['sui', 'suibatch'] + wasm)
+    return context
+
+
+_wasm = None
+
+
+def wasm_runtime():
+    """This process's SuiWasmRuntime, created on first use and then reused"""
+    global _wasm
+    if _wasm is None:
+        from suiwasm import SuiWasmRuntime
+        _wasm = SuiWasmRuntime(output='capture')
+    return _wasm
+
+
+def run_job(job: dict, timeout: Optional[float] = DEFAULT_TIMEOUT) -> dict:
+    """
+    Run one job {id, code, args, stdin, expected, backend, limits} in a worker
+    process; limits holds Limits fields for the interp backend.
+    Errors and timeouts are reported in the result instead of raised. The
+    timeout is checked by the interpreter itself (wasmtime's epoch deadline
+    for wasm jobs), so it needs no signals and works on every platform.
+    """
+    interp = None
+    output: list = []
+    steps = 0
+    result = {"id": job.get("id"), "status": "ok"}
+    backend = job.get("backend", "interp")
+    start = time.perf_counter()
+    try:
+        code = job.get("code")
+        if not isinstance(code, str):
+            raise ValueError(job.get("error", 'expected a JSON object with a "code" string'))
+        stdin = job.get("stdin")
+        if not isinstance(stdin, (str, list, type(None))):
+            raise ValueError('"stdin" must be a string or a list')
+        if backend == 'wasm':
+            if isinstance(stdin, list):
+                stdin = ''.join(f"{value}\n" for value in stdin)
+            run = wasm_runtime().run_sandboxed(code, timeout=timeout, args=job.get("args") or [],
+                                               stdin=stdin or "")
+            output, steps = run.output, None
+            if run.status != 'ok':
+                result["status"] = "timeout" if run.status == 'timeout' else "error"
+                result["error"] = run.error
+        elif backend == 'interp':
+            limits = job.get("limits")
+            if not isinstance(limits, (dict, type(None))):
+                raise ValueError('"limits" must be an object, e.g. {"steps": 100000}')
+            interp = SuiInterpreter(output='capture', input=io.StringIO(stdin) if isinstance(stdin, str) else stdin or [],
+                                    limits=Limits(**limits) if limits else None, timeout=timeout)
+            interp.run(code, args=job.get("args") or [])
+        else:
+            raise ValueError(f"unknown backend: {backend} (expected interp or wasm)")
+    except TimeLimitExceeded:
+        result["status"] = "timeout"
+        result["error"] = f"timed out after {timeout}s"
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["elapsed"] = round(time.perf_counter() - start, 6)
+    if interp is not None:
+        output, steps = interp.output, interp.steps
+    result["steps"] = steps
+    result["output"] = output
+    if "expected" in job:
+        result["match"] = result["status"] == "ok" and output_matches(output, job["expected"])
+    return result
+
+
+def job_key(job: dict, cache) -> Optional[str]:
+    """The job's cache key, or None if it can't be cached"""
+    code = job.get("code")
+    if not isinstance(code, str):
+        return None
+    try:
+        return cache.key(code, args=job.get("args"), stdin=job.get("stdin"),
+                         backend=job.get("backend", "interp"), limits=job.get("limits"))
+    except (ValueError, TypeError):
+        return None
+
+
+def cached_result(job: dict, stored: dict) -> dict:
+    """A result for `job` from a stored one, checked against the job's own expected output"""
+    result = {"id": job.get("id"), **{name: stored.get(name) for name in ("status", "error", "elapsed", "steps", "output")},
+              "cached": True}
+    if "expected" in job:
+        result["match"] = result["status"] == "ok" and output_matches(result["output"], job["expected"])
+    return result
+
+
+def iter_jobs(source: str) -> Iterator[dict]:
+    """Yield jobs from a JSONL file ('-' for stdin); ids default to the line number"""
+    stream = sys.stdin if source == '-' else open(source, 'r', encoding='utf-8')
+    try:
+        for line_no, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                job = json.loads(line)
+            except ValueError as e:
+                job = {"error": f"bad JSON: {e}"}
+            if not isinstance(job, dict):
+                job = {"error": 'expected a JSON object with a "code" string'}
+            job.setdefault("id", line_no)
+            # A bad record is passed on without code so it is reported like any other failure
+            yield job
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def run_batch(jobs: Iterable[dict], out: TextIO, workers: Optional[int] = None,
+              timeout: Optional[float] = DEFAULT_TIMEOUT, cache=None) -> dict[str, int]:
+    """
+    Run jobs across a process pool, writing one JSON result per line in
+    input order. Returns the number of results per status. With a
+    suicache.ResultCache, jobs seen before are answered without running and
+    finished ok/error results are stored (timeouts and crashes are not).
+    """
+    workers = workers or os.cpu_count() or 1
+    window = workers * 4  # jobs in flight; keeps memory flat on long streams
+    jobs = iter(jobs)
+    counts: dict[str, int] = {}
+    pending: deque = deque()
+    running: dict[str, Future] = {}  # cache key -> future, so repeats in flight run once
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        while True:
+            while len(pending) < window:
+                job = next(jobs, None)
+                if job is None:
+                    break
+                key = job_key(job, cache) if cache is not None else None
+                shared = key in running
+                stored = cache.get(key) if key is not None and not shared else None
+                if shared:
+                    future = running[key]
+                elif stored is not None:
+                    future = Future()
+                    future.set_result(cached_result(job, stored))
+                else:
+                    future = executor.submit(run_job, job, timeout)
+                    if key is not None:
+                        running[key] = future
+                pending.append((job, key, future, shared))
+            if not pending:
+                break
+
+            job, key, future, shared = pending.popleft()
+            if running.get(key) is future and not shared:
+                del running[key]
+            try:
+                result = future.result()
+                if shared:
+                    result = cached_result(job, result)
+            except BrokenProcessPool:
+                # A worker died (e.g. out of memory); record it and start a fresh pool
+                result = {"id": job.get("id"), "status": "crash", "error": "worker process crashed",
+                          "elapsed": None, "steps": None, "output": []}
+                if "expected" in job:
+                    result["match"] = False
+                executor.shutdown(cancel_futures=True)
+                executor = ProcessPoolExecutor(max_workers=workers)
+                retry = list(pending)
+                pending.clear()
+                running.clear()
+                for queued, queued_key, queued_future, queued_shared in retry:
+                    finished = (queued_future.done() and not queued_future.cancelled()
+                                and queued_future.exception() is None)
+                    if not finished:
+                        queued_future, queued_shared = executor.submit(run_job, queued, timeout), False
+                    pending.append((queued, queued_key, queued_future, queued_shared))
+            if key is not None and not result.get("cached") and result["status"] in ('ok', 'error'):
+                cache.put(key, {name: result.get(name) for name in ("status", "error", "elapsed", "steps", "output")})
+
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+            if result.get("match") is False:
+                counts["mismatch"] = counts.get("mismatch", 0) + 1
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+    finally:
+        executor.shutdown(cancel_futures=True)
+    return counts
+
+
+def main(args: Optional[list[str]] = None):
+    args = sys.argv[1:] if args is None else args
+    if args and args[0] in ('--version', '-V'):
+        print(f"sui-lang {get_version()}")
+        return
+
+    if not args or args[0] in ('--help', '-h'):
+        print("Sui (粋) Batch Runner")
+        print("=" * 50)
+        print("")
+        print("Usage:")
+        print("  sui batch <jobs.jsonl|-> [-o out.jsonl] [--workers N] [--timeout SEC]")
+        print("            [--cache | --cache-dir DIR] [--cache-size MB]")
+        print("  sui batch <jobs.jsonl|-> --coordinator [--listen HOST:PORT] [options above]")
+        print("                                   # Hand jobs out to workers over TCP")
+        print("  sui batch --worker HOST:PORT [--workers N]")
+        print("                                   # Run jobs for a coordinator (default port 7879)")
+        print("")
+        print('Each input line is a job: {"id": ..., "code": "...", "args": [...],')
+        print('"stdin": "..." or [...], "expected": [...] or "...", "backend": "interp" or "wasm",')
+        print('"limits": {"steps", "array_cells", "depth", "output"}}.')
+        print('Each output line is')
+        print('{"id", "status": ok|error|timeout|crash, "output", "match", "steps", "elapsed"}')
+        print(f"in input order. Jobs are stopped after --timeout seconds (default {DEFAULT_TIMEOUT:g}).")
+        print("With --cache, jobs whose normalized code, args, stdin, backend and limits")
+        print('were run before are answered from disk ("cached": true); see sui cache --help.')
+        return
+
+    workers = None
+    timeout = DEFAULT_TIMEOUT
+    out = sys.stdout
+    cache = None
+    try:
+        if '--workers' in args:
+            workers = int(args[args.index('--workers') + 1])
+        if '--timeout' in args:
+            timeout = float(args[args.index('--timeout') + 1])
+        if '--cache' in args or '--cache-dir' in args or '--cache-size' in args:
+            from suicache import DEFAULT_CACHE_BYTES, ResultCache
+            cache = ResultCache(
+                args[args.index('--cache-dir') + 1] if '--cache-dir' in args else None,
+                int(float(args[args.index('--cache-size') + 1]) * 1024 * 1024) if '--cache-size' in args
+                else DEFAULT_CACHE_BYTES
+            )
+    except (IndexError, ValueError):
+        print("Error: --workers takes an integer, --timeout a number of seconds,"
+              " --cache-dir a directory and --cache-size megabytes", file=sys.stderr)
+        sys.exit(1)
+    if '--worker' in args:
+        import suidist
+        try:
+            worker = suidist.Worker(suidist.parse_address(args[args.index('--worker') + 1]), workers)
+            worker.run()
+        except (IndexError, ValueError, OSError) as e:
+            print(f"Error: --worker needs a reachable coordinator HOST:PORT ({e})", file=sys.stderr)
+            sys.exit(1)
+        print(f"✓ Ran {worker.ran} jobs", file=sys.stderr)
+        return
+    if '-o' in args:
+        out = open(args[args.index('-o') + 1], 'w', encoding='utf-8')
+
+    start = time.perf_counter()
+    try:
+        if '--coordinator' in args:
+            import suidist
+            listen = args[args.index('--listen') + 1] if '--listen' in args else f":{suidist.DEFAULT_PORT}"
+            coordinator = suidist.Coordinator(iter_jobs(args[0]), out, suidist.parse_address(listen), timeout, cache)
+            host, port = coordinator.address
+            print(f"[sui] coordinating on {host}:{port}; start workers with: sui batch --worker HOST:{port}",
+                  file=sys.stderr)
+            counts = coordinator.run()
+        else:
+            counts = run_batch(iter_jobs(args[0]), out, workers, timeout, cache)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    total = sum(n for status, n in counts.items() if status != 'mismatch')
+    failed = ', '.join(f"{n} {status}" for status, n in sorted(counts.items()) if status != 'ok')
+    hits = f", {cache.hits} from cache" if cache is not None else ""
+    print(f"✓ Ran {total} jobs in {time.perf_counter() - start:.2f}s"
+          f" ({failed or 'all ok'}{hits})", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Sui (粋) Result Cache
+Content-addressed on-disk cache of run results, keyed on a canonical form of
+the program plus everything else that decides its output
+"""
+
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Any, Optional, Union
+
+from sui import SuiInterpreter, canonical_lines, get_version
+
+# Total size of cached results before the least recently used are evicted
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+
+# Bumped when the entry format or the canonical form changes
+CACHE_FORMAT = 2
+
+
+def default_cache_dir() -> str:
+    """$SUI_CACHE_DIR, else $XDG_CACHE_HOME/sui/results (~/.cache by default)"""
+    if os.environ.get('SUI_CACHE_DIR'):
+        return os.environ['SUI_CACHE_DIR']
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'sui', 'results')
+
+
+def normalize(code: Union[str, list[list[str]]]) -> str:
+    """Canonical text of a program (as `sui --canonicalize` prints it), used in cache keys"""
+    lines = SuiInterpreter(output='null').parse(code) if isinstance(code, str) else code
+    return '\n'.join(' '.join(tokens) for tokens in canonical_lines(lines))
+
+
+class ResultCache:
+    """
+    Results stored as JSON files named by key under `path`.
+
+    Hits refresh an entry's modification time and, once the cache grows past
+    `max_bytes`, the entries used longest ago are removed. Writes are atomic,
+    so several processes can share a directory.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = DEFAULT_CACHE_BYTES):
+        self.path = path or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.total: Optional[int] = None  # bytes on disk, counted on the first store
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, code: Union[str, list[list[str]]], args: Optional[list] = None, stdin: Any = None,
+            backend: str = 'interp', limits: Any = None) -> str:
+        """
+        SHA-256 of the normalized program and everything else a run depends on.
+        `limits` is a sui.Limits or a dict of its fields. Raises ValueError if
+        the program can't be normalized (e.g. a non-numeric label).
+        """
+        if limits is not None and not isinstance(limits, dict):
+            limits = vars(limits)
+        record = {
+            "format": CACHE_FORMAT,
+            "version": get_version(),
+            "code": normalize(code),
+            "args": list(args or []),
+            "stdin": stdin,
+            "backend": backend,
+            "limits": {name: value for name, value in (limits or {}).items() if value is not None},
+        }
+        return hashlib.sha256(json.dumps(record, sort_keys=True, default=repr).encode('utf-8')).hexdigest()
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, key[:2], key[2:] + '.json')
+
+    def get(self, key: str) -> Optional[dict]:
+        """The stored result, or None"""
+        path = self._file(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                result = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def put(self, key: str, result: dict):
+        """Store a result (anything json can write), then evict if over size"""
+        try:
+            data = json.dumps(result, ensure_ascii=False).encode('utf-8')
+        except (TypeError, ValueError):
+            return
+        path = self._file(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp = f"{path}.{os.getpid()}.tmp"
+        with open(temp, 'wb') as f:
+            f.write(data)
+        os.replace(temp, path)
+        if self.total is None:
+            self.total = sum(size for _, _, size in self.entries())
+        else:
+            self.total += len(data)
+        if self.total > self.max_bytes:
+            self.evict()
+
+    def entries(self) -> list[tuple[float, str, int]]:
+        """(last use, path, size) of every stored result"""
+        found = []
+        if not os.path.isdir(self.path):
+            return found
+        for shard in os.scandir(self.path):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith('.json'):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    found.append((stat.st_mtime, entry.path, stat.st_size))
+        return found
+
+    def evict(self):
+        """Remove least recently used results until the cache is 90% of max_bytes"""
+        entries = sorted(self.entries())
+        total = sum(size for _, _, size in entries)
+        target = self.max_bytes * 0.9
+        for _, path, size in entries:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+        self.total = total
+
+    def clear(self):
+        """Remove every stored result"""
+        for _, path, _ in self.entries():
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        self.total = 0
+
+
+def main(args: Optional[list[str]] = None):
+    args = sys.argv[1:] if args is None else args
+    if args and args[0] in ('--version', '-V'):
+        print(f"sui-lang {get_version()}")
+        return
+
+    if not args or args[0] in ('--help', '-h'):
+        print("Sui (粋) Result Cache")
+        print("=" * 50)
+        print("")
+        print("Usage:")
+        print("  sui cache stats [DIR]      # Entries, size and location")
+        print("  sui cache clear [DIR]      # Remove every cached result")
+        print("  sui cache key <file.sui>   # Show the normalized program and its key")
+        print("")
+        print(f"DIR defaults to $SUI_CACHE_DIR, else {default_cache_dir()}")
+        return
+
+    command = args[0]
+    if command == 'key' and len(args) > 1:
+        with open(args[1], 'r') as f:
+            code = f.read()
+        print(normalize(code))
+        print(f"; key {ResultCache().key(code, args=args[2:])}")
+        return
+
+    cache = ResultCache(args[1] if len(args) > 1 else None)
+    if command == 'stats':
+        entries = cache.entries()
+        newest = max((used for used, _, _ in entries), default=None)
+        print(f"{cache.path}: {len(entries)} results, {sum(size for _, _, size in entries) / 1024:.1f} KiB"
+              + (f", last used {time.ctime(newest)}" if newest else ""))
+    elif command == 'clear':
+        cache.clear()
+        print(f"✓ Cleared {cache.path}")
+    else:
+        print(f"Unknown cache command: {command} (expected stats, clear or key)", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Sui (粋) Distributed Batch
+Run a `sui batch` job stream on workers across many hosts: a coordinator
+hands out shards of jobs over TCP and writes the results in input order
+"""
+
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterable, Optional, TextIO
+
+from suibatch import DEFAULT_TIMEOUT, cached_result, job_key, pool_context, run_job
+
+DEFAULT_PORT = 7879
+
+# Jobs read ahead of the last result written; keeps the coordinator's memory flat
+WINDOW = 8192
+
+# A job whose workers are lost this many times is reported as a crash
+MAX_ATTEMPTS = 3
+
+# Seconds an idle worker waits before asking for work again
+IDLE_WAIT = 0.05
+
+
+def parse_address(text: str) -> tuple[str, int]:
+    """'HOST:PORT', ':PORT' or 'HOST' as a (host, port) pair"""
+    host, _, port = text.rpartition(':') if ':' in text else (text, '', str(DEFAULT_PORT))
+    return host or '127.0.0.1', int(port)
+
+
+class Coordinator:
+    """
+    Hands out jobs to workers and merges their results.
+
+    Workers pull shards of jobs ({"op": "take"}) and send back one
+    {"op": "result"} per job. A worker that asks for work when none is queued
+    steals half of the jobs the busiest worker holds beyond what it is
+    running; the victim is told to drop them in its next reply, and whichever
+    result arrives first is kept. Jobs held by a worker whose connection
+    drops (or goes silent) are queued again.
+    """
+
+    def __init__(self, jobs: Iterable[dict], out: TextIO, address: tuple[str, int] = ('127.0.0.1', DEFAULT_PORT),
+                 timeout: Optional[float] = DEFAULT_TIMEOUT, cache=None, window: int = WINDOW):
+        self.jobs = iter(jobs)
+        self.out = out
+        self.timeout = timeout
+        self.cache = cache
+        self.window = window
+        self.cond = threading.Condition()
+        self.queue: deque = deque()  # sequence numbers waiting for a worker
+        self.pending: dict[int, dict] = {}  # seq -> job, until its result is written
+        self.keys: dict[int, str] = {}
+        self.results: dict[int, dict] = {}
+        self.holder: dict[int, str] = {}  # seq -> worker it was last handed to
+        self.held: dict[str, list[int]] = {}  # worker -> seqs in the order handed out
+        self.slots: dict[str, int] = {}
+        self.revoked: dict[str, list[int]] = {}
+        self.attempts: dict[int, int] = {}
+        self.read = 0
+        self.written = 0
+        self.exhausted = False
+        self.done = False
+        self.counts: dict[str, int] = {}
+        self.stolen = 0
+        self.retried = 0
+
+        handler = type('Handler', (_CoordinatorHandler,), {'coordinator': self})
+        self.server = socketserver.ThreadingTCPServer(address, handler)
+        self.server.daemon_threads = True
+
+    @property
+    def address(self) -> tuple[str, int]:
+        """The bound address (useful with port 0)"""
+        return self.server.server_address
+
+    def handle(self, worker: str, request: dict) -> dict:
+        """Answer one request from a worker"""
+        op = request.get("op")
+        with self.cond:
+            if op == "hello":
+                self.held.setdefault(worker, [])
+                self.slots[worker] = max(1, int(request.get("slots", 1)))
+                return {"timeout": self.timeout}
+            if op == "take":
+                jobs = self.take(worker, max(1, int(request.get("n", 1))))
+                response = {"jobs": jobs}
+            elif op == "result":
+                self.finish(worker, int(request["seq"]), request["result"])
+                response = {}
+            else:
+                return {"error": f"unknown op: {op} (expected hello, take or result)"}
+            response["cancel"] = self.revoked.pop(worker, [])
+            response["done"] = self.done
+            return response
+
+    def assign(self, worker: str, seq: int):
+        self.holder[seq] = worker
+        self.held.setdefault(worker, []).append(seq)
+
+    def take(self, worker: str, n: int) -> list:
+        """Up to n [seq, job] pairs for a worker, from the queue or stolen"""
+        taken = []
+        while self.queue and len(taken) < n:
+            seq = self.queue.popleft()
+            if seq in self.pending and seq not in self.results:
+                self.assign(worker, seq)
+                taken.append(seq)
+        if not taken and not self.done:
+            # Steal from the tail (the jobs handed out last, so least likely started)
+            surplus = {other: seqs[self.slots.get(other, 1):] for other, seqs in self.held.items() if other != worker}
+            victim = max(surplus, key=lambda other: len(surplus[other]), default=None)
+            if victim is not None and surplus[victim]:
+                count = min(n, (len(surplus[victim]) + 1) // 2)
+                for seq in surplus[victim][-count:]:
+                    self.held[victim].remove(seq)
+                    self.revoked.setdefault(victim, []).append(seq)
+                    self.assign(worker, seq)
+                    taken.append(seq)
+                self.stolen += count
+        return [[seq, self.pending[seq]] for seq in taken]
+
+    def finish(self, worker: str, seq: int, result: dict):
+        """Record a result; later results for the same job are ignored"""
+        if seq in self.held.get(worker, []):
+            self.held[worker].remove(seq)
+        if seq in self.pending and seq not in self.results:
+            result["id"] = self.pending[seq].get("id")
+            self.results[seq] = result
+            holder = self.holder.pop(seq, None)
+            if holder is not None and holder != worker and seq in self.held.get(holder, []):
+                self.held[holder].remove(seq)
+                self.revoked.setdefault(holder, []).append(seq)
+            self.cond.notify_all()
+
+    def lost(self, worker: str):
+        """Queue again the unfinished jobs of a worker that went away"""
+        with self.cond:
+            seqs = [seq for seq in self.held.pop(worker, []) if seq in self.pending and seq not in self.results]
+            self.slots.pop(worker, None)
+            self.revoked.pop(worker, None)
+            for seq in reversed(seqs):
+                self.holder.pop(seq, None)
+                self.attempts[seq] = self.attempts.get(seq, 0) + 1
+                if self.attempts[seq] >= MAX_ATTEMPTS:
+                    job = self.pending[seq]
+                    self.results[seq] = {"id": job.get("id"), "status": "crash",
+                                         "error": f"lost {MAX_ATTEMPTS} workers while running this job",
+                                         "elapsed": None, "steps": None, "output": []}
+                    if "expected" in job:
+                        self.results[seq]["match"] = False
+                else:
+                    self.queue.appendleft(seq)
+                    self.retried += 1
+            self.cond.notify_all()
+
+    def _read_ahead(self):
+        while not self.exhausted and self.read - self.written < self.window:
+            job = next(self.jobs, None)
+            if job is None:
+                self.exhausted = True
+                break
+            seq = self.read
+            self.read += 1
+            self.pending[seq] = job
+            key = job_key(job, self.cache) if self.cache is not None else None
+            stored = self.cache.get(key) if key is not None else None
+            if stored is not None:
+                self.results[seq] = cached_result(job, stored)
+                continue
+            if key is not None:
+                self.keys[seq] = key
+            self.queue.append(seq)
+
+    def _write_ready(self):
+        while self.written in self.results:
+            seq = self.written
+            result = self.results.pop(seq)
+            job = self.pending.pop(seq)
+            key = self.keys.pop(seq, None)
+            if "expected" in job and "match" not in result:
+                result["match"] = False
+            if key is not None and result["status"] in ('ok', 'error'):
+                self.cache.put(key, {name: result.get(name) for name in ("status", "error", "elapsed", "steps", "output")})
+            self.counts[result["status"]] = self.counts.get(result["status"], 0) + 1
+            if result.get("match") is False:
+                self.counts["mismatch"] = self.counts.get("mismatch", 0) + 1
+            self.out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            self.written += 1
+        self.out.flush()
+
+    def run(self) -> dict[str, int]:
+        """Serve workers until every job has a result; returns the number of results per status"""
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        try:
+            with self.cond:
+                while True:
+                    self._read_ahead()
+                    self._write_ready()
+                    if self.exhausted and self.written == self.read:
+                        break
+                    self.cond.wait(1.0)
+                self.done = True
+                # Give connected workers a moment to hear that the batch is over
+                deadline = time.monotonic() + 2.0
+                while self.held and time.monotonic() < deadline:
+                    self.cond.wait(0.1)
+        finally:
+            self.server.shutdown()
+            self.server.server_close()
+        return self.counts
+
+
+class _CoordinatorHandler(socketserver.StreamRequestHandler):
+    """One worker connection: a JSON response line for each request line"""
+
+    coordinator: Coordinator
+
+    def handle(self):
+        worker = f"{self.client_address[0]}:{self.client_address[1]}"
+        timeout = self.coordinator.timeout
+        # A worker sends at least one line per finished job, so a long silence means it is gone
+        self.request.settimeout(None if timeout is None else timeout * 2 + 30)
+        try:
+            for line in self.rfile:
+                try:
+                    request = json.loads(line)
+                    response = self.coordinator.handle(worker, request)
+                except (ValueError, KeyError, TypeError) as e:
+                    response = {"error": f"bad request: {e}"}
+                self.wfile.write((json.dumps(response, ensure_ascii=False) + "\n").encode('utf-8'))
+                self.wfile.flush()
+                if response.get("done"):
+                    break
+        except OSError:
+            pass
+        finally:
+            self.coordinator.lost(worker)
+
+
+class Worker:
+    """Connects to a coordinator and runs the jobs it hands out in a local process pool"""
+
+    def __init__(self, address: tuple[str, int], slots: Optional[int] = None):
+        self.address = address
+        self.slots = slots or os.cpu_count() or 1
+        self.ran = 0
+
+    def run(self):
+        """Work until the coordinator reports the batch done or goes away"""
+        sock = socket.create_connection(self.address)
+        stream = sock.makefile('rwb')
+
+        def request(obj: dict) -> dict:
+            stream.write(json.dumps(obj, ensure_ascii=False).encode('utf-8') + b"\n")
+            stream.flush()
+            line = stream.readline()
+            if not line:
+                raise ConnectionError("coordinator closed the connection")
+            return json.loads(line)
+
+        executor = ProcessPoolExecutor(max_workers=self.slots, mp_context=pool_context())
+        local: deque = deque()
+        running: dict = {}  # future -> (seq, job)
+        try:
+            timeout = request({"op": "hello", "slots": self.slots}).get("timeout")
+            done = False
+
+            def apply(response: dict):
+                nonlocal done
+                done = done or response.get("done", False)
+                for seq in response.get("cancel", []):
+                    for queued in [item for item in local if item[0] == seq]:
+                        local.remove(queued)
+                    for future, (running_seq, _) in list(running.items()):
+                        if running_seq == seq and future.cancel():
+                            del running[future]
+
+            while not done:
+                if len(local) < self.slots:
+                    response = request({"op": "take", "n": 2 * self.slots - len(local) - len(running)})
+                    local.extend(tuple(item) for item in response.get("jobs", []))
+                    apply(response)
+                while local and len(running) < self.slots:
+                    seq, job = local.popleft()
+                    running[executor.submit(run_job, job, timeout)] = (seq, job)
+                if not running:
+                    if not done:
+                        time.sleep(IDLE_WAIT)
+                    continue
+                finished, _ = wait(running, timeout=IDLE_WAIT if len(local) < self.slots else None,
+                                   return_when=FIRST_COMPLETED)
+                for future in finished:
+                    if future not in running:
+                        continue  # queued again after the pool broke
+                    seq, _ = running.pop(future)
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool:
+                        # A job killed its process; report it and rerun the others in a fresh pool
+                        result = {"status": "crash", "error": "worker process crashed",
+                                  "elapsed": None, "steps": None, "output": []}
+                        executor.shutdown(cancel_futures=True)
+                        executor = ProcessPoolExecutor(max_workers=self.slots, mp_context=pool_context())
+                        local.extendleft(reversed(list(running.values())))
+                        running.clear()
+                    self.ran += 1
+                    apply(request({"op": "result", "seq": seq, "result": result}))
+        except (ConnectionError, OSError):
+            # The coordinator finished (or died); either way there is nothing left to do here
+            pass
+        finally:
+            executor.shutdown(cancel_futures=True)
+            stream.close()
+            sock.close()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Sui (粋) Execution Server
+Keep warm worker processes and run Sui programs sent as JSON lines over a
+Unix socket or localhost TCP
+"""
+
+import importlib.util
+import json
+import math
+import os
+import signal
+import socketserver
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from sui import get_version
+from suibatch import DEFAULT_TIMEOUT, pool_context, run_job
+
+DEFAULT_PORT = 7878
+
+# Latencies kept for the stats percentiles, and the window runs/s is measured over
+LATENCY_WINDOW = 10_000
+RATE_WINDOW = 10.0
+
+
+def warm_worker():
+    """Pool initializer: import the runtimes and compile once so the first run is fast"""
+    run_job({"code": ". 0"})
+    if importlib.util.find_spec('wasmtime') is not None:
+        run_job({"code": ". 0", "backend": "wasm"})
+
+
+def percentile(values: list[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of a list (None if empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class SuiServer:
+    """
+    JSON-lines execution server.
+
+    Each request line is {"op": "run", ...job} (see suibatch.run_job) or
+    {"op": "stats"}; each gets one response line. Connections are served
+    concurrently and jobs run in a pool of warm processes. With isolate=True
+    every job runs in a fresh process forked from a preloaded fork server.
+    """
+
+    def __init__(self, address: tuple[str, int] | str = ('127.0.0.1', DEFAULT_PORT),
+                 workers: Optional[int] = None, isolate: bool = False,
+                 timeout: Optional[float] = DEFAULT_TIMEOUT):
+        if isolate and sys.version_info < (3, 11):
+            raise RuntimeError("isolated workers need Python 3.11 or newer")
+        self.workers = workers or os.cpu_count() or 1
+        self.isolate = isolate
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.executor = self._new_executor()
+        self.started = time.time()
+        self.runs = 0
+        self.queued = 0
+        self.finished: deque = deque(maxlen=LATENCY_WINDOW)  # (finish time, latency)
+        self.serving = False
+
+        handler = type('Handler', (_Handler,), {'sui': self})
+        if isinstance(address, str):
+            if not hasattr(socketserver, 'ThreadingUnixStreamServer'):
+                raise RuntimeError("Unix sockets are not available on this platform; use --port")
+            if os.path.exists(address):
+                os.unlink(address)
+            self.server = socketserver.ThreadingUnixStreamServer(address, handler)
+        else:
+            self.server = socketserver.ThreadingTCPServer(address, handler)
+        self.server.daemon_threads = True
+
+    @property
+    def address(self) -> tuple[str, int] | str:
+        """The bound address (useful with port 0)"""
+        return self.server.server_address
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        context = pool_context()
+        if self.isolate:
+            return ProcessPoolExecutor(max_workers=self.workers, mp_context=context, max_tasks_per_child=1)
+        executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context, initializer=warm_worker)
+        # Start every worker now rather than on the first requests
+        for _ in range(self.workers):
+            executor.submit(time.sleep, 0)
+        return executor
+
+    def job_timeout(self, job: dict) -> Optional[float]:
+        """A job's own "timeout", which may only shorten the server's; ValueError if it isn't positive seconds"""
+        if "timeout" not in job:
+            return self.timeout
+        value = job["timeout"]
+        if type(value) not in (int, float) or not math.isfinite(value) or value <= 0:
+            raise ValueError('"timeout" must be a positive number of seconds')
+        return value if self.timeout is None else min(value, self.timeout)
+
+    def run(self, job: dict) -> dict:
+        """Run a job in the pool, replacing the pool if a worker dies"""
+        start = time.perf_counter()
+        timeout = self.job_timeout(job)
+        with self.lock:
+            self.queued += 1
+            executor = self.executor
+        try:
+            result = executor.submit(run_job, job, timeout).result()
+        except BrokenProcessPool:
+            result = {"id": job.get("id"), "status": "crash", "error": "worker process crashed",
+                      "elapsed": None, "steps": None, "output": []}
+            with self.lock:
+                if self.executor is executor:
+                    self.executor = self._new_executor()
+            executor.shutdown(wait=False, cancel_futures=True)
+        finally:
+            with self.lock:
+                self.queued -= 1
+        with self.lock:
+            self.runs += 1
+            self.finished.append((time.time(), time.perf_counter() - start))
+        return result
+
+    def stats(self) -> dict:
+        """Queue depth, latency percentiles (ms over recent runs) and throughput"""
+        now = time.time()
+        with self.lock:
+            latencies = [latency for _, latency in self.finished]
+            recent = sum(1 for finished, _ in self.finished if finished > now - RATE_WINDOW)
+            queued, runs = self.queued, self.runs
+        window = min(RATE_WINDOW, now - self.started) or RATE_WINDOW
+        p50, p99 = percentile(latencies, 0.5), percentile(latencies, 0.99)
+        return {
+            "queue_depth": queued,
+            "runs": runs,
+            "runs_per_second": round(recent / window, 2),
+            "p50_ms": None if p50 is None else round(p50 * 1000, 3),
+            "p99_ms": None if p99 is None else round(p99 * 1000, 3),
+            "workers": self.workers,
+            "isolate": self.isolate,
+            "uptime": round(now - self.started, 3),
+        }
+
+    def handle(self, request: dict) -> dict:
+        """Answer one decoded request"""
+        op = request.get("op", "run")
+        if op == "run":
+            return self.run(request)
+        if op == "stats":
+            return self.stats()
+        return {"id": request.get("id"), "status": "error", "error": f"unknown op: {op} (expected run or stats)"}
+
+    def serve_forever(self):
+        self.serving = True
+        try:
+            self.server.serve_forever()
+        finally:
+            self.serving = False
+
+    def shutdown(self):
+        """Stop serving, close the socket and stop the workers"""
+        if self.serving:
+            self.server.shutdown()
+        self.server.server_close()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+        self.executor.shutdown(cancel_futures=True)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Read request lines from one connection and write a response line for each"""
+
+    sui: SuiServer
+
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            request = None
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("expected a JSON object")
+                response = self.sui.handle(request)
+            except ValueError as e:
+                response = {"status": "error", "error": f"bad request: {e}"}
+            except Exception as e:
+                # Whatever went wrong, answer this request and keep the connection
+                response = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+            if isinstance(request, dict) and "id" in request:
+                response.setdefault("id", request["id"])
+            self.wfile.write((json.dumps(response, ensure_ascii=False) + "\n").encode('utf-8'))
+            self.wfile.flush()
+
+
+def main(args: Optional[list[str]] = None):
+    args = sys.argv[1:] if args is None else args
+    if args and args[0] in ('--version', '-V'):
+        print(f"sui-lang {get_version()}")
+        return
+
+    if args and args[0] in ('--help', '-h'):
+        print("Sui (粋) Execution Server")
+        print("=" * 50)
+        print("")
+        print("Usage:")
+        print(f"  sui serve [--port N]       # Listen on 127.0.0.1:N (default {DEFAULT_PORT})")
+        print("  sui serve --socket PATH    # Listen on a Unix socket")
+        print("  Options: --workers N, --timeout SEC, --isolate (fresh forked process per run)")
+        print("")
+        print("Protocol: one JSON object per line, one response line each")
+        print('  {"op": "run", "id": 1, "code": ". 42", "args": [], "stdin": "", "expected": [42]}')
+        print('  {"op": "stats"}  -> queue_depth, runs, runs_per_second, p50_ms, p99_ms')
+        return
+
+    address: tuple[str, int] | str = ('127.0.0.1', DEFAULT_PORT)
+    workers = None
+    timeout = DEFAULT_TIMEOUT
+    try:
+        if '--socket' in args:
+            address = args[args.index('--socket') + 1]
+        elif '--port' in args:
+            address = ('127.0.0.1', int(args[args.index('--port') + 1]))
+        if '--workers' in args:
+            workers = int(args[args.index('--workers') + 1])
+        if '--timeout' in args:
+            timeout = float(args[args.index('--timeout') + 1])
+    except (IndexError, ValueError):
+        print("Error: --port and --workers take integers, --timeout seconds and --socket a path", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        server = SuiServer(address, workers=workers, isolate='--isolate' in args, timeout=timeout)
+    except (OSError, RuntimeError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    # Let `kill` stop the server cleanly so the socket file is removed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    where = server.address if isinstance(server.address, str) else f"{server.address[0]}:{server.address[1]}"
+    print(f"[sui] serving on {where} with {server.workers} workers", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
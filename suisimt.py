@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Sui (粋) SIMT Batch Runner
+Run one Sui function over many independent inputs in lockstep, with every
+variable held as a NumPy vector that has one lane per input
+"""
+
+import sys
+from typing import Any, Optional
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from sui import SuiInterpreter
+
+def get_version() -> str:
+    """Get package version"""
+    try:
+        from importlib.metadata import version
+        return version("sui-lang")
+    except Exception:
+        return "0.4.1"
+
+
+# Arrays, I/O and nested definitions have no per-lane vector form
+SIMT_UNSUPPORTED_OPS = {'[', ']', '.', ',', '#'}
+
+BINARY_OPS = {'+', '-', '*', '/', '%', '<', '>', '~', '&', '|'}
+
+
+class SuiSimtRunner:
+    """
+    Lockstep batch executor for Sui functions.
+
+    Each step runs the lowest pending instruction for every lane waiting on
+    it, so lanes that take different `?` branches are masked off and rejoin
+    where their paths meet. Integers are int64 (overflow wraps) and a
+    variable that holds a float in any lane is float in all lanes.
+    """
+
+    def __init__(self, code: str):
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("numpy is required. Install with: pip install numpy")
+        interpreter = SuiInterpreter()
+        interpreter.collect_functions(interpreter.parse(code))
+        self.functions = interpreter.functions
+        self.programs: dict[int, tuple[list, dict]] = {}
+        self.global_vars: dict[int, Any] = {}
+        self.batch_size = 0
+        self.steps = 0
+
+    def decode(self, func_id: int) -> tuple[list, dict]:
+        """Pre-split a function body into (op, operands) and a label table"""
+        if func_id not in self.programs:
+            body = []
+            labels = {}
+            for tokens in self.functions[func_id].body:
+                op = tokens[0]
+                if op in SIMT_UNSUPPORTED_OPS or (op == '{' and len(tokens) >= 4):
+                    raise NotImplementedError(f"'{op}' is not supported in SIMT mode (f{func_id})")
+                if op == ':':
+                    labels[int(tokens[1])] = len(body)
+                body.append((op, tokens[1:]))
+            self.programs[func_id] = (body, labels)
+        return self.programs[func_id]
+
+    def call(self, func_id: int, inputs, global_vars: Optional[dict] = None) -> "np.ndarray":
+        """
+        Call fN once per row of `inputs` and return the results as an array.
+
+        `inputs` has shape (n,) for one-argument functions or (n, argc).
+        Globals start from `global_vars` (scalars or per-lane arrays), else 0.
+        """
+        if func_id not in self.functions:
+            raise RuntimeError(f"Function {func_id} is not defined")
+        argc = self.functions[func_id].arg_count
+        rows = np.asarray(inputs)
+        if rows.ndim == 1 and argc == 1:
+            rows = rows.reshape(-1, 1)
+        if rows.ndim != 2 or rows.shape[1] != argc:
+            raise ValueError(f"f{func_id} takes {argc} arguments, got inputs of shape {rows.shape}")
+        count = rows.shape[0]
+        self.batch_size = count
+        self.global_vars = {}
+        for idx, value in (global_vars or {}).items():
+            self.global_vars[idx] = self.vector(value, count)
+        self.steps = 0
+        args = [self.vector(rows[:, i], count) for i in range(argc)]
+        return self.run(func_id, args, np.arange(count))
+
+    def vector(self, value, count: int) -> "np.ndarray":
+        """A fresh int64 or float64 lane vector holding `value`"""
+        value = np.asarray(value)
+        dtype = np.float64 if value.dtype.kind == 'f' else np.int64
+        return np.array(np.broadcast_to(value, (count,)), dtype=dtype)
+
+    def run(self, func_id: int, args: list, lanes: "np.ndarray") -> "np.ndarray":
+        """Run fN for the given lanes (indexes into the batch) and return their results"""
+        body, labels = self.decode(func_id)
+        count = len(lanes)
+        end = len(body)
+        # While every lane is on the same instruction, `uniform` holds it and
+        # `pc` is stale; once lanes diverge `pc` tracks each lane
+        uniform: Optional[int] = 0
+        pc = np.zeros(count, dtype=np.int64)
+        local_vars: dict[int, np.ndarray] = {}
+        result = np.zeros(count, dtype=np.int64)
+
+        def resolve(token: str, mask):
+            kind = token[0]
+            if kind in 'vga' and token[1:].isdigit():
+                idx = int(token[1:])
+                if kind == 'v':
+                    vec = local_vars.get(idx)
+                elif kind == 'a':
+                    vec = args[idx] if idx < len(args) else None
+                else:
+                    vec = self.global_vars.get(idx)
+                    if vec is not None:
+                        vec = vec[lanes]
+                if vec is None:
+                    return 0
+                return vec if mask is None else vec[mask]
+            if token.startswith('"'):
+                raise NotImplementedError("strings are not supported in SIMT mode")
+            return float(token) if '.' in token else int(token)
+
+        def assign(token: str, mask, value):
+            kind = token[0]
+            if kind == 'v':
+                table, size = local_vars, count
+            elif kind == 'g':
+                table, size = self.global_vars, self.batch_size
+            else:
+                return
+            idx = int(token[1:])
+            value = np.asarray(value)
+            dtype = np.float64 if value.dtype.kind == 'f' else np.int64
+            vec = table.get(idx)
+            if vec is None:
+                vec = np.zeros(size, dtype=dtype)
+            elif dtype == np.float64 and vec.dtype != np.float64:
+                vec = vec.astype(np.float64)
+            table[idx] = vec
+            if kind == 'g':
+                vec[lanes if mask is None else lanes[mask]] = value
+            elif mask is None:
+                vec[:] = value
+            else:
+                vec[mask] = value
+
+        while True:
+            if uniform is not None:
+                if uniform >= end:
+                    break
+                current = uniform
+                mask = None
+            else:
+                pending = pc < end
+                if not pending.any():
+                    break
+                current = int(pc[pending].min())
+                mask = pc == current
+                if mask.all():
+                    uniform, mask = current, None
+            self.steps += 1
+            op, operands = body[current]
+            next_pc = current + 1
+
+            if op in BINARY_OPS:
+                a = resolve(operands[1], mask)
+                b = resolve(operands[2], mask)
+                assign(operands[0], mask, self.binary(op, a, b))
+            elif op == '=':
+                assign(operands[0], mask, resolve(operands[1], mask))
+            elif op == '!':
+                assign(operands[0], mask, (np.asarray(resolve(operands[1], mask)) == 0).astype(np.int64))
+            elif op == '?':
+                target = labels.get(int(operands[1]))
+                if target is not None:
+                    cond = np.asarray(resolve(operands[0], mask)) != 0
+                    if cond.all():
+                        next_pc = target
+                    elif cond.any():
+                        next_pc = np.where(cond, target, next_pc)
+            elif op == '@':
+                target = labels.get(int(operands[0]))
+                if target is not None:
+                    next_pc = target
+            elif op == '^':
+                value = np.asarray(resolve(operands[0], mask))
+                if value.dtype.kind == 'f' and result.dtype != np.float64:
+                    result = result.astype(np.float64)
+                if mask is None:
+                    result[:] = value
+                else:
+                    result[mask] = value
+                next_pc = end
+            elif op == '$':
+                callee = int(operands[1])
+                if callee in self.functions:
+                    sub_lanes = lanes if mask is None else lanes[mask]
+                    sub_args = [self.vector(resolve(token, mask), len(sub_lanes)) for token in operands[2:]]
+                    assign(operands[0], mask, self.run(callee, sub_args, sub_lanes))
+
+            if mask is not None:
+                pc[mask] = next_pc
+            elif isinstance(next_pc, int):
+                uniform = next_pc
+            else:
+                uniform = None
+                pc[:] = next_pc
+
+        return result
+
+    @staticmethod
+    def binary(op: str, a, b):
+        """Apply a two-operand instruction lane-wise"""
+        if op == '+':
+            return np.add(a, b)
+        if op == '-':
+            return np.subtract(a, b)
+        if op == '*':
+            return np.multiply(a, b)
+        if op in ('/', '%'):
+            if np.any(np.asarray(b) == 0):
+                raise ZeroDivisionError("division by zero" if op == '/' else "integer modulo by zero")
+            return np.true_divide(a, b) if op == '/' else np.mod(a, b)
+        if op == '<':
+            return np.less(a, b).astype(np.int64)
+        if op == '>':
+            return np.greater(a, b).astype(np.int64)
+        if op == '~':
+            return np.equal(a, b).astype(np.int64)
+        if op == '&':
+            return np.logical_and(a, b).astype(np.int64)
+        return np.logical_or(a, b).astype(np.int64)
+
+
+def main():
+    if len(sys.argv) >= 2 and sys.argv[1] in ('--version', '-V'):
+        print(f"sui-lang {get_version()}")
+        return
+
+    if len(sys.argv) < 3 or sys.argv[1] in ('--help', '-h'):
+        print("Sui (粋) SIMT Batch Runner")
+        print("=" * 50)
+        print("")
+        print("Usage:")
+        print("  suisimt <file.sui> <func_id> [inputs.txt]  # Call fN once per input row")
+        print("  suisimt --version                          # Show version")
+        print("")
+        print("Inputs are whitespace-separated arguments, one call per line")
+        print("(default: stdin). Results are printed one per line.")
+        print("")
+        print("Requirements:")
+        print("  numpy        pip install numpy")
+        return
+
+    with open(sys.argv[1], 'r') as f:
+        code = f.read()
+    func_id = int(sys.argv[2])
+    if len(sys.argv) > 3 and sys.argv[3] != '-':
+        with open(sys.argv[3], 'r') as f:
+            text = f.read()
+    else:
+        text = sys.stdin.read()
+
+    try:
+        runner = SuiSimtRunner(code)
+        rows = [[float(token) if '.' in token else int(token) for token in line.split()]
+                for line in text.splitlines() if line.strip()]
+        results = runner.call(func_id, np.array(rows).reshape(len(rows), -1))
+    except (RuntimeError, NotImplementedError, ValueError, ZeroDivisionError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print('\n'.join(str(value) for value in results.tolist()))
+
+
+if __name__ == '__main__':
+    main()
@@ -4,15 +4,28 @@ Sui (粋) WebAssembly Runtime
 Execute Sui code directly via WebAssembly using wasmtime
 """
 
+import io
 import sys
 import os
+import threading
+import time
+from array import array
+from dataclasses import dataclass, field
+from typing import Any, Optional, TextIO
 
 try:
-    from wasmtime import Store, Module, Func, FuncType, ValType, Linker, Engine
+    from wasmtime import Store, Module, Func, FuncType, ValType, Linker, Engine, Config, Trap, TrapCode, WasmtimeError
     WASMTIME_AVAILABLE = True
 except ImportError:
     WASMTIME_AVAILABLE = False
 
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+from sui import ARRAY_TYPES, CaptureSink, SuiInterpreter, make_sink, map_array, typecode, write_array
 from sui2wasm import Sui2WatTranspiler
 
 def get_version() -> str:
@@ -24,49 +37,433 @@ def get_version() -> str:
         return "0.4.1"
 
 
+def to_i32(text: str) -> int:
+    """Parse a host-side value the way the interpreter would, truncated to i32"""
+    try:
+        value = int(text)
+    except ValueError:
+        try:
+            value = int(float(text))
+        except (ValueError, OverflowError):
+            return 0
+    return (value + 2 ** 31) % 2 ** 32 - 2 ** 31
+
+
+class InputReader:
+    """Buffered line reader backing the read_i32 import (one value per line, like `,`)"""
+
+    def __init__(self, stream: TextIO, block_size: int = 1 << 16):
+        self.stream = stream
+        self.block_size = block_size
+        self.lines: list[str] = []
+        self.pos = 0
+        self.partial = ""
+        self.eof = False
+
+    def readline(self) -> Optional[str]:
+        """Return the next line without its newline, or None at end of input"""
+        while self.pos >= len(self.lines):
+            if self.eof:
+                return None
+            block = self.stream.read(self.block_size)
+            if not block:
+                self.eof = True
+                self.lines = [self.partial] if self.partial else []
+                self.partial = ""
+            else:
+                self.lines = (self.partial + block).split('\n')
+                self.partial = self.lines.pop()
+            self.pos = 0
+        line = self.lines[self.pos]
+        self.pos += 1
+        return line
+
+    def read_i32(self) -> int:
+        """Read the next line as an i32 (0 at end of input or for non-numbers)"""
+        line = self.readline()
+        return 0 if line is None else to_i32(line.strip())
+
+
+I32_MIN, I32_MAX = -2 ** 31, 2 ** 31 - 1
+
+# Instructions whose interpreter semantics i32 Wasm doesn't reproduce: true
+# division, Python's modulo sign, text input, logical (not bitwise) `&`/`|`,
+# and arrays (created in Wasm, or indexed from the end with negative indexes)
+TIERED_UNSAFE_OPS = {'/', '%', ',', '[', ']', '{', '&', '|', '#'}
+
+# Fuel given to sandboxed runs that have a deadline but no instruction budget
+UNLIMITED_FUEL = 2 ** 63 - 1
+
+
+@dataclass
+class WasmRunResult:
+    """Outcome of a sandboxed Wasm run"""
+    status: str  # 'ok', 'out_of_fuel', 'timeout' or 'trap'
+    return_value: Optional[int] = None
+    output: list = field(default_factory=list)
+    # wasmtime syncs the count at calls and on running out, so after another
+    # trap (a timeout included) it can lag behind what the run used
+    fuel_consumed: Optional[int] = None
+    elapsed: float = 0.0
+    error: str = ""
+
+    @property
+    def budget_exceeded(self) -> bool:
+        """True if the run was stopped by its fuel budget or deadline"""
+        return self.status in ('out_of_fuel', 'timeout')
+
+
+class SuiWasmInstance:
+    """
+    An instantiated Sui module kept alive for repeated calls.
+
+    Linear memory can be viewed as NumPy arrays without copying. Views are
+    invalidated when memory grows, so fetch them again after allocating.
+    """
+
+    def __init__(self, runtime: "SuiWasmRuntime", store: "Store", instance, checked: bool = False):
+        self.runtime = runtime
+        self.store = store
+        self.exports = instance.exports(store)
+        self.checked = checked  # arrays carry their length in the word before them
+        self.scratch_ptr = 0
+        self.scratch_words = 0
+
+    @property
+    def output(self) -> list:
+        """Values printed so far"""
+        return self.runtime.output
+
+    def main(self) -> int:
+        """Run the program's top-level code"""
+        try:
+            return self.exports["main"](self.store)
+        finally:
+            self.runtime.sink.flush()
+
+    def call(self, func_id: int, *args: int) -> int:
+        """Call exported function fN"""
+        try:
+            return self.exports[f"f{func_id}"](self.store, *args)
+        finally:
+            self.runtime.sink.flush()
+
+    def get_global(self, idx: int) -> int:
+        """Read global gN"""
+        return self.exports[f"g{idx}"].value(self.store)
+
+    def set_global(self, idx: int, value: int):
+        """Write global gN"""
+        self.exports[f"g{idx}"].set_value(self.store, value)
+
+    def memory_view(self) -> "np.ndarray":
+        """Zero-copy int32 view of the whole linear memory"""
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("numpy is required. Install with: pip install numpy")
+        memory = self._memory()
+        size = memory.data_len(self.store)
+        raw = np.ctypeslib.as_array(memory.data_ptr(self.store), shape=(size,))
+        return raw.view(np.int32)
+
+    def array_view(self, ptr: int, length: int) -> "np.ndarray":
+        """Zero-copy view of the Sui array at `ptr`"""
+        start = ptr // 4
+        return self.memory_view()[start:start + length]
+
+    def alloc_array(self, length: int) -> int:
+        """Allocate a zeroed Sui array on the module heap, growing memory if needed"""
+        memory = self._memory()
+        heap_ptr = self.exports["heap_ptr"]
+        ptr = (heap_ptr.value(self.store) + 15) // 16 * 16
+        if self.checked:
+            ptr += 16
+        end = ptr + length * 4
+        size = memory.data_len(self.store)
+        if end > size:
+            memory.grow(self.store, -(-(end - size) // 65536))
+        heap_ptr.set_value(self.store, end)
+        if self.checked:
+            memory.write(self.store, length.to_bytes(4, 'little'), ptr - 4)
+        return ptr
+
+    def array_from_numpy(self, data) -> int:
+        """Copy a NumPy array into a new Sui array (as int32) and return its pointer"""
+        flat = np.asarray(data).ravel()
+        ptr = self.alloc_array(flat.size)
+        self.array_view(ptr, flat.size)[:] = flat
+        return ptr
+
+    def load_array(self, idx: int, data: Any) -> int:
+        """
+        Copy an int array (or a file path, see sui.map_array) into linear
+        memory as global gN and return its length
+        """
+        if isinstance(data, str):
+            data = map_array(data)
+        if typecode(data) != 'q' and not (type(data) is list and all(type(x) is int for x in data)):
+            raise RuntimeError(f"g{idx}: Wasm arrays hold i32; use the interpreter for floats")
+        values = None
+        if NUMPY_AVAILABLE and typecode(data) == 'q':
+            values = np.frombuffer(data, dtype=np.int64)
+            lo, hi = (int(values.min()), int(values.max())) if len(values) else (0, 0)
+        else:
+            lo, hi = (min(data), max(data)) if len(data) else (0, 0)
+        if not I32_MIN <= lo <= hi <= I32_MAX:
+            raise RuntimeError(f"g{idx}: values outside i32; use the interpreter")
+        if f"g{idx}" not in self.exports or "memory" not in self.exports:
+            # The program never reads it
+            return len(data)
+        ptr = self.alloc_array(len(data))
+        if values is not None:
+            self.array_view(ptr, len(data))[:] = values
+        else:
+            self._memory().write(self.store, array('i', data).tobytes(), ptr)
+        self.set_global(idx, ptr)
+        return len(data)
+
+    def dump_array(self, idx: int, path: str, length: int):
+        """Write `length` elements of the array in global gN to a binary file"""
+        if f"g{idx}" not in self.exports or "memory" not in self.exports:
+            raise RuntimeError(f"g{idx} is not an array in this program")
+        ptr = self.get_global(idx)
+        data = array('i', self._memory().read(self.store, ptr, ptr + length * 4))
+        write_array(array('q', data), path)
+
+    def batch(self, func_id: int, inputs) -> "np.ndarray":
+        """
+        Call fN over every row of `inputs` inside Wasm with a single host call.
+
+        `inputs` has shape (n,) for one-argument functions or (n, argc).
+        The module must have been instantiated with `batch=[func_id]`.
+        """
+        wrapper = self.exports.get(f"batch_f{func_id}")
+        if wrapper is None:
+            raise RuntimeError(f"f{func_id} has no batch export; instantiate with batch=[{func_id}]")
+        argc = len(self.exports[f"f{func_id}"].type(self.store).params)
+        rows = np.asarray(inputs, dtype=np.int32)
+        if rows.ndim == 1 and argc == 1:
+            rows = rows.reshape(-1, 1)
+        if rows.ndim != 2 or rows.shape[1] != argc:
+            raise ValueError(f"f{func_id} takes {argc} arguments, got inputs of shape {rows.shape}")
+        count = rows.shape[0]
+
+        words = rows.size + count
+        if words > self.scratch_words:
+            self.scratch_ptr = self.alloc_array(words)
+            self.scratch_words = words
+        in_ptr = self.scratch_ptr
+        out_ptr = in_ptr + rows.size * 4
+
+        self.array_view(in_ptr, rows.size)[:] = rows.ravel()
+        wrapper(self.store, in_ptr, out_ptr, count)
+        return self.array_view(out_ptr, count).copy()
+
+    def _memory(self):
+        """Return the exported linear memory"""
+        memory = self.exports.get("memory")
+        if memory is None:
+            raise RuntimeError("Module has no linear memory (it uses no arrays or strings)")
+        return memory
+
+
 class SuiWasmRuntime:
     """Runtime for executing Sui code via WebAssembly"""
 
-    def __init__(self):
+    def __init__(self, output: Any = None):
+        """output: where `.` sends values, anything sui.make_sink accepts"""
         if not WASMTIME_AVAILABLE:
             raise RuntimeError("wasmtime is required. Install with: pip install wasmtime")
         
         self.engine = Engine()
-        self.output: list[int] = []
+        self.sink = make_sink(output)
 
-    def run(self, sui_code: str) -> tuple[int, list[int]]:
+    @property
+    def output(self) -> list:
+        """Values kept by the output sink"""
+        return self.sink.getvalue()
+
+    def run(self, sui_code: str, args: Optional[list] = None,
+            stdin: Optional[TextIO | str] = None, arrays: Optional[dict[str, Any]] = None,
+            dumps: Optional[dict[str, str]] = None, checked: bool = False) -> tuple[int, list]:
         """
         Execute Sui code via WebAssembly
         
         Args:
             sui_code: Sui source code
+            args: Command-line arguments (g100=argc, g101=argv[0], ...)
+            stdin: Text stream or string read by `,` (default: sys.stdin)
+            arrays: Global arrays to load first, e.g. {'g5': 'data.i64'}
+            dumps: Loaded arrays to write out afterwards, e.g. {'g5': 'out.i64'}
+            checked: Trap (raise wasmtime.Trap) on i32 overflow and out-of-range
+                array indexes instead of wrapping or reading past the array
             
         Returns:
             Tuple of (return_value, output_list)
         """
-        self.output = []
-        
-        # Transpile Sui to WAT
-        transpiler = Sui2WatTranspiler()
-        wat_code = transpiler.transpile(sui_code)
+        self.sink.clear()
+        store = Store(self.engine)
+        instance = self._instantiate(self.engine, store, sui_code, args, stdin, checked=checked)
+        lengths = {}
+        if arrays:
+            loader = SuiWasmInstance(self, store, instance, checked)
+            for var, data in arrays.items():
+                lengths[var] = loader.load_array(int(var[1:]), data)
+        try:
+            result = instance.exports(store)["main"](store)
+        finally:
+            self.sink.flush()
+
+        for var, path in (dumps or {}).items():
+            if var not in lengths:
+                raise RuntimeError(f"Wasm arrays carry no length; only arrays passed in can be dumped ({var})")
+            loader.dump_array(int(var[1:]), path, lengths[var])
         
-        # Create store and compile module
+        return result, self.sink.getvalue()
+
+    def instantiate(self, sui_code: str, args: Optional[list] = None,
+                    stdin: Optional[TextIO | str] = None, batch: list[int] = ()) -> SuiWasmInstance:
+        """
+        Compile and instantiate Sui code without running it
+
+        Args:
+            sui_code: Sui source code
+            args: Command-line arguments, as in run()
+            stdin: Input for `,`, as in run()
+            batch: Function ids to generate batch_fN wrappers for
+
+        Returns:
+            SuiWasmInstance for calling functions and sharing arrays with NumPy
+        """
+        self.sink.clear()
         store = Store(self.engine)
+        instance = self._instantiate(self.engine, store, sui_code, args, stdin, batch)
+        return SuiWasmInstance(self, store, instance)
+
+    def run_sandboxed(self, sui_code: str, fuel: Optional[int] = None,
+                      timeout: Optional[float] = None, args: Optional[list] = None,
+                      stdin: Optional[TextIO | str] = None) -> WasmRunResult:
+        """
+        Execute Sui code with an instruction budget and/or wall-clock deadline
+
+        Args:
+            sui_code: Sui source code
+            fuel: wasmtime fuel budget (roughly one unit per Wasm instruction)
+            timeout: deadline in seconds, enforced via epoch interruption
+            args: Command-line arguments, as in run()
+            stdin: Input for `,`, as in run()
+
+        Returns:
+            WasmRunResult; budget overruns and traps are reported in `status`
+            instead of being raised
+        """
+        # A fresh engine per run keeps one run's epoch ticks from interrupting another
+        config = Config()
+        config.consume_fuel = True
+        config.epoch_interruption = True
+        engine = Engine(config)
+        store = Store(engine)
+        budget = UNLIMITED_FUEL if fuel is None else fuel
+        store.set_fuel(budget)
+        store.set_epoch_deadline(1)
+
+        self.sink.clear()
+        main_func = self._instantiate(engine, store, sui_code, args, stdin).exports(store)["main"]
+
+        timer = None
+        if timeout is not None:
+            timer = threading.Timer(timeout, engine.increment_epoch)
+            timer.daemon = True
+            timer.start()
+
+        start = time.perf_counter()
+        try:
+            value = main_func(store)
+            status, error = 'ok', ""
+        except Trap as e:
+            value = None
+            error = e.message
+            if e.trap_code == TrapCode.OUT_OF_FUEL:
+                status = 'out_of_fuel'
+            elif e.trap_code == TrapCode.INTERRUPT:
+                status = 'timeout'
+            else:
+                status = 'trap'
+        except WasmtimeError as e:
+            # Errors wasmtime raises outside a trap are still the program's failure
+            value = None
+            status, error = 'trap', str(e)
+        finally:
+            elapsed = time.perf_counter() - start
+            if timer is not None:
+                timer.cancel()
+            self.sink.flush()
+
+        return WasmRunResult(
+            status=status,
+            return_value=value,
+            output=self.sink.getvalue(),
+            # Fuel is metered even without a budget, so a timeout-only run reports it too
+            fuel_consumed=budget - store.get_fuel(),
+            elapsed=elapsed,
+            error=error,
+        )
+
+    def _instantiate(self, engine: "Engine", store: "Store", sui_code: str,
+                     args: Optional[list] = None, stdin: Optional[TextIO | str] = None,
+                     batch: list[int] = (), checked: bool = False):
+        """Compile Sui code and instantiate it in the store"""
+        module = self.compile_module(engine, sui_code, batch, checked)
+        return self.link(engine, store, module, args, stdin)
+
+    def compile_module(self, engine: "Engine", sui_code: str, batch: list[int] = (),
+                       checked: bool = False) -> "Module":
+        """Transpile Sui code to WAT and compile it for `engine` (see Sui2WatTranspiler for checked)"""
+        transpiler = Sui2WatTranspiler(batch_exports=batch, checked=checked)
+        wat_code = transpiler.transpile(sui_code)
         
         try:
-            module = Module(self.engine, wat_code)
+            return Module(engine, wat_code)
         except Exception as e:
             raise RuntimeError(f"WAT compilation error: {e}\n\nGenerated WAT:\n{wat_code}")
+
+    def link(self, engine: "Engine", store: "Store", module: "Module",
+             args: Optional[list] = None, stdin: Optional[TextIO | str] = None):
+        """Instantiate a compiled module with the host imports"""
+        args = [str(a) for a in args or []]
+        if stdin is None:
+            stdin = sys.stdin
+        elif isinstance(stdin, str):
+            stdin = io.StringIO(stdin)
+        reader = InputReader(stdin)
         
         # Create linker and define imports
-        linker = Linker(self.engine)
+        linker = Linker(engine)
         
         # Define print_i32 function
         print_type = FuncType([ValType.i32()], [])
         def print_i32(value: int):
-            self.output.append(value)
-            print(value)
+            self.sink.write(value)
         linker.define_func("env", "print_i32", print_type, print_i32)
+
+        # String literals live in memory as a 4-byte length followed by UTF-8
+        def print_str(caller, ptr: int):
+            memory = caller.get("memory")
+            if memory is None:
+                raise Trap("print_str: module exports no memory")
+            if not 0 <= ptr <= memory.data_len(caller) - 4:
+                raise Trap(f"print_str: string pointer {ptr} out of bounds")
+            length = int.from_bytes(memory.read(caller, ptr, ptr + 4), 'little')
+            text = memory.read(caller, ptr + 4, ptr + 4 + length).decode('utf-8')
+            self.sink.write(text)
+        linker.define_func("env", "print_str", print_type, print_str, access_caller=True)
+
+        def read_i32() -> int:
+            self.sink.flush()
+            return reader.read_i32()
+        linker.define_func("env", "read_i32", FuncType([], [ValType.i32()]), read_i32)
+        linker.define_func("env", "arg_count", FuncType([], [ValType.i32()]), lambda: len(args))
+        linker.define_func("env", "arg_i32", FuncType([ValType.i32()], [ValType.i32()]),
+                           lambda i: to_i32(args[i]) if 0 <= i < len(args) else 0)
         
         # Instantiate module
         try:
@@ -74,20 +471,175 @@ class SuiWasmRuntime:
         except Exception as e:
             raise RuntimeError(f"Wasm instantiation error: {e}")
         
-        # Get and call main function
-        main_func = instance.exports(store).get("main")
-        if main_func is None:
+        if instance.exports(store).get("main") is None:
             raise RuntimeError("No main function exported")
         
-        result = main_func(store)
-        
-        return result, self.output
+        return instance
 
-    def run_file(self, filename: str) -> tuple[int, list[int]]:
+    def run_file(self, filename: str, args: Optional[list] = None) -> tuple[int, list]:
         """Execute a Sui file via WebAssembly"""
         with open(filename, 'r') as f:
             code = f.read()
-        return self.run(code)
+        return self.run(code, args=args)
+
+
+class SuiTieredRuntime(SuiInterpreter):
+    """
+    Interpreter that hands function calls to Wasm once they are compiled.
+
+    Execution starts in the interpreter right away while the program's
+    functions are transpiled and compiled on a background thread. From then
+    on, each call to a function whose whole call tree is plain integer code
+    (no arrays, and every path ends in `^`) runs in Wasm, with the globals it
+    uses copied in before the call and back out after it. The module is
+    checked: a call whose arithmetic leaves i32 (or that recurses too deep)
+    traps, and is run again by the interpreter as if Wasm had never seen it.
+    """
+
+    def __init__(self, wait: bool = False, output: Any = None, input: Any = None):
+        super().__init__(output, input)
+        if not WASMTIME_AVAILABLE:
+            raise RuntimeError("wasmtime is required. Install with: pip install wasmtime")
+        self.wait = wait  # compile before running instead of in the background
+        self.wasm_runtime = SuiWasmRuntime(output=self.sink)
+        self.module: Optional[Module] = None
+        self.compile_error = ""
+        self.generation = 0
+        self.instance: Optional[SuiWasmInstance] = None
+        self.wasm_funcs: dict[int, set[int]] = {}  # func id -> globals its call tree uses
+        self.wasm_calls = 0
+
+    def collect_functions(self, lines: list[list[str]]):
+        """Collect function definitions and start compiling the Wasm-safe ones"""
+        super().collect_functions(lines)
+        self.generation += 1
+        self.module = None
+        self.instance = None
+        self.wasm_funcs = self.find_wasm_functions()
+        if not self.wasm_funcs:
+            return
+
+        source = []
+        for func_id in sorted(self.wasm_funcs):
+            func = self.functions[func_id]
+            source.append(f"# {func_id} {func.arg_count} {{")
+            source += [' '.join(tokens) for tokens in func.body]
+            source.append("}")
+        if self.wait:
+            self._compile('\n'.join(source), self.generation)
+        else:
+            thread = threading.Thread(target=self._compile, args=('\n'.join(source), self.generation), daemon=True)
+            thread.start()
+
+    def _compile(self, source: str, generation: int):
+        """Compile the Wasm tier (runs on the background thread)"""
+        try:
+            module = self.wasm_runtime.compile_module(self.wasm_runtime.engine, source, checked=True)
+        except Exception as e:
+            self.compile_error = str(e)
+            return
+        if generation == self.generation:
+            self.module = module
+
+    def find_wasm_functions(self) -> dict[int, set[int]]:
+        """Find functions whose call tree can run in Wasm, with the globals each uses"""
+        direct: dict[int, tuple[set[int], set[int]]] = {}
+        for func_id, func in self.functions.items():
+            calls: set[int] = set()
+            used_globals: set[int] = set()
+            labels = {tokens[1] for tokens in func.body if tokens[0] == ':' and len(tokens) > 1}
+            # Running off the end returns None in the interpreter but 0 in Wasm
+            safe = bool(func.body) and func.body[-1][0] in ('^', '@')
+            for tokens in func.body:
+                op = tokens[0]
+                if op in TIERED_UNSAFE_OPS:
+                    safe = False
+                elif op == '$':
+                    if len(tokens) < 3 or not tokens[2].isdigit():
+                        safe = False
+                    else:
+                        calls.add(int(tokens[2]))
+                elif op in ('@', '?') and tokens[-1] not in labels:
+                    safe = False
+                for token in tokens[1:]:
+                    if token[:1] in ('v', 'g', 'a') and token[1:].isdigit():
+                        if token[0] == 'g':
+                            used_globals.add(int(token[1:]))
+                    elif not token.lstrip('-').isdigit():
+                        safe = False
+            if safe:
+                direct[func_id] = (calls, used_globals)
+
+        # A function is only safe if everything it calls is
+        changed = True
+        while changed:
+            changed = False
+            for func_id, (calls, _) in list(direct.items()):
+                if not calls <= direct.keys():
+                    del direct[func_id]
+                    changed = True
+
+        result = {}
+        for func_id in direct:
+            seen, pending, used_globals = set(), [func_id], set()
+            while pending:
+                callee = pending.pop()
+                if callee in seen:
+                    continue
+                seen.add(callee)
+                calls, globals_used = direct[callee]
+                used_globals |= globals_used
+                pending += calls
+            result[func_id] = used_globals
+        return result
+
+    def call_function(self, func_id: int, call_args: list) -> Any:
+        """Call a function in Wasm when possible, otherwise interpret it"""
+        if self.module is not None and func_id in self.wasm_funcs:
+            handled, value = self.call_wasm(func_id, call_args)
+            if handled:
+                return value
+        return super().call_function(func_id, call_args)
+
+    def call_wasm(self, func_id: int, call_args: list) -> tuple[bool, Optional[int]]:
+        """
+        Run fN in Wasm, transferring the globals it uses both ways
+
+        Returns (False, None) when a value it needs (a float, string, big
+        integer or array) can't be represented in Wasm, or when the call
+        traps; nothing it did is kept then, printed values included.
+        """
+        if self.instance is None:
+            store = Store(self.wasm_runtime.engine)
+            instance = self.wasm_runtime.link(self.wasm_runtime.engine, store, self.module)
+            self.instance = SuiWasmInstance(self.wasm_runtime, store, instance, checked=True)
+        held = CaptureSink()
+        self.wasm_runtime.sink = held
+
+        argc = self.functions[func_id].arg_count
+        wasm_args = (list(call_args) + [0] * argc)[:argc]
+        global_values = {g: self.global_vars.get(g, 0) for g in self.wasm_funcs[func_id]}
+        if not all(self.fits_wasm(value) for value in wasm_args + list(global_values.values())):
+            return False, None
+        for g, value in global_values.items():
+            self.instance.set_global(g, value)
+
+        try:
+            result = self.instance.call(func_id, *wasm_args)
+        except Trap:
+            return False, None
+        self.wasm_calls += 1
+        for value in held.values:
+            self.sink.write(value)
+
+        for g in global_values:
+            self.global_vars[g] = self.instance.get_global(g)
+        return True, result
+
+    @staticmethod
+    def fits_wasm(value: Any) -> bool:
+        """Whether an interpreter value is an i32 (arrays never reach the Wasm tier)"""
+        return type(value) is int and I32_MIN <= value <= I32_MAX
 
 
 def main():
@@ -105,8 +657,10 @@ def main():
         print("=" * 50)
         print("")
         print("Usage:")
-        print("  suiwasm <file.sui>       # Execute Sui file via WebAssembly")
+        print("  suiwasm <file.sui> [args...] # Execute Sui file via WebAssembly")
         print("  suiwasm --wat <file.sui> # Show generated WAT code")
+        print("  suiwasm --fuel N --timeout SEC <file.sui>")
+        print("                           # Stop after N fuel units or SEC seconds")
         print("  suiwasm --version        # Show version")
         print("")
         print("This runtime:")
@@ -158,16 +712,52 @@ def main():
         print(wat_code)
         return
 
+    # Budget options
+    args = sys.argv[1:]
+    fuel = None
+    timeout = None
+    try:
+        if '--fuel' in args:
+            idx = args.index('--fuel')
+            fuel = int(args[idx + 1])
+            del args[idx:idx + 2]
+        if '--timeout' in args:
+            idx = args.index('--timeout')
+            timeout = float(args[idx + 1])
+            del args[idx:idx + 2]
+    except (IndexError, ValueError):
+        print("Error: --fuel takes an integer and --timeout a number of seconds")
+        sys.exit(1)
+
     # Execute file
-    filename = sys.argv[1]
+    filename = args[0]
     
     if not os.path.exists(filename):
         print(f"Error: File not found: {filename}")
         sys.exit(1)
 
+    if fuel is not None or timeout is not None:
+        with open(filename, 'r') as f:
+            code = f.read()
+        try:
+            run = SuiWasmRuntime().run_sandboxed(code, fuel=fuel, timeout=timeout, args=args[1:])
+        except Exception as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        if run.budget_exceeded:
+            detail = f", fuel consumed: {run.fuel_consumed}" if run.fuel_consumed is not None else ""
+            print(f"Error: budget exceeded ({run.status} after {run.elapsed:.3f}s{detail})")
+            sys.exit(1)
+        if run.status != 'ok':
+            print(f"Error: {run.error}")
+            sys.exit(1)
+        if run.return_value != 0 or not run.output:
+            print(f"[Return: {run.return_value}]")
+        return
+
     try:
         runtime = SuiWasmRuntime()
-        result, output = runtime.run_file(filename)
+        result, output = runtime.run_file(filename, args=args[1:])
         # Return value is shown only if non-zero or if there's no output
         if result != 0 or not output:
             print(f"[Return: {result}]")
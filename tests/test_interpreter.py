@@ -6,7 +6,9 @@ import os
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from sui import SuiInterpreter, validate_line
+from sui import SuiInterpreter, validate_line, program_features, select_backend, make_sink, StdoutSink, make_source, StreamInput
+from sui import canonicalize, count_tokens
+from sui import Limits, SuiLimitError, StepLimitExceeded, ArrayLimitExceeded, DepthLimitExceeded, OutputLimitExceeded, TimeLimitExceeded
 
 
 class TestBasicOperations:
@@ -232,6 +234,415 @@ class TestArrays:
         result = interp.run(code)
         assert result == [15]
 
+    def test_typed_storage(self):
+        """Test that arrays are int64 buffers that NumPy can view without copying"""
+        from array import array
+        interp = SuiInterpreter()
+        result = interp.run("[ g0 4\n{ g0 1 -7\n. g0")
+        assert result == [[0, -7, 0, 0]]
+        assert type(interp.global_vars[0]) is array and interp.global_vars[0].typecode == 'q'
+        assert memoryview(interp.global_vars[0]).format == 'q'
+
+    def test_promotion_keeps_aliases(self):
+        """Test that storing a non-int promotes every reference to a list"""
+        code = """
+[ g0 3
+= g1 g0
+# 0 1 {
+{ a0 0 2.5
+{ a0 1 "x"
+^ a0
+}
+$ g2 0 g0
+{ g0 2 99999999999999999999999
+] v0 g1 0
+] v1 g1 1
+. v0
+. v1
+. g2
+"""
+        interp = SuiInterpreter()
+        result = interp.run(code)
+        assert result == [2.5, "x", [2.5, "x", 99999999999999999999999]]
+        assert type(interp.global_vars[1]) is list
+        assert interp.global_vars[0] is interp.global_vars[1] is interp.global_vars[2]
+
+    def test_sparse_allocation(self):
+        """Test that huge arrays only allocate the chunks that are written"""
+        from sui import SparseArray, SPARSE_CHUNK
+        interp = SuiInterpreter()
+        result = interp.run(
+            "[ g0 100000000\n= g1 g0\n{ g0 99999999 7\n{ g0 5 \"x\"\n{ g0 6 -3\n"
+            "] v0 g1 99999999\n] v1 g1 5\n] v2 g1 6\n] v3 g1 12345678\n] v4 g1 -1\n"
+            ". v0\n. v1\n. v2\n. v3\n. v4"
+        )
+        assert result == [7, "x", -3, 0, 7]
+        sparse = interp.global_vars[0]
+        assert type(sparse) is SparseArray and sparse is interp.global_vars[1]
+        assert len(sparse.chunks) == 2
+        assert type(sparse.chunks[0]) is list
+        assert len(sparse.chunks[99999999 // SPARSE_CHUNK]) == 99999999 % SPARSE_CHUNK + 1
+
+    def test_sparse_turns_dense(self):
+        from array import array
+        from sui import SPARSE_MIN_SIZE
+        size = SPARSE_MIN_SIZE
+        code = f"""
+[ g0 {size}
+= g1 g0
+= v0 0
+: 0
+< v1 v0 {size}
+! v2 v1
+? v2 1
+{{ g0 v0 v0
++ v0 v0 2
+@ 0
+: 1
+] v3 g1 {size - 2}
+. v3
+"""
+        interp = SuiInterpreter()
+        result = interp.run(code)
+        assert result == [size - 2]
+        assert type(interp.global_vars[0]) is array
+        assert interp.global_vars[0] is interp.global_vars[1]
+        assert interp.global_vars[0][:4].tolist() == [0, 0, 2, 0]
+
+    def test_nested_arrays(self):
+        interp = SuiInterpreter()
+        result = interp.run("[ g0 2\n[ v0 2\n{ v0 0 5\n{ g0 1 v0\n. g0")
+        assert result == [[0, [5, 0]]]
+
+
+class TestOutputSinks:
+    """Test where `.` sends its values"""
+
+    LOOP = "= v0 0\n: 0\n< v1 v0 10\n! v2 v1\n? v2 1\n. v0\n+ v0 v0 1\n@ 0\n: 1"
+
+    def test_default_prints_and_keeps(self, capsys):
+        assert SuiInterpreter().run(self.LOOP) == list(range(10))
+        assert capsys.readouterr().out.split() == [str(i) for i in range(10)]
+
+    def test_capture(self, capsys):
+        interp = SuiInterpreter(output='capture')
+        assert interp.run(self.LOOP) == list(range(10))
+        assert interp.run(". 7") == [7]
+        assert capsys.readouterr().out == ""
+
+    def test_ring(self, capsys):
+        assert SuiInterpreter(output='ring:3').run(self.LOOP) == [7, 8, 9]
+        assert capsys.readouterr().out == ""
+
+    def test_null_and_callback(self, capsys):
+        assert SuiInterpreter(output='null').run(self.LOOP) == []
+        seen = []
+        assert SuiInterpreter(output=seen.append).run(self.LOOP + '\n. "done"') == []
+        assert seen == list(range(10)) + ["done"]
+        assert capsys.readouterr().out == ""
+
+    def test_stdout_blocks(self):
+        import io
+        stream = io.StringIO()
+        sink = StdoutSink(stream)
+        assert sink.buffered
+        interp = SuiInterpreter(output=sink)
+        interp.execute_line([".", "1"])
+        assert stream.getvalue() == ""
+        assert interp.run(self.LOOP) == []
+        assert stream.getvalue() == "1\n" + "".join(f"{i}\n" for i in range(10))
+
+    def test_unbuffered_stdout(self):
+        import io
+        stream = io.StringIO()
+        interp = SuiInterpreter(output=StdoutSink(stream, buffered=False))
+        interp.execute_line([".", "1"])
+        assert stream.getvalue() == "1\n"
+
+    def test_flush_on_error(self):
+        import io
+        stream = io.StringIO()
+        with pytest.raises(ZeroDivisionError):
+            SuiInterpreter(output=StdoutSink(stream)).run(". 1\n/ v0 1 0")
+        assert stream.getvalue() == "1\n"
+
+    def test_bad_spec(self):
+        for spec in ("bogus", "ring:0", "ring:x", "null:1"):
+            with pytest.raises(ValueError):
+                make_sink(spec)
+
+    def test_cli(self, tmp_path):
+        import subprocess
+        program = tmp_path / "count.sui"
+        program.write_text(self.LOOP + "\n")
+        script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sui.py")
+        for output, expected in (("stdout", list(range(10))), ("ring:2", [8, 9]), ("null", [])):
+            result = subprocess.run([sys.executable, script, f"--output={output}", str(program)],
+                                    capture_output=True, text=True)
+            assert result.returncode == 0, result.stderr
+            assert result.stdout.split() == [str(i) for i in expected]
+
+
+class TestInputSources:
+    """Test where `,` reads its values from"""
+
+    SUM = ", v0\n, v1\n+ v2 v0 v1\n. v2"
+
+    def test_iterable(self):
+        interp = SuiInterpreter(output='capture', input=["4", 5.5])
+        assert interp.run(self.SUM) == [9.5]
+
+    def test_parsing(self):
+        interp = SuiInterpreter(output='capture', input=["7", "2.5", "abc", " 3 "])
+        assert interp.run(", v0\n, v1\n, v2\n, v3\n. v0\n. v1\n. v2\n. v3") == [7, 2.5, "abc", 3]
+
+    def test_text_and_binary_streams(self):
+        import io
+        for stream in (io.StringIO("1\n2\nx\n"), io.BytesIO("10\r\n20\r\n粋\r\n".encode())):
+            interp = SuiInterpreter(output='capture', input=stream)
+            result = interp.run(self.SUM + "\n, v3\n. v3")
+            assert result in ([3, "x"], [30, "粋"])
+
+    def test_small_blocks(self):
+        import io
+        values = [str(i) for i in range(100)] + ["0.5", "end"]
+        source = StreamInput(io.BytesIO("\n".join(values).encode()), block_size=7)
+        read = [source.read() for _ in values]
+        assert read == list(range(100)) + [0.5, "end"]
+        with pytest.raises(EOFError):
+            source.read()
+
+    def test_numpy_array(self):
+        np = pytest.importorskip("numpy")
+        interp = SuiInterpreter(output='capture', input=np.array([[1, 2], [3, 4]]))
+        assert interp.run(self.SUM + "\n, v3\n, v4\n+ v5 v3 v4\n. v5") == [3, 7]
+
+    def test_eof(self):
+        with pytest.raises(EOFError):
+            SuiInterpreter(output='capture', input=[1]).run(self.SUM)
+
+    def test_bad_spec(self):
+        with pytest.raises(ValueError):
+            make_source("file.txt")
+
+    def test_cli_stdin(self, tmp_path):
+        import subprocess
+        program = tmp_path / "sum.sui"
+        program.write_text(self.SUM + "\n")
+        script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sui.py")
+        result = subprocess.run([sys.executable, script, str(program)], input="40\n2\n",
+                                capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.split() == ["42"]
+
+
+class TestArrayFiles:
+    """Test memory-mapped array files"""
+
+    def test_map_and_dump(self, tmp_path):
+        from array import array
+        source = tmp_path / "in.i64"
+        source.write_bytes(array('q', [1, 2, 3, -4]).tobytes())
+        interp = SuiInterpreter()
+        result = interp.run("] v0 g5 3\n. v0\n{ g5 0 10\n[ g6 2\n{ g6 1 7", arrays={'g5': str(source)})
+        assert result == [-4]
+        interp.dump_array('g5', str(tmp_path / "out.i64"))
+        interp.dump_array('g6', str(tmp_path / "new.i64"))
+        assert array('q', (tmp_path / "out.i64").read_bytes()).tolist() == [10, 2, 3, -4]
+        assert array('q', (tmp_path / "new.i64").read_bytes()).tolist() == [0, 7]
+        # Writes go to a private copy, never back to the input file
+        assert array('q', source.read_bytes()).tolist() == [1, 2, 3, -4]
+
+    def test_float_file(self, tmp_path):
+        from array import array
+        source = tmp_path / "in.f64"
+        source.write_bytes(array('d', [0.5, 1.5]).tobytes())
+        interp = SuiInterpreter()
+        result = interp.run("] v0 g5 0\n] v1 g5 1\n+ v2 v0 v1\n. v2", arrays={'g5': str(source)})
+        assert result == [2.0]
+
+    def test_float_store_promotes(self, tmp_path):
+        from array import array
+        source = tmp_path / "in.i64"
+        source.write_bytes(array('q', [1, 2]).tobytes())
+        interp = SuiInterpreter()
+        result = interp.run("{ g5 1 2.5\n. g5", arrays={'g5': str(source)})
+        assert result == [[1, 2.5]]
+
+    def test_in_memory_arrays(self, tmp_path):
+        interp = SuiInterpreter()
+        assert interp.run("] v0 g5 1\n. v0", arrays={'g5': [4, 5]}) == [5]
+
+    def test_bad_file_size(self, tmp_path):
+        source = tmp_path / "bad.i64"
+        source.write_bytes(b"1234")
+        with pytest.raises(RuntimeError):
+            SuiInterpreter().run(". g5", arrays={'g5': str(source)})
+
+    def test_dump_non_array(self, tmp_path):
+        interp = SuiInterpreter()
+        interp.run("= g5 1")
+        with pytest.raises(RuntimeError):
+            interp.dump_array('g5', str(tmp_path / "out.i64"))
+
+    def test_cli(self, tmp_path):
+        import subprocess
+        from array import array
+        source = tmp_path / "in.i64"
+        source.write_bytes(array('q', range(100)).tobytes())
+        program = tmp_path / "double.sui"
+        program.write_text(fill_loop("g5", 100, ["] v3 g5 v0", "* v3 v3 2"]) + "\n")
+        out = tmp_path / "out.i64"
+        script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sui.py")
+        for backend in ("interp", "auto"):
+            result = subprocess.run(
+                [sys.executable, script, "run", f"--backend={backend}", "--array", f"g5={source}",
+                 "--dump", f"g5={out}", str(program)],
+                capture_output=True, text=True
+            )
+            assert result.returncode == 0, result.stderr
+            assert array('q', out.read_bytes()).tolist() == [2 * i for i in range(100)]
+
+
+class TestLimits:
+    """Test resource limits"""
+
+    def test_step_budget(self):
+        interp = SuiInterpreter(output='capture', limits=Limits(steps=1000))
+        with pytest.raises(StepLimitExceeded) as e:
+            interp.run(": 0\n@ 0")
+        assert e.value.limit == 'steps' and e.value.value == 1000
+        assert 1000 < interp.steps < 1010
+
+    def test_step_budget_recursion(self):
+        code = "# 0 1 {\n+ v0 a0 1\n$ v1 0 v0\n^ v1\n}\n$ v0 0 0"
+        with pytest.raises(StepLimitExceeded):
+            SuiInterpreter(limits=Limits(steps=100)).run(code)
+
+    def test_timeout(self):
+        interp = SuiInterpreter(output='capture', timeout=0.1)
+        with pytest.raises(TimeLimitExceeded) as e:
+            interp.run(": 0\n@ 0")
+        assert e.value.limit == 'time' and e.value.value == 0.1
+        # Each run gets its own deadline
+        assert interp.run(". 1") == [1]
+
+    def test_timeout_recursion(self):
+        fib = "# 0 1 {\n< v0 a0 2\n? v0 1\n- v1 a0 1\n$ v2 0 v1\n- v1 a0 2\n$ v3 0 v1\n+ v2 v2 v3\n^ v2\n: 1\n^ a0\n}\n$ v0 0 40\n. v0"
+        with pytest.raises(TimeLimitExceeded):
+            SuiInterpreter(timeout=0.1).run(fib)
+
+    def test_timeout_keeps_step_budget(self):
+        interp = SuiInterpreter(limits=Limits(steps=50_000), timeout=60)
+        with pytest.raises(StepLimitExceeded):
+            interp.run(": 0\n@ 0")
+        assert 50_000 < interp.steps < 50_010
+
+    def test_step_budget_skips_vectorizing(self):
+        code = fill_loop("g0", 1000, ["* v3 v0 2"])
+        interp = SuiInterpreter(output='capture', limits=Limits(steps=500))
+        with pytest.raises(StepLimitExceeded):
+            interp.run(code)
+        assert interp.steps < 520
+        assert SuiInterpreter(limits=Limits(steps=100_000)).run(code) == []
+
+    def test_array_cells(self):
+        interp = SuiInterpreter(limits=Limits(array_cells=100))
+        assert interp.run("[ g0 60\n[ g1 40") == []
+        with pytest.raises(ArrayLimitExceeded):
+            interp.run("[ g0 60\n[ g1 41")
+        with pytest.raises(ArrayLimitExceeded):
+            interp.run("[ v0 999999999")
+
+    def test_depth(self):
+        code = "# 0 1 {\n< v0 a0 1\n? v0 1\n- v1 a0 1\n$ v2 0 v1\n^ v2\n: 1\n^ 0\n}\n$ v0 0 g101"
+        assert SuiInterpreter(limits=Limits(depth=5)).run(code, args=[4]) == []
+        with pytest.raises(DepthLimitExceeded):
+            SuiInterpreter(limits=Limits(depth=5)).run(code, args=[5])
+
+    def test_output(self):
+        interp = SuiInterpreter(output='capture', limits=Limits(output=3))
+        with pytest.raises(OutputLimitExceeded):
+            interp.run(": 0\n. 1\n@ 0")
+        assert interp.output == [1, 1, 1]
+
+    def test_errors_are_runtime_errors(self):
+        assert issubclass(SuiLimitError, RuntimeError)
+        assert all(issubclass(cls, SuiLimitError) for cls in
+                   (StepLimitExceeded, ArrayLimitExceeded, DepthLimitExceeded, OutputLimitExceeded))
+
+    def test_cli(self, tmp_path):
+        import subprocess
+        program = tmp_path / "forever.sui"
+        program.write_text(": 0\n@ 0\n")
+        script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sui.py")
+        for backend in ("interp", "py", "auto"):
+            result = subprocess.run(
+                [sys.executable, script, "run", f"--backend={backend}", "--max-steps=1000", str(program)],
+                capture_output=True, text=True, timeout=30
+            )
+            assert result.returncode == 1
+            assert "steps limit exceeded" in result.stderr
+
+
+class TestCanonicalize:
+    """Test the canonicalizing minifier"""
+
+    SPARSE = """; squares
+# 12 1 {
+  * v57 a0 a0   ; square
+  ^ v57
+}
+= g40 0
+= v9 0
+: 90
+< v3 v9 g101
+? v3 17
+@ 91
+: 17
+$ v88 12 v9
++ g40 g40 v88
++ v9 v9 1
+@ 90
+: 91
+. g40
+"""
+
+    def test_dense_renumbering(self):
+        assert canonicalize(self.SPARSE) == (
+            "# 0 1 {\n* v0 a0 a0\n^ v0\n}\n= g0 0\n= v0 0\n: 0\n< v1 v0 g101\n? v1 1\n@ 2\n"
+            ": 1\n$ v2 0 v0\n+ g0 g0 v2\n+ v0 v0 1\n@ 0\n: 2\n. g0\n"
+        )
+
+    def test_same_results(self):
+        canonical = canonicalize(self.SPARSE)
+        assert canonicalize(canonical) == canonical
+        for n in (0, 4):
+            assert SuiInterpreter().run(canonical, args=[n]) == SuiInterpreter().run(self.SPARSE, args=[n])
+
+    def test_dynamic_calls_keep_function_ids(self):
+        code = "# 7 0 {\n^ 1\n}\n= v5 7\n$ v2 v5\n. v2"
+        assert canonicalize(code) == "# 7 0 {\n^ 1\n}\n= v0 7\n$ v1 v0\n. v1\n"
+
+    def test_strings_untouched(self):
+        assert canonicalize('= v3 "v3 g5 : 9"\n. v3') == '= v0 "v3 g5 : 9"\n. v0\n'
+
+    def test_bad_label(self):
+        with pytest.raises(ValueError):
+            canonicalize("@ x")
+
+    def test_cli(self, tmp_path):
+        import subprocess
+        program = tmp_path / "sparse.sui"
+        program.write_text(self.SPARSE)
+        script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sui.py")
+        result = subprocess.run([sys.executable, script, "--canonicalize", str(program)],
+                                capture_output=True, text=True)
+        assert result.returncode == 0, result.stderr
+        assert result.stdout == canonicalize(self.SPARSE)
+        assert "bytes: " in result.stderr and "saved" in result.stderr
+        assert count_tokens(result.stdout)[0] <= count_tokens(self.SPARSE)[0]
+
 
 class TestStrings:
     """Test string operations"""
@@ -308,3 +719,168 @@ class TestValidation:
         assert valid is False
         assert "Unknown instruction" in msg
 
+
+
+class TestBackendSelection:
+    """Test automatic backend selection for `sui run`"""
+
+    LOOP = "= v0 0\n: 0\n< v1 v0 3\n! v2 v1\n? v2 1\n{op}\n+ v0 v0 1\n@ 0\n: 1"
+
+    def test_straight_line_uses_interpreter(self):
+        backend, _ = select_backend("= g0 1\n+ g0 g0 2\n. g0")
+        assert backend == 'interp'
+
+    def test_integer_loop_uses_wasm(self):
+        backend, _ = select_backend(self.LOOP.format(op=". v0"))
+        assert backend == 'wasm'
+
+    def test_recursion_uses_wasm(self):
+        code = "# 0 1 {\n< v0 a0 2\n? v0 1\n- v1 a0 1\n$ v2 0 v1\n^ v2\n: 1\n^ a0\n}\n$ g0 0 5\n. g0"
+        assert 'recursion' in program_features(code)
+        assert select_backend(code)[0] == 'wasm'
+
+    def test_division_falls_back_to_python(self):
+        backend, reason = select_backend(self.LOOP.format(op="/ v3 v0 2\n. v3"))
+        assert backend == 'py'
+        assert "'/'" in reason
+
+    def test_printed_strings_stay_on_wasm(self):
+        backend, _ = select_backend(self.LOOP.format(op='. "hi"'))
+        assert backend == 'wasm'
+
+    def test_spaced_strings_and_division_use_interpreter(self):
+        backend, _ = select_backend(self.LOOP.format(op='/ v3 v0 2\n. "a b"'))
+        assert backend == 'interp'
+
+    def test_wasm_unavailable(self):
+        backend, reason = select_backend(self.LOOP.format(op=". v0"), wasm_available=False)
+        assert backend == 'py'
+        assert "wasmtime not installed" in reason
+
+    def test_arguments(self):
+        code = self.LOOP.format(op="+ v3 v0 g101\n. v3")
+        assert select_backend(code, ["5"])[0] == 'wasm'
+        assert select_backend(code, ["abc"])[0] == 'py'
+        assert select_backend(code, ["1.5"])[0] == 'interp'
+
+    def test_logical_ops_avoid_wasm(self):
+        backend, reason = select_backend(self.LOOP.format(op="& v3 v0 2\n. v3"))
+        assert backend == 'py'
+        assert "'&'" in reason
+
+    def test_global_writes_in_functions(self):
+        code = "# 0 0 {\n+ g0 g0 1\n^ 0\n}\n= v0 0\n: 0\n$ v1 0\n% v2 g0 3\n+ v0 v0 1\n< v3 v0 3\n? v3 0"
+        assert 'global_write' in program_features(code)
+        assert select_backend(code)[0] == 'interp'
+
+
+def fill_loop(array, size, value_lines, label=0):
+    """Sui loop setting array[i] from the counter i (value_lines compute v3 from v0)"""
+    return "\n".join([
+        "= v0 0", f": {label}", f"< v1 v0 {size}", "! v2 v1", f"? v2 {label + 1}",
+        *value_lines, f"{{ {array} v0 v3", "+ v0 v0 1", f"@ {label}", f": {label + 1}",
+    ])
+
+
+class TestCountedLoopVectorization:
+    """Test NumPy execution of counted array loops"""
+
+    def run_both(self, code, capsys):
+        """Run vectorized and scalar, check they agree, return (output, vectorized loop count)"""
+        pytest.importorskip("numpy")
+        interp = SuiInterpreter()
+        output = interp.run(code)
+        scalar = SuiInterpreter()
+        scalar.find_counted_loops = lambda lines, labels: {}
+        expected = scalar.run(code)
+        capsys.readouterr()
+        assert output == expected
+        assert [type(x) for x in output] == [type(x) for x in expected]
+        return output, interp.vectorized_loops
+
+    def test_fill_and_sum(self, capsys):
+        code = "[ g0 1000\n" + fill_loop("g0", 1000, ["* v3 v0 v0", "% v3 v3 11"]) + "\n" + """
+= g1 0
+= v0 0
+: 2
+< v1 v0 1000
+! v2 v1
+? v2 3
+] v4 g0 v0
++ g1 g1 v4
++ v0 v0 1
+@ 2
+: 3
+. g1
+. v4
+. v0
+. v1
+"""
+        output, vectorized = self.run_both(code, capsys)
+        assert vectorized == 2
+        assert output[0] == sum(i * i % 11 for i in range(1000))
+
+    def test_affine_offsets_and_division(self, capsys):
+        code = "[ g0 200\n[ g1 200\n" + fill_loop("g0", 200, ["* v3 v0 3"]) + "\n" + """
+= v0 0
+: 2
+< v1 v0 199
+! v2 v1
+? v2 3
++ v5 v0 1
+] v6 g0 v5
+] v7 g0 v0
+- v8 v6 v7
+/ v9 v8 2
+{ g1 v0 v9
++ v0 v0 1
+@ 2
+: 3
+] v4 g1 198
+. v4
+] v4 g1 199
+. v4
+"""
+        output, vectorized = self.run_both(code, capsys)
+        assert vectorized == 2
+        assert output == [1.5, 0]
+
+    def test_loop_carried_dependency_stays_scalar(self, capsys):
+        """Test that a[i + 1] = a[i] + 1 propagates like the scalar loop"""
+        code = "[ g0 100\n" + fill_loop("g0", 99, ["+ v5 v0 1", "] v3 g0 v0", "+ v3 v3 1", "{ g0 v5 v3"]) + "\n] v4 g0 99\n. v4"
+        output, vectorized = self.run_both(code, capsys)
+        assert vectorized == 0
+        assert output == [99]
+
+    def test_runtime_guards(self, capsys):
+        # Values past int64 keep Python's unbounded ints
+        code = "[ g0 64\n" + fill_loop("g0", 64, ["* v3 v0 4611686018427387904"]) + "\n] v4 g0 63\n. v4"
+        output, vectorized = self.run_both(code, capsys)
+        assert vectorized == 0
+        assert output == [63 * 2 ** 62]
+        # Out of range reads give 0 in the scalar loop
+        code = "[ g0 64\n[ g1 40\n" + fill_loop("g0", 64, ["] v3 g1 v0", "+ v3 v3 1"]) + "\n] v4 g0 50\n. v4"
+        output, vectorized = self.run_both(code, capsys)
+        assert vectorized == 0
+        assert output == [1]
+
+    def test_float_reduction_order(self, capsys):
+        code = "[ g0 100\n" + fill_loop("g0", 100, ["+ v3 v0 0.5", "/ v3 1 v3", "+ v3 v3 0.1"]) + "\n" + """
+= g1 0
+= v0 1
+: 2
+> v1 v0 99
+? v1 3
+] v4 g0 v0
++ g1 g1 v4
++ v0 v0 1
+@ 2
+: 3
+. g1
+"""
+        output, vectorized = self.run_both(code, capsys)
+        assert vectorized == 2
+        total = 0
+        for i in range(1, 100):
+            total += 1 / (i + 0.5) + 0.1
+        assert output == [total]
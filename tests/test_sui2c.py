@@ -0,0 +1,95 @@
+"""Tests for the Sui to C compiler (sui2c)"""
+
+import pytest
+import shutil
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sui import SuiInterpreter
+from sui2c import Sui2CTranspiler, find_compiler, load
+
+requires_cc = pytest.mark.skipif(shutil.which(find_compiler()) is None, reason="no C compiler")
+
+FIB = "# 0 1 {\n< v0 a0 2\n! v1 v0\n? v1 1\n^ a0\n: 1\n- v2 a0 1\n$ v3 0 v2\n- v4 a0 2\n$ v5 0 v4\n+ v6 v3 v5\n^ v6\n}\n$ g0 0 10\n. g0"
+
+
+class TestSui2CTypes:
+    """Test type inference"""
+
+    def test_integer_function(self):
+        transpiler = Sui2CTranspiler()
+        code = transpiler.transpile(FIB)
+        assert "int64_t f0(int64_t a0)" in code
+        assert "goto L1;" in code
+
+    def test_float_propagates(self):
+        transpiler = Sui2CTranspiler()
+        code = transpiler.transpile("# 0 1 {\n* v0 a0 2\n^ v0\n}\n$ g0 0 1.5\n. g0")
+        assert "double f0(double a0)" in code
+        assert "double g0 = 0;" in code
+
+    def test_division_is_float(self):
+        transpiler = Sui2CTranspiler()
+        code = transpiler.transpile("/ v0 7 2\n. v0")
+        assert "double v0 = 0;" in code
+        assert "sui_div(" in code
+
+    def test_arrays(self):
+        transpiler = Sui2CTranspiler()
+        code = transpiler.transpile("[ g0 3\n{ g0 1 5\n] v0 g0 1\n. v0")
+        assert "sui_elem_t * g0 = 0;" in code
+        assert "typedef long long sui_elem_t;" in code
+
+    def test_array_used_as_number(self):
+        with pytest.raises(NotImplementedError):
+            Sui2CTranspiler().transpile("[ v0 3\n+ v1 v0 1")
+
+    def test_string_values_unsupported(self):
+        with pytest.raises(NotImplementedError):
+            Sui2CTranspiler().transpile('= v0 "text"')
+
+
+@requires_cc
+class TestSui2CNative:
+    """Test compiled programs against the interpreter"""
+
+    def run_both(self, code, capfd):
+        lib = load(code)
+        lib.main()
+        native = capfd.readouterr().out.split()
+        expected = [str(v) for v in SuiInterpreter().run(code)]
+        capfd.readouterr()
+        return native, expected
+
+    def test_fibonacci(self, capfd):
+        native, expected = self.run_both(FIB, capfd)
+        assert native == expected == ["55"]
+
+    def test_python_arithmetic(self, capfd):
+        code = "/ v0 7 2\n. v0\n/ v1 6 3\n. v1\n% v2 -7 3\n. v2\n* v3 0.1 3\n. v3\n/ v4 1 3\n. v4"
+        native, expected = self.run_both(code, capfd)
+        assert native == expected
+
+    def test_array_indexing(self, capfd):
+        code = "[ g0 4\n{ g0 0 5\n{ g0 -1 9\n] v0 g0 3\n. v0\n] v1 g0 10\n. v1"
+        native, expected = self.run_both(code, capfd)
+        assert native == expected == ["9", "0"]
+
+    def test_call_from_python(self):
+        lib = load(FIB)
+        assert lib.call(0, 20) == 6765
+
+    def test_array_arguments_copied_back(self):
+        code = "# 0 2 {\n= v0 0\n: 0\n< v1 v0 a1\n! v2 v1\n? v2 1\n] v3 a0 v0\n* v3 v3 2\n{ a0 v0 v3\n+ v0 v0 1\n@ 0\n: 1\n^ 0\n}"
+        lib = load(code)
+        values = [1, 2, 3]
+        lib.call(0, values, 3)
+        assert values == [2, 4, 6]
+
+    def test_globals(self):
+        lib = load("# 0 0 {\n+ g0 g0 1\n^ g0\n}")
+        lib.set_global(0, 41)
+        assert lib.call(0) == 42
+        assert lib.get_global(0) == 42
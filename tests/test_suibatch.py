@@ -0,0 +1,101 @@
+"""Tests for the batch runner (sui batch)"""
+
+import io
+import json
+import pytest
+import sys
+import os
+import subprocess
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from suibatch import run_job, run_batch, iter_jobs, output_matches
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LOOP_FOREVER = ": 0\n@ 0"
+
+
+class TestRunJob:
+    """Test running a single job"""
+
+    def test_ok_with_expected(self):
+        result = run_job({"id": "a", "code": "= v0 6\n* v1 v0 7\n. v1", "expected": [42]})
+        assert result["status"] == "ok"
+        assert result["output"] == [42]
+        assert result["match"] is True
+        assert result["steps"] == 3
+        assert result["elapsed"] >= 0
+
+    def test_args_and_stdin(self):
+        code = ", v0\n+ v1 v0 g101\n. v1"
+        assert run_job({"code": code, "args": [2], "stdin": "40\n"})["output"] == [42]
+        assert run_job({"code": code, "args": [2], "stdin": [1.5]})["output"] == [3.5]
+        # Without stdin, `,` sees end of input instead of the worker's stdin
+        assert run_job({"code": code, "args": [2]})["status"] == "error"
+
+    def test_error_keeps_output(self):
+        result = run_job({"code": ". 1\n/ v0 1 0", "expected": [1]})
+        assert result["status"] == "error"
+        assert "ZeroDivisionError" in result["error"]
+        assert result["output"] == [1]
+        assert result["match"] is False
+
+    def test_timeout(self):
+        result = run_job({"code": LOOP_FOREVER}, timeout=0.2)
+        assert result["status"] == "timeout"
+        assert result["steps"] > 0
+
+    def test_timeout_needs_no_signals(self):
+        # Signal handlers can only be set on the main thread, and Windows has no SIGALRM
+        results = []
+        thread = threading.Thread(target=lambda: results.append(run_job({"code": LOOP_FOREVER}, timeout=0.2)))
+        thread.start()
+        thread.join(10)
+        assert results[0]["status"] == "timeout"
+
+    def test_limits(self):
+        result = run_job({"code": LOOP_FOREVER, "limits": {"steps": 1000}})
+        assert result["status"] == "error"
+        assert result["error"].startswith("StepLimitExceeded")
+        assert run_job({"code": ". 1", "limits": {"bogus": 1}})["status"] == "error"
+
+    def test_missing_code(self):
+        result = run_job({"id": 3})
+        assert result["status"] == "error"
+        assert "code" in result["error"]
+
+    def test_output_matches(self):
+        assert output_matches([1, "a"], [1, "a"])
+        assert output_matches([1, 2.5], "1\n2.5\n")
+        assert not output_matches([1], [1, 2])
+
+
+class TestRunBatch:
+    """Test the process pool and JSONL streams"""
+
+    def test_results_in_order(self, tmp_path):
+        source = tmp_path / "jobs.jsonl"
+        jobs = [{"id": i, "code": f"* v0 {i} {i}\n. v0", "expected": [i * i]} for i in range(20)]
+        jobs[5] = {"id": 5, "code": LOOP_FOREVER}
+        source.write_text("\n".join(json.dumps(job) for job in jobs) + "\n{bad\n")
+        out = io.StringIO()
+        counts = run_batch(iter_jobs(str(source)), out, workers=2, timeout=0.5)
+        results = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert [r["id"] for r in results] == list(range(20)) + [21]
+        assert results[5]["status"] == "timeout"
+        assert all(r["match"] for i, r in enumerate(results[:20]) if i != 5)
+        assert results[20]["status"] == "error"
+        assert counts == {"ok": 19, "timeout": 1, "error": 1}
+
+    def test_cli(self):
+        jobs = '{"id": "x", "code": ". 7", "expected": "7"}\n'
+        result = subprocess.run(
+            [sys.executable, os.path.join(ROOT, "sui.py"), "batch", "-", "--workers", "1"],
+            input=jobs, capture_output=True, text=True
+        )
+        assert result.returncode == 0, result.stderr
+        assert json.loads(result.stdout)["match"] is True
+        assert "Ran 1 jobs" in result.stderr
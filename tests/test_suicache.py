@@ -0,0 +1,110 @@
+"""Tests for the result cache"""
+
+import io
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sui import Limits, SuiInterpreter
+from suicache import ResultCache, normalize
+from suibatch import run_batch
+
+
+COUNT = "= v0 0\n: 0\n+ v0 v0 1\n< v1 v0 5\n? v1 0\n. v0"
+
+
+class TestNormalize:
+    """Test the canonical program form"""
+
+    def test_comments_whitespace_and_names(self):
+        renamed = "; count to five\n= v7   0\n: 4 ; loop\n+ v7 v7 1\n<\tv2 v7 5\n? v2 4\n. v7\n"
+        assert normalize(renamed) == normalize(COUNT) == COUNT
+
+    def test_functions_numbered_separately(self):
+        code = "# 0 1 {\n: 9\n+ v4 a0 1\n^ v4\n}\n= v3 1\n: 2\n$ v8 0 v3\n. v8"
+        assert normalize(code) == "# 0 1 {\n: 0\n+ v0 a0 1\n^ v0\n}\n= v0 1\n: 0\n$ v1 0 v0\n. v1"
+
+    def test_keeps_meaningful_differences(self):
+        cache = ResultCache("unused")
+        assert cache.key(COUNT) != cache.key(COUNT.replace("5", "6"))
+        assert cache.key(COUNT) != cache.key(COUNT.replace("v0", "g0"))
+        assert cache.key(COUNT, args=[1]) != cache.key(COUNT, args=["1"])
+        assert cache.key(COUNT, stdin="1") != cache.key(COUNT)
+        assert cache.key(COUNT, limits=Limits(steps=10)) == cache.key(COUNT, limits={"steps": 10})
+        assert cache.key(COUNT, limits=Limits()) == cache.key(COUNT)
+
+
+class TestResultCache:
+    """Test storage and eviction"""
+
+    def test_round_trip(self, tmp_path):
+        cache = ResultCache(str(tmp_path))
+        key = cache.key(COUNT)
+        assert cache.get(key) is None
+        cache.put(key, {"status": "ok", "output": [1, 2.5, "a", [3]]})
+        assert ResultCache(str(tmp_path)).get(key)["output"] == [1, 2.5, "a", [3]]
+        assert (cache.hits, cache.misses) == (0, 1)
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        cache = ResultCache(str(tmp_path), max_bytes=1000)
+        entry = {"output": ["x" * 300]}
+        for name in "abc":
+            cache.put(name * 64, entry)
+            os.utime(cache._file(name * 64), (0, ord(name)))
+        cache.get("a" * 64)  # now the most recently used
+        cache.put("d" * 64, entry)
+        assert cache.get("b" * 64) is None
+        assert cache.get("a" * 64) is not None and cache.get("d" * 64) is not None
+        assert cache.total <= 1000
+
+    def test_clear(self, tmp_path):
+        cache = ResultCache(str(tmp_path))
+        cache.put("e" * 64, {"output": []})
+        cache.clear()
+        assert cache.entries() == []
+
+
+class TestCachedRuns:
+    """Test the cache in front of the interpreter and sui batch"""
+
+    def test_interpreter_hit_skips_execution(self, tmp_path):
+        cache = ResultCache(str(tmp_path))
+        assert SuiInterpreter(output='capture', cache=cache).run(COUNT) == [5]
+        # A hit is answered from the stored entry, so an edited one shows through
+        key = cache.key(COUNT)
+        cache.put(key, dict(cache.get(key), output=[99]))
+        interp = SuiInterpreter(output='capture', cache=str(tmp_path))
+        assert interp.run(COUNT.replace("v0", "v3")) == [99]
+        assert interp.steps == 22
+
+    def test_interpreter_skips_input_and_errors(self, tmp_path):
+        cache = ResultCache(str(tmp_path))
+        SuiInterpreter(input=["4"], cache=cache).run(", v0\n. v0")
+        try:
+            SuiInterpreter(cache=cache).run("/ v0 1 0")
+        except ZeroDivisionError:
+            pass
+        assert cache.entries() == []
+
+    def test_output_sinks_see_cached_values(self, tmp_path):
+        SuiInterpreter(output='null', cache=str(tmp_path)).run(COUNT)
+        seen = []
+        SuiInterpreter(output=seen.append, cache=str(tmp_path)).run(COUNT)
+        assert seen == [5]
+
+    def test_batch(self, tmp_path):
+        cache = ResultCache(str(tmp_path / "cache"))
+        jobs = [{"id": i, "code": COUNT.replace("v1", f"v{i + 2}"), "expected": [5 if i else 6]} for i in range(6)]
+        jobs.append({"id": "err", "code": "/ v0 1 0"})
+        for expect_cached in (False, True):
+            out = io.StringIO()
+            run_batch(jobs, out, workers=1, cache=cache)
+            results = [json.loads(line) for line in out.getvalue().splitlines()]
+            assert [r["id"] for r in results] == [0, 1, 2, 3, 4, 5, "err"]
+            assert [r["match"] for r in results[:6]] == [False] + [True] * 5
+            assert results[-1]["status"] == "error"
+            assert results[0].get("cached", False) is expect_cached
+            assert all(r["cached"] for r in results[1:6])
+        assert len(cache.entries()) == 2
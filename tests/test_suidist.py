@@ -0,0 +1,159 @@
+"""Tests for distributed batch runs (sui batch --coordinator / --worker)"""
+
+import importlib.util
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from suicache import ResultCache
+from suidist import Coordinator, Worker, parse_address
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def square_jobs(count):
+    return [{"id": i, "code": f"* v0 {i} {i}\n. v0", "expected": [i * i]} for i in range(count)]
+
+
+def start(coordinator):
+    """Run a coordinator in a background thread; join() it for the counts"""
+    thread = threading.Thread(target=lambda: setattr(thread, 'counts', coordinator.run()), daemon=True)
+    thread.start()
+    return thread
+
+
+def connect(address):
+    """A raw worker connection: request(obj) -> response, plus the socket (shut it down to drop the worker)"""
+    sock = socket.create_connection(address)
+    stream = sock.makefile('rwb')
+
+    def request(obj):
+        stream.write(json.dumps(obj).encode() + b"\n")
+        stream.flush()
+        return json.loads(stream.readline())
+    return request, sock
+
+
+def wait_for(condition, timeout=20.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.02)
+
+
+class TestCoordinator:
+    """Test sharding, stealing and retries on localhost"""
+
+    def test_results_in_order(self):
+        jobs = square_jobs(60)
+        jobs[3] = {"id": 3, "code": ": 0\n@ 0"}
+        out = io.StringIO()
+        coordinator = Coordinator(jobs, out, ('127.0.0.1', 0), timeout=0.5)
+        thread = start(coordinator)
+        workers = [threading.Thread(target=Worker(coordinator.address, slots=2).run) for _ in range(2)]
+        for worker in workers:
+            worker.start()
+        thread.join(30)
+        results = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert [r["id"] for r in results] == list(range(60))
+        assert results[3]["status"] == "timeout"
+        assert thread.counts == {"ok": 59, "timeout": 1}
+        for worker in workers:
+            worker.join(10)
+            assert not worker.is_alive()
+
+    def test_timeouts_need_no_signals(self):
+        # Timeouts come from the interpreter's deadline (wasmtime's epoch for wasm), not SIGALRM
+        jobs = [{"id": 0, "code": ": 0\n@ 0"}, {"id": 1, "code": ". 1", "expected": [1]}]
+        if importlib.util.find_spec("wasmtime") is not None:
+            jobs.append({"id": 2, "code": ": 0\n@ 0", "backend": "wasm"})
+        out = io.StringIO()
+        coordinator = Coordinator(jobs, out, ('127.0.0.1', 0), timeout=0.3)
+        thread = start(coordinator)
+        started = time.monotonic()
+        Worker(coordinator.address, slots=2).run()
+        thread.join(10)
+        statuses = [json.loads(line)["status"] for line in out.getvalue().splitlines()]
+        assert statuses == ["timeout", "ok", "timeout"][:len(jobs)]
+        assert time.monotonic() - started < 20
+
+    def test_dead_worker_jobs_are_retried(self):
+        out = io.StringIO()
+        coordinator = Coordinator(square_jobs(20), out, ('127.0.0.1', 0))
+        thread = start(coordinator)
+        request, sock = connect(coordinator.address)
+        request({"op": "hello", "slots": 1})
+        assert len(request({"op": "take", "n": 5})["jobs"]) == 5
+        sock.shutdown(socket.SHUT_RDWR)
+        wait_for(lambda: coordinator.retried == 5)
+        Worker(coordinator.address, slots=1).run()
+        thread.join(10)
+        assert thread.counts == {"ok": 20}
+        assert all(json.loads(line)["match"] for line in out.getvalue().splitlines())
+
+    def test_idle_worker_steals(self):
+        out = io.StringIO()
+        coordinator = Coordinator(square_jobs(10), out, ('127.0.0.1', 0))
+        thread = start(coordinator)
+        request, sock = connect(coordinator.address)
+        request({"op": "hello", "slots": 1})
+        held = [seq for seq, _ in request({"op": "take", "n": 10})["jobs"]]
+        assert held == list(range(10))
+        # A second worker finds the queue empty and takes the slow worker's unstarted jobs
+        worker = threading.Thread(target=Worker(coordinator.address, slots=1).run, daemon=True)
+        worker.start()
+        wait_for(lambda: coordinator.stolen == 9)
+        cancelled = request({"op": "take", "n": 1})["cancel"]
+        assert sorted(cancelled) == list(range(1, 10))
+        assert request({"op": "result", "seq": 0, "result": {"status": "ok", "output": [0], "match": True}})["done"] is False
+        thread.join(10)
+        sock.shutdown(socket.SHUT_RDWR)
+        assert thread.counts == {"ok": 10}
+        assert [json.loads(line)["id"] for line in out.getvalue().splitlines()] == list(range(10))
+
+    def test_cached_jobs_need_no_workers(self, tmp_path):
+        cache = ResultCache(str(tmp_path))
+        jobs = square_jobs(5)
+        for job in jobs:
+            cache.put(cache.key(job["code"]), {"status": "ok", "output": job["expected"]})
+        out = io.StringIO()
+        assert Coordinator(jobs, out, ('127.0.0.1', 0), cache=cache).run() == {"ok": 5}
+        assert all(json.loads(line)["cached"] for line in out.getvalue().splitlines())
+
+    def test_parse_address(self):
+        assert parse_address("10.0.0.2:9000") == ("10.0.0.2", 9000)
+        assert parse_address(":9000") == ("127.0.0.1", 9000)
+        assert parse_address("host") == ("host", 7879)
+
+
+class TestCli:
+    """Test the coordinator and worker commands together"""
+
+    def test_coordinator_and_workers(self, tmp_path):
+        source = tmp_path / "jobs.jsonl"
+        source.write_text("".join(json.dumps(job) + "\n" for job in square_jobs(30)))
+        out = tmp_path / "out.jsonl"
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        script = os.path.join(ROOT, "sui.py")
+        coordinator = subprocess.Popen(
+            [sys.executable, script, "batch", str(source), "--coordinator", "--listen", f"127.0.0.1:{port}",
+             "-o", str(out)], stderr=subprocess.PIPE, text=True
+        )
+        assert "coordinating on" in coordinator.stderr.readline()
+        workers = [subprocess.Popen([sys.executable, script, "batch", "--worker", f"127.0.0.1:{port}",
+                                     "--workers", "1"], stderr=subprocess.PIPE, text=True) for _ in range(2)]
+        assert coordinator.wait(timeout=60) == 0
+        assert "Ran 30 jobs" in coordinator.stderr.read()
+        for worker in workers:
+            assert worker.wait(timeout=20) == 0
+        assert [json.loads(line)["id"] for line in out.read_text().splitlines()] == list(range(30))
@@ -0,0 +1,117 @@
+"""Tests for the execution server (sui serve)"""
+
+import json
+import pytest
+import socket
+import sys
+import os
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from suiserve import SuiServer, percentile
+
+
+@pytest.fixture
+def serve():
+    """Start servers in background threads and stop them after the test"""
+    servers = []
+
+    def start(address=('127.0.0.1', 0), **options):
+        server = SuiServer(address, workers=1, **options)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def connect(address):
+    """A request(obj) -> response function over one connection"""
+    if isinstance(address, str):
+        sock = socket.socket(socket.AF_UNIX)
+        sock.connect(address)
+    else:
+        sock = socket.create_connection(address)
+    stream = sock.makefile('rwb')
+
+    def request(obj):
+        stream.write((obj if isinstance(obj, str) else json.dumps(obj)).encode() + b"\n")
+        stream.flush()
+        return json.loads(stream.readline())
+    return request
+
+
+class TestSuiServer:
+    """Test the JSON-lines protocol"""
+
+    def test_run_and_stats(self, serve):
+        request = connect(serve().address)
+        result = request({"op": "run", "id": 7, "code": ", v0\n* v1 v0 2\n. v1", "stdin": "21", "expected": [42]})
+        assert result["id"] == 7
+        assert result["status"] == "ok"
+        assert result["output"] == [42]
+        assert result["match"] is True
+        request({"code": ". 1"})
+        stats = request({"op": "stats"})
+        assert stats["runs"] == 2
+        assert stats["queue_depth"] == 0
+        assert stats["p50_ms"] > 0 and stats["p99_ms"] >= stats["p50_ms"]
+        assert stats["runs_per_second"] > 0
+
+    def test_timeout_keeps_serving(self, serve):
+        request = connect(serve(timeout=0.2).address)
+        assert request({"code": ": 0\n@ 0"})["status"] == "timeout"
+        assert request({"code": ". 5"})["output"] == [5]
+
+    @pytest.mark.parametrize("timeout", ["x", None, -1, 0, float("inf"), [1]])
+    def test_bad_timeouts_rejected(self, serve, timeout):
+        request = connect(serve(timeout=0.2).address)
+        result = request({"id": 3, "code": ": 0\n@ 0", "timeout": timeout})
+        assert result["status"] == "error" and result["id"] == 3
+        assert '"timeout"' in result["error"]
+        assert request({"code": ". 5"})["output"] == [5]
+
+    def test_timeout_clamped_to_server(self, serve):
+        request = connect(serve(timeout=0.2).address)
+        result = request({"code": ": 0\n@ 0", "timeout": 3600})
+        assert result["status"] == "timeout"
+        assert result["elapsed"] < 5
+        assert request({"code": ": 0\n@ 0", "timeout": 0.05})["status"] == "timeout"
+
+    def test_unexpected_errors_keep_connection(self, serve, monkeypatch):
+        server = serve()
+        monkeypatch.setattr(server, "run", lambda job: 1 / 0)
+        request = connect(server.address)
+        result = request({"id": "a", "code": ". 1"})
+        assert result == {"status": "error", "error": "ZeroDivisionError: division by zero", "id": "a"}
+        assert request({"op": "stats"})["runs"] == 0
+
+    def test_bad_requests(self, serve):
+        request = connect(serve().address)
+        assert "bad request" in request("not json")["error"]
+        assert "bad request" in request("[1]")["error"]
+        assert "unknown op" in request({"op": "reboot"})["error"]
+        assert request({"op": "run"})["status"] == "error"
+
+    @pytest.mark.skipif(sys.platform == 'win32' or not hasattr(socket, 'AF_UNIX'), reason="no Unix sockets")
+    def test_unix_socket(self, serve, tmp_path):
+        path = str(tmp_path / "sui.sock")
+        server = serve(path)
+        assert connect(path)({"code": ". 3"})["output"] == [3]
+        server.shutdown()
+        assert not os.path.exists(path)
+
+    @pytest.mark.skipif(sys.version_info < (3, 11), reason="needs max_tasks_per_child")
+    def test_isolated_runs(self, serve):
+        request = connect(serve(isolate=True).address)
+        for _ in range(2):
+            assert request({"code": ". 1"})["output"] == [1]
+        assert request({"op": "stats"})["isolate"] is True
+
+    def test_percentile(self):
+        assert percentile([], 0.5) is None
+        assert percentile([3, 1, 2], 0.5) == 2
+        assert percentile(list(range(100)), 0.99) == 99
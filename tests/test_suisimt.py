@@ -0,0 +1,95 @@
+"""Tests for the SIMT batch runner (suisimt.SuiSimtRunner)"""
+
+import pytest
+import sys
+import os
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+np = pytest.importorskip("numpy")
+
+from sui import SuiInterpreter
+from suisimt import SuiSimtRunner
+
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "examples")
+
+COLLATZ = """
+# 0 1 {
+= v0 a0
+= v1 0
+: 0
+~ v2 v0 1
+? v2 1
+% v3 v0 2
+? v3 2
+/ v0 v0 2
+@ 3
+: 2
+* v0 v0 3
++ v0 v0 1
+: 3
++ v1 v1 1
+@ 0
+: 1
+^ v1
+}
+"""
+
+
+def interpret(code, func_id, *args):
+    interpreter = SuiInterpreter()
+    interpreter.run(code)
+    return interpreter.call_function(func_id, list(args))
+
+
+class TestSuiSimt:
+    """Test lockstep batch execution"""
+
+    def test_recursion(self):
+        with open(os.path.join(EXAMPLES, "fibonacci.sui")) as f:
+            code = f.read()
+        results = SuiSimtRunner(code).call(0, np.arange(15))
+        assert results.tolist() == [interpret(code, 0, n) for n in range(15)]
+
+    def test_divergent_loops(self):
+        """Test that lanes running different iteration counts all finish correctly"""
+        inputs = np.arange(1, 40)
+        runner = SuiSimtRunner(COLLATZ)
+        results = runner.call(0, inputs)
+        assert results.tolist() == [interpret(COLLATZ, 0, int(n)) for n in inputs]
+        # One dispatch serves many lanes
+        assert runner.steps < sum(results.tolist()) * 10
+
+    def test_multiple_arguments_and_python_semantics(self):
+        code = "# 0 2 {\n% v0 a0 a1\n/ v1 a0 a1\n+ v2 v0 v1\n^ v2\n}"
+        rows = np.array([[7, 2], [-7, 2], [7, -3], [9, 3]])
+        results = SuiSimtRunner(code).call(0, rows)
+        assert results.tolist() == [interpret(code, 0, int(a), int(b)) for a, b in rows]
+
+    def test_globals_per_lane(self):
+        code = "# 0 1 {\n+ g0 g0 a0\n$ v0 1\n^ g0\n}\n# 1 0 {\n* g0 g0 2\n^ 0\n}"
+        runner = SuiSimtRunner(code)
+        assert runner.call(0, np.array([1, 2, 3]), global_vars={0: 10}).tolist() == [22, 24, 26]
+        assert runner.global_vars[0].tolist() == [22, 24, 26]
+
+    def test_unsupported(self):
+        runner = SuiSimtRunner("# 0 1 {\n[ v0 a0\n^ v0\n}")
+        with pytest.raises(NotImplementedError):
+            runner.call(0, np.array([1]))
+        with pytest.raises(ValueError):
+            SuiSimtRunner(COLLATZ).call(0, np.zeros((3, 2)))
+
+    def test_division_by_zero(self):
+        with pytest.raises(ZeroDivisionError):
+            SuiSimtRunner("# 0 1 {\n/ v0 1 a0\n^ v0\n}").call(0, np.array([1, 0]))
+
+    def test_cli(self):
+        script = os.path.join(os.path.dirname(EXAMPLES), "suisimt.py")
+        result = subprocess.run(
+            [sys.executable, script, os.path.join(EXAMPLES, "fibonacci.sui"), "0"],
+            input="10\n20\n", capture_output=True, text=True
+        )
+        assert result.returncode == 0
+        assert result.stdout.split() == ["55", "6765"]
@@ -0,0 +1,572 @@
+"""Tests for the WebAssembly runtime (suiwasm.SuiWasmRuntime)"""
+
+import pytest
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("wasmtime")
+
+from sui import jit
+from suiwasm import SuiWasmRuntime
+
+
+INFINITE_LOOP = ": 0\n@ 0"
+
+
+@jit
+def jit_fib(n):
+    if n < 2:
+        return n
+    return jit_fib(n - 1) + jit_fib(n - 2)
+
+
+@jit
+def jit_sum_squares(n):
+    total = 0
+    for i in range(n + 1):
+        total += i * i
+    return total
+
+
+@jit
+def jit_depth(n):
+    if n == 0:
+        return 0
+    return jit_depth(n - 1) + 1
+
+
+SCALE = 3
+
+
+@jit
+def jit_uses_global(x):
+    return x * SCALE
+
+
+@jit
+def jit_mod(a, b):
+    return a % b
+
+
+@jit
+def jit_and(a, b):
+    return a and b
+
+
+@jit
+def jit_or(a, b):
+    return a or b
+
+
+@jit
+def jit_both_positive(a, b):
+    if a > 0 and not (b < 1 or a < 0):
+        return 1
+    return 0
+
+
+@jit
+def jit_factorial(n):
+    result = 1
+    for i in range(2, n + 1):
+        result *= i
+    return result
+
+
+@jit
+def jit_countdown(n):
+    total = 0
+    for i in range(n, 0, -1):
+        total += i
+    return total
+
+
+@jit
+def jit_step(n):
+    total = 0
+    for i in range(0, n, 3):
+        total += i
+    return total
+
+
+@jit
+def jit_skip_ahead(n):
+    count = 0
+    for i in range(n):
+        i = i + 1
+        count += 1
+    return count
+
+
+@jit
+def jit_last_index(n):
+    for i in range(n):
+        pass
+    return i
+
+
+@jit
+def jit_moving_bound(n):
+    count = 0
+    for i in range(n):
+        n = 2
+        count += 1
+    return count
+
+
+@jit
+def jit_is_even(n):
+    return n % 2 == 0
+
+
+@jit
+def jit_less(a, b):
+    return a < b
+
+
+@jit
+def jit_bool_or_int(n):
+    if n > 0:
+        return n < 10
+    return n
+
+
+class TestSuiWasmRun:
+    """Test plain execution"""
+
+    def test_run_output(self):
+        runtime = SuiWasmRuntime()
+        result, output = runtime.run("= g0 42\n. g0")
+        assert result == 0
+        assert output == [42]
+
+    def test_run_fibonacci(self):
+        runtime = SuiWasmRuntime()
+        _, output = runtime.run("# 0 1 {\n< v0 a0 2\n! v1 v0\n? v1 1\n^ a0\n: 1\n- v2 a0 1\n$ v3 0 v2\n- v4 a0 2\n$ v5 0 v4\n+ v6 v3 v5\n^ v6\n}\n$ g0 0 10\n. g0")
+        assert output == [55]
+
+
+class TestSuiWasmSandbox:
+    """Test fuel metering and deadlines"""
+
+    def test_completes_within_budget(self):
+        runtime = SuiWasmRuntime()
+        run = runtime.run_sandboxed("= g0 7\n. g0", fuel=10_000, timeout=5)
+        assert run.status == 'ok'
+        assert run.output == [7]
+        assert run.return_value == 0
+        assert 0 < run.fuel_consumed < 10_000
+        assert not run.budget_exceeded
+
+    def test_out_of_fuel(self):
+        runtime = SuiWasmRuntime()
+        run = runtime.run_sandboxed(INFINITE_LOOP, fuel=50_000)
+        assert run.status == 'out_of_fuel'
+        assert run.budget_exceeded
+        assert run.fuel_consumed == 50_000
+        assert run.return_value is None
+
+    def test_output_before_budget_is_kept(self):
+        runtime = SuiWasmRuntime()
+        run = runtime.run_sandboxed(". 1\n. 2\n" + INFINITE_LOOP, fuel=10_000)
+        assert run.status == 'out_of_fuel'
+        assert run.output == [1, 2]
+
+    def test_timeout(self):
+        runtime = SuiWasmRuntime()
+        run = runtime.run_sandboxed(INFINITE_LOOP, timeout=0.2)
+        assert run.status == 'timeout'
+        assert run.budget_exceeded
+        assert run.fuel_consumed is not None
+        assert run.elapsed < 5
+
+    def test_timeout_only_reports_fuel(self, tmp_path):
+        run = SuiWasmRuntime().run_sandboxed("= g0 7\n. g0", timeout=5)
+        assert run.status == 'ok'
+        assert 0 < run.fuel_consumed < 10_000
+        import subprocess
+        program = tmp_path / "loop.sui"
+        program.write_text(INFINITE_LOOP)
+        script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "suiwasm.py")
+        result = subprocess.run([sys.executable, script, "--timeout", "0.2", str(program)],
+                                capture_output=True, text=True, timeout=30)
+        assert result.returncode == 1
+        assert "timeout after" in result.stdout and "fuel consumed:" in result.stdout
+
+    def test_trap_is_reported(self):
+        runtime = SuiWasmRuntime()
+        run = runtime.run_sandboxed("= v0 0\n/ v1 1 v0\n. v1", fuel=10_000)
+        assert run.status == 'trap'
+        assert not run.budget_exceeded
+        assert run.error
+
+    def test_wasmtime_error_is_reported(self, monkeypatch):
+        from wasmtime import WasmtimeError
+
+        def main(store):
+            raise WasmtimeError("host call failed")
+
+        class Instance:
+            def exports(self, store):
+                return {"main": main}
+
+        runtime = SuiWasmRuntime()
+        monkeypatch.setattr(runtime, "_instantiate", lambda *args: Instance())
+        run = runtime.run_sandboxed(". 1", fuel=10_000)
+        assert run.status == 'trap'
+        assert run.error == "host call failed"
+        assert run.return_value is None
+
+    @pytest.mark.parametrize("wat, error", [
+        ('(module (import "env" "print_str" (func $p (param i32)))'
+         ' (func (export "main") (call $p (i32.const 0))))', "exports no memory"),
+        ('(module (import "env" "print_str" (func $p (param i32))) (memory (export "memory") 1)'
+         ' (func (export "main") (call $p (i32.const 70000))))', "out of bounds"),
+    ])
+    def test_print_str_guards_memory(self, wat, error):
+        from wasmtime import Engine, Module, Store, Trap
+        runtime = SuiWasmRuntime()
+        engine = Engine()
+        store = Store(engine)
+        instance = runtime.link(engine, store, Module(engine, wat))
+        with pytest.raises(Trap, match=error):
+            instance.exports(store)["main"](store)
+
+
+class TestSuiWasmHostIO:
+    """Test strings, input and command-line arguments"""
+
+    @pytest.fixture
+    def examples_dir(self):
+        return os.path.join(os.path.dirname(os.path.dirname(__file__)), 'examples')
+
+    def test_fizzbuzz_strings(self, examples_dir):
+        runtime = SuiWasmRuntime()
+        _, output = runtime.run_file(os.path.join(examples_dir, 'fizzbuzz.sui'))
+        assert output[:5] == [1, 2, "Fizz", 4, "Buzz"]
+        assert output[14] == "FizzBuzz"
+
+    def test_fib_args(self, examples_dir):
+        runtime = SuiWasmRuntime()
+        _, output = runtime.run_file(os.path.join(examples_dir, 'fib_args.sui'), args=["15"])
+        assert output == [610]
+
+    def test_fib_args_default(self, examples_dir):
+        runtime = SuiWasmRuntime()
+        _, output = runtime.run_file(os.path.join(examples_dir, 'fib_args.sui'))
+        assert output == [55]
+
+    def test_list_sum(self, examples_dir):
+        runtime = SuiWasmRuntime()
+        _, output = runtime.run_file(os.path.join(examples_dir, 'list_sum.sui'))
+        assert output == ["Sum:", 150]
+
+    def test_input(self):
+        runtime = SuiWasmRuntime()
+        _, output = runtime.run(", v0\n, v1\n+ v2 v0 v1\n. v2\n, v3\n. v3", stdin="5\n37\n")
+        assert output == [42, 0]
+
+
+class TestSuiWasmOutput:
+    """Test output sinks"""
+
+    def test_ring(self, capsys):
+        _, output = SuiWasmRuntime(output='ring:2').run(". 1\n. 2\n. 3")
+        assert output == [2, 3]
+        assert capsys.readouterr().out == ""
+
+    def test_callback(self):
+        seen = []
+        runtime = SuiWasmRuntime(output=seen.append)
+        runtime.run_sandboxed(". 4\n. \"hi\"", fuel=10_000)
+        assert seen == [4, "hi"]
+
+
+class TestSuiWasmArrayFiles:
+    """Test loading and dumping array files"""
+
+    def test_load_and_dump(self, tmp_path):
+        from array import array
+        source = tmp_path / "in.i64"
+        source.write_bytes(array('q', [3, -1, 7]).tobytes())
+        out = tmp_path / "out.i64"
+        runtime = SuiWasmRuntime()
+        _, output = runtime.run("] v0 g5 2\n. v0\n{ g5 1 9", arrays={'g5': str(source)},
+                                dumps={'g5': str(out)})
+        assert output == [7]
+        assert array('q', out.read_bytes()).tolist() == [3, 9, 7]
+
+    def test_out_of_i32_range(self):
+        with pytest.raises(RuntimeError):
+            SuiWasmRuntime().run(". g5", arrays={'g5': [2 ** 40]})
+
+    def test_dump_requires_loaded_array(self, tmp_path):
+        with pytest.raises(RuntimeError):
+            SuiWasmRuntime().run("[ g5 2", dumps={'g5': str(tmp_path / "out.i64")})
+
+
+FACTORIAL_20 = "= v0 1\n= v1 1\n: 0\n> v2 v1 20\n? v2 1\n* v0 v0 v1\n+ v1 v1 1\n@ 0\n: 1\n. v0"
+BIG_ARRAY = "[ v0 100000\n= v1 0\n: 0\n< v2 v1 100000\n! v3 v2\n? v3 1\n{ v0 v1 v1\n+ v1 v1 1\n@ 0\n: 1\n] v4 v0 99999\n. v4"
+
+
+AUTO_LOOP = "= v0 0\n: 0\n< v1 v0 3\n! v2 v1\n? v2 1\n{op}\n+ v0 v0 1\n@ 0\n: 1"
+
+
+def run_auto(code, capsys):
+    """Run a program the way `sui run` does, returning (backend, printed lines)"""
+    from sui import run_backend, select_backend
+    backend, _ = select_backend(code)
+    run_backend(code, backend, fallback=True)
+    return backend, capsys.readouterr().out.split()
+
+
+class TestAutoBackend:
+    """Test that `sui run` only keeps Wasm results that match the interpreter"""
+
+    def test_overflow_reruns_on_interpreter(self, capsys):
+        assert run_auto(FACTORIAL_20, capsys) == ('wasm', ['2432902008176640000'])
+        from suiwasm import Trap
+        with pytest.raises(Trap):
+            SuiWasmRuntime(output='capture').run(FACTORIAL_20, checked=True)
+
+    def test_logical_ops_avoid_wasm(self, capsys):
+        code = "= v0 0\n: 0\n< v1 v0 2\n! v3 v1\n? v3 1\n& v2 2 1\n| v4 0 2\n. v2\n. v4\n+ v0 v0 1\n@ 0\n: 1"
+        backend, printed = run_auto(code, capsys)
+        assert backend != 'wasm'
+        assert printed == ['1', '1', '1', '1']
+
+    def test_arrays_beyond_one_page(self, capsys):
+        assert run_auto(BIG_ARRAY, capsys) == ('wasm', ['99999'])
+        _, output = SuiWasmRuntime(output='capture').run(BIG_ARRAY, checked=True)
+        assert output == [99999]
+
+    def test_negative_index_reruns_on_interpreter(self, capsys):
+        code = BIG_ARRAY + "\n- v5 0 1\n] v6 v0 v5\n. v6"
+        assert run_auto(code, capsys) == ('wasm', ['99999', '99999'])
+
+    @pytest.mark.parametrize("code, feature", [
+        ("[ g0 3\n" + AUTO_LOOP.format(op="{ g0 v0 v0") + "\n. g0", 'array_values'),
+        ("[ g0 2\n[ g1 2\n" + AUTO_LOOP.format(op="~ v3 g0 g1\n. v3"), 'array_values'),
+        ("# 0 0 {\n= v0 1\n}\n" + AUTO_LOOP.format(op="$ v3 0\n. v3"), 'implicit_return'),
+        (AUTO_LOOP.format(op='= v3 "hi"\n. v3\n= v3 5'), 'mixed_types'),
+        (AUTO_LOOP.format(op="+ v3 v0 3000000000\n. v3"), 'wide_literal'),
+    ])
+    def test_differing_programs_avoid_wasm(self, code, feature, capsys):
+        from sui import SuiInterpreter, program_features
+        assert feature in program_features(code)
+        backend, printed = run_auto(code, capsys)
+        assert backend != 'wasm'
+        SuiInterpreter().run(code)
+        assert printed == capsys.readouterr().out.split()
+
+    def test_array_files_printed_avoid_wasm(self):
+        from sui import select_backend
+        assert select_backend(AUTO_LOOP.format(op="] v3 g5 v0\n. v3"), arrays=['g5'])[0] == 'wasm'
+        assert select_backend(AUTO_LOOP.format(op=". g5"), arrays=['g5'])[0] != 'wasm'
+
+    def test_compile_error_reruns_on_interpreter(self, capsys):
+        from sui import run_backend
+        run_backend(AUTO_LOOP.format(op="+ v3 v0 1000000000000\n. v3"), 'wasm', fallback=True)
+        assert capsys.readouterr().out.split() == ['1000000000000', '1000000000001', '1000000000002']
+
+
+class TestSuiWasmNumpy:
+    """Test NumPy memory views and batched calls"""
+
+    @pytest.fixture(autouse=True)
+    def _require_numpy(self):
+        pytest.importorskip("numpy")
+
+    def test_batch_two_args(self):
+        import numpy as np
+        runtime = SuiWasmRuntime()
+        inst = runtime.instantiate("# 0 2 {\n* v0 a0 a1\n+ v1 v0 1\n^ v1\n}", batch=[0])
+        inputs = np.array([[1, 2], [3, 4], [5, 6]])
+        assert inst.batch(0, inputs).tolist() == [3, 13, 31]
+
+    def test_batch_one_arg(self):
+        import numpy as np
+        runtime = SuiWasmRuntime()
+        inst = runtime.instantiate("# 0 1 {\n* v0 a0 a0\n^ v0\n}", batch=[0])
+        result = inst.batch(0, np.arange(10_000))
+        assert result.dtype == np.int32
+        assert result[9_999] == 9_999 * 9_999
+        # Scratch space is reused by later calls
+        assert inst.batch(0, np.array([3])).tolist() == [9]
+
+    def test_batch_requires_wrapper(self):
+        import numpy as np
+        inst = SuiWasmRuntime().instantiate("# 0 1 {\n^ a0\n}")
+        with pytest.raises(RuntimeError):
+            inst.batch(0, np.arange(3))
+
+    def test_batch_shape_mismatch(self):
+        import numpy as np
+        inst = SuiWasmRuntime().instantiate("# 0 2 {\n^ a0\n}", batch=[0])
+        with pytest.raises(ValueError):
+            inst.batch(0, np.arange(3))
+
+    def test_array_view_is_zero_copy(self):
+        import numpy as np
+        code = "# 0 1 {\n] v0 g0 a0\n^ v0\n}\n[ g0 1"
+        inst = SuiWasmRuntime().instantiate(code)
+        inst.main()
+        ptr = inst.array_from_numpy(np.array([7, 8, 9]))
+        inst.set_global(0, ptr)
+        assert inst.call(0, 2) == 9
+        inst.array_view(ptr, 3)[2] = 42
+        assert inst.call(0, 2) == 42
+
+    def test_alloc_grows_memory(self):
+        inst = SuiWasmRuntime().instantiate("[ g0 1")
+        ptr = inst.alloc_array(100_000)
+        view = inst.array_view(ptr, 100_000)
+        assert view.size == 100_000
+        assert inst.memory_view().nbytes >= ptr + 400_000
+
+
+FIB_LOOP = "# 0 1 {\n< v0 a0 2\n! v1 v0\n? v1 1\n^ a0\n: 1\n- v2 a0 1\n$ v3 0 v2\n- v4 a0 2\n$ v5 0 v4\n+ v6 v3 v5\n^ v6\n}\n= v0 0\n: 0\n< v1 v0 15\n! v2 v1\n? v2 1\n$ v3 0 v0\n. v3\n+ v0 v0 1\n@ 0\n: 1"
+
+
+class TestSuiTiered:
+    """Test interpreter-to-Wasm tiering"""
+
+    def test_matches_interpreter(self):
+        """Test that a compiled-up-front run produces the interpreter's output"""
+        from sui import SuiInterpreter
+        from suiwasm import SuiTieredRuntime
+        expected = SuiInterpreter().run(FIB_LOOP)
+        tiered = SuiTieredRuntime(wait=True)
+        assert tiered.run(FIB_LOOP) == expected
+        assert tiered.wasm_calls == 15
+
+    def test_background_compile(self):
+        """Test that execution starts before compilation finishes"""
+        from sui import SuiInterpreter
+        from suiwasm import SuiTieredRuntime
+        tiered = SuiTieredRuntime()
+        assert tiered.run(FIB_LOOP) == SuiInterpreter().run(FIB_LOOP)
+
+    def test_globals_transferred(self):
+        """Test that Wasm writes to globals are visible afterwards"""
+        from suiwasm import SuiTieredRuntime
+        code = "# 0 1 {\n* v0 a0 3\n+ g1 g1 1\n^ v0\n}\n$ v0 0 5\n$ v0 0 v0\n. v0\n. g1"
+        tiered = SuiTieredRuntime(wait=True)
+        assert tiered.run(code) == [45, 2]
+        assert tiered.wasm_calls == 2
+
+    @pytest.mark.parametrize("code", [
+        # Results past i32 (the interpreter's ints are unbounded)
+        "# 0 1 {\n* v0 a0 a0\n* v0 v0 a0\n^ v0\n}\n$ v0 0 10\n. v0\n$ v0 0 10000\n. v0",
+        "# 0 1 {\n< v0 a0 2\n? v0 1\n- v1 a0 1\n$ v2 0 v1\n* v3 a0 v2\n^ v3\n: 1\n^ 1\n}\n$ v0 0 25\n. v0",
+        # Printing before the overflow: the values appear once
+        "# 0 1 {\n. a0\n* v0 a0 1000000\n^ v0\n}\n$ v0 0 7\n. v0\n$ v0 0 5000\n. v0",
+        # Logical, not bitwise, & and |
+        "# 0 2 {\n& v0 a0 a1\n| v1 a0 a1\n* v2 v0 10\n+ v2 v2 v1\n^ v2\n}\n$ v0 0 2 1\n. v0\n$ v0 0 0 2\n. v0",
+        # Negative indexes count from the end
+        "# 0 2 {\n] v0 a0 a1\n^ v0\n}\n[ g0 3\n{ g0 2 9\n$ v0 0 g0 -1\n. v0",
+        # Running off the end returns None
+        "# 0 1 {\n+ v0 a0 1\n}\n$ v0 0 1\n. v0\n$ v0 0 2\n. v0\n$ v0 0 3\n. v0",
+        # Arrays passed in, or held by a global the function uses, stay arrays
+        "# 0 1 {\n^ a0\n}\n[ v1 2\n$ v0 0 v1\n. v0",
+        "# 0 0 {\n= v0 g0\n^ v0\n}\n[ g0 2\n$ v0 0\n. v0",
+    ])
+    def test_differential(self, code):
+        """Test that tiered runs print exactly what the interpreter prints"""
+        from sui import SuiInterpreter
+        from suiwasm import SuiTieredRuntime
+        assert SuiTieredRuntime(wait=True, output='capture').run(code) == SuiInterpreter(output='capture').run(code)
+
+    def test_unsafe_functions_interpreted(self):
+        """Test that true division and float values stay in the interpreter"""
+        from suiwasm import SuiTieredRuntime
+        code = "# 0 1 {\n/ v0 a0 2\n^ v0\n}\n# 1 1 {\n+ v0 a0 1\n^ v0\n}\n$ g0 0 7\n. g0\n$ g1 1 1.5\n. g1"
+        tiered = SuiTieredRuntime(wait=True)
+        assert tiered.run(code) == [3.5, 2.5]
+        assert 0 not in tiered.wasm_funcs
+        assert tiered.wasm_calls == 0
+
+    def test_functions_without_return_interpreted(self):
+        from suiwasm import SuiTieredRuntime
+        tiered = SuiTieredRuntime(wait=True)
+        assert tiered.run("# 0 1 {\n+ v0 a0 1\n}\n$ v0 0 1\n. v0") == [None]
+        assert tiered.wasm_funcs == {}
+
+
+class TestJit:
+    """Test the @jit decorator"""
+
+    def test_compiled(self):
+        assert jit_fib.fallback_reason is None
+        assert jit_fib.sui_code.startswith("# 0 1 {")
+        assert jit_fib(20) == jit_fib.py_func(20) == 6765
+        assert jit_fib.__name__ == "jit_fib"
+
+    def test_loop(self):
+        assert jit_sum_squares.fallback_reason is None
+        assert jit_sum_squares(10) == 385
+
+    def test_unsupported_falls_back(self):
+        assert "SCALE" in jit_uses_global.fallback_reason
+        assert jit_uses_global(4) == 12
+        # Python's modulo sign differs from i32 Wasm
+        assert jit_mod.fallback_reason is not None
+        assert jit_mod(-7, 3) == 2
+
+    def test_and_or_values_fall_back(self):
+        assert "'and'/'or'" in jit_and.fallback_reason
+        assert jit_and(2, 1) == 1 and jit_and(0, 5) == 0
+        assert jit_or(2, 1) == 2
+        assert jit_both_positive.fallback_reason is None
+        assert [jit_both_positive(a, b) for a, b in [(2, 3), (2, 0), (-1, 3)]] == [1, 0, 0]
+
+    def test_overflow_falls_back(self):
+        assert jit_factorial.fallback_reason is None
+        assert jit_factorial(10) == 3628800
+        assert jit_factorial(20) == 2432902008176640000
+
+    def test_non_int_arguments_fall_back(self):
+        assert jit_fib(2.0) == 1.0
+        assert isinstance(jit_fib(2.0), float)
+        with pytest.raises(TypeError):
+            jit_fib(1, 2)
+
+    def test_stack_exhaustion(self):
+        assert jit_depth(1000) == 1000
+        with pytest.raises(RecursionError):
+            jit_depth(10 ** 7)
+
+    def test_cached_by_source(self):
+        from sui import _jit_cache
+        count = len(_jit_cache)
+        again = jit(jit_fib.py_func)
+        assert len(_jit_cache) == count
+        assert again(10) == 55
+
+    def test_range_step_falls_back(self):
+        assert "range" in jit_countdown.fallback_reason
+        assert jit_countdown(10) == 55
+        assert "range" in jit_step.fallback_reason
+        assert jit_step(10) == 18
+
+    def test_loop_variable_assignment_falls_back(self):
+        assert "'i'" in jit_skip_ahead.fallback_reason
+        assert jit_skip_ahead(10) == 10
+
+    def test_loop_variable_after_loop_falls_back(self):
+        assert "outside its loop" in jit_last_index.fallback_reason
+        assert jit_last_index(5) == 4
+
+    def test_loop_bound_assignment_falls_back(self):
+        assert "'n'" in jit_moving_bound.fallback_reason
+        assert jit_moving_bound(10) == 10
+
+    def test_bool_results(self):
+        assert jit_less.fallback_reason is None
+        assert jit_less(1, 2) is True and jit_less(2, 1) is False
+        assert jit_is_even.fallback_reason is not None  # '%'
+        assert jit_bool_or_int.fallback_reason == "returns both bools and ints"
+        assert jit_bool_or_int(3) is True and jit_bool_or_int(-1) == -1
+        assert jit_fib(True) is True
@@ -8,7 +8,9 @@ import subprocess
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from sui import SuiInterpreter
 from sui2py import Sui2PyTranspiler
+from py2sui import Py2SuiTranspiler, translate_item
 
 
 class TestSui2Py:
@@ -72,6 +74,32 @@ $ g1 0 g0
             os.unlink(temp_file)
 
 
+class TestSui2PyInput:
+    """Test that `,` in transpiled code reads input like the interpreter"""
+
+    def test_input_matches_interpreter(self, tmp_path):
+        sui_code = ", v0\n, v1\n+ v2 v0 v1\n. v2\n, v3\n. v3\n, v4\n. v4"
+        python_file = tmp_path / "read.py"
+        python_file.write_text(Sui2PyTranspiler().transpile(sui_code))
+        stdin = "5\n37.5\nhello world\r\n-3"
+        result = subprocess.run([sys.executable, str(python_file)], input=stdin,
+                                capture_output=True, text=True, timeout=5)
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.split("\n")[:3] == ["42.5", "hello world", "-3"]
+        expected = SuiInterpreter(output='capture', input=stdin.splitlines()).run(sui_code)
+        assert expected == [42.5, "hello world", -3]
+
+    def test_stdin_without_buffer(self, monkeypatch, capsys):
+        import io
+        monkeypatch.setattr(sys, "stdin", io.StringIO("5\n37.5\nhello world\r\n-3"))
+        exec(Sui2PyTranspiler().transpile(", v0\n, v1\n+ v2 v0 v1\n. v2\n, v3\n. v3\n, v4\n. v4"),
+             {'__name__': '__main__'})
+        assert capsys.readouterr().out.split("\n")[:3] == ["42.5", "hello world", "-3"]
+
+    def test_no_runtime_without_input(self):
+        assert "_read" not in Sui2PyTranspiler().transpile(". 1")
+
+
 class TestSui2PyControlFlow:
     """Test control flow transpilation"""
 
@@ -110,6 +138,77 @@ class TestSui2PyControlFlow:
             os.unlink(temp_file)
 
 
+class TestSui2PyLimits:
+    """Test limits enforced by transpiled code"""
+
+    def run(self, sui_code, **limits):
+        from sui import Limits
+        namespace = {'__name__': '__main__'}
+        exec(Sui2PyTranspiler(Limits(**limits)).transpile(sui_code), namespace)
+        return namespace
+
+    def test_step_budget(self, capsys):
+        with pytest.raises(RuntimeError, match="steps limit exceeded"):
+            self.run(": 0\n@ 0", steps=1000)
+        code = "# 0 0 {\n: 0\n@ 0\n}\n$ v0 0"
+        with pytest.raises(RuntimeError, match="steps limit exceeded"):
+            self.run(code, steps=1000)
+
+    def test_loop_within_budget(self, capsys):
+        self.run("= v0 0\n: 0\n+ v0 v0 1\n< v1 v0 3\n? v1 0\n: 1\n. v0", steps=100)
+        assert capsys.readouterr().out == "3\n"
+
+    def test_depth_and_recursion(self):
+        code = "# 0 1 {\n+ v0 a0 1\n$ v1 0 v0\n^ v1\n}\n$ v0 0 0"
+        with pytest.raises(RuntimeError, match="depth limit exceeded") as e:
+            self.run(code, depth=20)
+        assert type(e.value).__name__ == "DepthLimitExceeded"
+        with pytest.raises(RuntimeError, match="steps limit exceeded"):
+            self.run(code, steps=100)
+
+    def test_array_cells_and_output(self, capsys):
+        with pytest.raises(RuntimeError, match="array_cells limit exceeded"):
+            self.run("[ g0 999999999", array_cells=1000)
+        with pytest.raises(RuntimeError, match="output limit exceeded"):
+            self.run(": 0\n. 1\n@ 0", output=2)
+        assert capsys.readouterr().out == "1\n1\n"
+
+    def test_loops_in_called_functions_spend_the_budget(self, capsys):
+        code = "# 0 0 {\n= v0 0\n: 0\n+ v0 v0 1\n< v1 v0 3\n? v1 0\n^ v0\n}\n= v5 0\n: 0\n$ v6 0\n+ v5 v5 1\n. v5\n@ 0"
+        with pytest.raises(RuntimeError, match="steps limit exceeded"):
+            self.run(code, steps=300)
+        assert 10 <= len(capsys.readouterr().out.split()) < 20
+
+    def test_step_check_overhead(self):
+        """Benchmark in executed bytecodes, which unlike wall time is reproducible"""
+        code = ("= v0 0\n= v2 0\n: 0\n+ v0 v0 1\n+ v2 v2 v0\n% v3 v2 7\n- v4 v3 1\n"
+                "< v1 v0 1000\n? v1 0\n. v2")
+
+        def bytecodes(limits):
+            count = 0
+
+            def trace(frame, event, arg):
+                nonlocal count
+                frame.f_trace_opcodes = True
+                count += event == 'opcode'
+                return trace
+
+            compiled = compile(Sui2PyTranspiler(limits).transpile(code), '<sui>', 'exec')
+            sys.settrace(trace)
+            try:
+                exec(compiled, {'__name__': '__main__', 'print': lambda value: None})
+            finally:
+                sys.settrace(None)
+            return count
+
+        from sui import Limits
+        assert bytecodes(Limits(steps=10**9)) < bytecodes(None) * 1.05
+
+    def test_no_checks_without_limits(self):
+        python_code = Sui2PyTranspiler().transpile(": 0\n[ g0 5\n. 1\n@ 0")
+        assert "_steps" not in python_code and "_print" not in python_code
+
+
 class TestSui2PyArrays:
     """Test array transpilation"""
 
@@ -210,3 +309,151 @@ class TestExampleFiles:
         )
         assert result.returncode == 0
         assert "8" in result.stdout
+
+
+class TestPy2Sui:
+    """Test Python to Sui transpiler"""
+
+    def run(self, python_code):
+        sui_code = Py2SuiTranspiler().transpile(python_code)
+        return sui_code, SuiInterpreter().run(sui_code)
+
+    def test_literals_inlined(self):
+        """Test that constants are used as operands instead of copied into temps"""
+        sui_code, output = self.run("x = 1\ny = x + 2\nprint(y)")
+        assert sui_code.split("\n") == ["= g0 1", "+ g1 g0 2", ". g1"]
+        assert output == [3]
+
+    def test_temps_reused(self):
+        """Test that dead temporaries share registers"""
+        sui_code, output = self.run("a = 2\nb = 3\nprint(a * a + b * b + a * b)")
+        assert "v1" in sui_code and "v2" not in sui_code
+        assert output == [19]
+
+    def test_fused_branch(self):
+        """Test that <= branches with a single inverted comparison"""
+        sui_code, output = self.run("x = 5\nif x <= 3:\n    print(1)\nelse:\n    print(2)")
+        assert "> v0 g0 3" in sui_code
+        assert "|" not in sui_code and "!" not in sui_code
+        assert output == [2]
+
+    def test_short_circuit_conditions(self):
+        sui_code, output = self.run(
+            "def f(x):\n    if 0 < x and x < 10 or x == 100:\n        return 1\n    return 0\n"
+            "print(f(5))\nprint(f(10))\nprint(f(100))\nprint(f(-1))"
+        )
+        assert output == [1, 0, 1, 0]
+
+    def test_loop_temps_stay_live(self):
+        """Test that a temp read across a loop back edge keeps its register"""
+        sui_code, output = self.run(
+            "n = 3\ntotal = 0\nfor i in range(n + 1):\n    total = total + i * 2\nprint(total)"
+        )
+        assert output == [12]
+
+    def test_reassigned_arguments(self):
+        """Test that arguments written in the body are copied to locals"""
+        sui_code, output = self.run(
+            "def gcd(a, b):\n    while b != 0:\n        t = b\n        b = a % b\n        a = t\n    return a\n"
+            "print(gcd(1071, 462))"
+        )
+        assert "= a" not in sui_code
+        assert output == [21]
+
+    def test_fibonacci(self):
+        sui_code, output = self.run(
+            "def fib(n):\n    if n < 2:\n        return n\n    return fib(n - 1) + fib(n - 2)\nprint(fib(10))"
+        )
+        assert output == [55]
+        assert len(sui_code.split("\n")) == 15
+
+    def test_many_globals(self):
+        """Test that globals are numbered in order"""
+        python_code = "\n".join(f"x{i} = {i}" for i in range(50))
+        sui_code = Py2SuiTranspiler().transpile(python_code)
+        assert sui_code.split("\n")[-1] == "= g49 49"
+
+
+class TestPy2SuiBatch:
+    """Test parallel batch translation"""
+
+    def run_batch(self, source):
+        import io
+        import json
+        from py2sui import iter_batch_items, run_batch
+        out = io.StringIO()
+        total, failed = run_batch(iter_batch_items(source), out, workers=2)
+        results = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert len(results) == total
+        assert sum(not r["ok"] for r in results) == failed
+        return results
+
+    def test_directory(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            os.makedirs(os.path.join(tmpdir, "sub"))
+            with open(os.path.join(tmpdir, "a.py"), "w") as f:
+                f.write("print(1 + 2)")
+            with open(os.path.join(tmpdir, "sub", "b.py"), "w") as f:
+                f.write("def (")
+            with open(os.path.join(tmpdir, "notes.txt"), "w") as f:
+                f.write("ignored")
+            results = self.run_batch(tmpdir)
+        assert [r["id"] for r in results] == ["a.py", os.path.join("sub", "b.py")]
+        assert results[0]["ok"] and SuiInterpreter().run(results[0]["sui"]) == [3]
+        assert not results[1]["ok"] and results[1]["error"].startswith("SyntaxError")
+        assert all(r["elapsed"] >= 0 for r in results)
+
+    def test_jsonl_errors_do_not_stop_run(self):
+        lines = [
+            '{"id": "ok", "code": "x = 4\\nprint(x * x)"}',
+            'not json',
+            '{"id": "unsupported", "code": "for x in [1]:\\n    pass"}',
+            '',
+            '{"code": "print(7)"}',
+        ]
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False) as f:
+            f.write("\n".join(lines))
+            path = f.name
+        try:
+            results = self.run_batch(path)
+        finally:
+            os.unlink(path)
+        assert [r["id"] for r in results] == ["ok", "2", "unsupported", "5"]
+        assert [r["ok"] for r in results] == [True, False, False, True]
+        assert "NotImplementedError" in results[2]["error"]
+        assert SuiInterpreter().run(results[3]["sui"]) == [7]
+
+    def test_cli(self):
+        script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "py2sui.py")
+        result = subprocess.run(
+            [sys.executable, script, "--batch", "-", "--workers", "1"],
+            input='{"id": 1, "code": "print(5)"}\n', capture_output=True, text=True
+        )
+        assert result.returncode == 0
+        assert '"id": "1", "ok": true' in result.stdout
+        assert "1/1" in result.stderr
+
+    def test_worker_crash_is_pinned_on_its_item(self, monkeypatch):
+        import io
+        import json
+        import py2sui
+        monkeypatch.setattr(py2sui, "translate_item", crash_on_item)
+        # "slow" is still running, at the head of the queue, when "crash" kills the pool
+        items = [(item_id, None, "print(1)") for item_id in ["slow", "crash", "2", "3"]]
+        out = io.StringIO()
+        total, failed = py2sui.run_batch(items, out, workers=2)
+        results = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert (total, failed) == (4, 1)
+        assert [r["id"] for r in results] == ["slow", "crash", "2", "3"]
+        assert [r["ok"] for r in results] == [True, False, True, True]
+        assert results[1]["error"] == "worker process crashed"
+
+
+def crash_on_item(item):
+    """Batch worker that dies on the item with id "crash" (module level, so workers can unpickle it)"""
+    if item[0] == "crash":
+        os._exit(1)
+    if item[0] == "slow":
+        import time
+        time.sleep(0.5)
+    return translate_item(item)
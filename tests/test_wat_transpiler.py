@@ -278,3 +278,292 @@ class TestSui2WatExamples:
         assert "(i32.store)" in code  # Array writes
         assert "(i32.load)" in code   # Array reads
 
+
+
+class TestSui2WatSimd:
+    """Test SIMD vectorization of counted array loops"""
+
+    SUM_LOOP = """
+[ g0 8
+= g1 0
+= v0 0
+: 0
+< v1 v0 8
+! v2 v1
+? v2 1
+] v3 g0 v0
++ g1 g1 v3
++ v0 v0 1
+@ 0
+: 1
+. g1
+"""
+
+    def test_reduction_vectorized(self):
+        """Test that a sum loop gets an i32x4 fast path"""
+        transpiler = Sui2WatTranspiler()
+        code = transpiler.transpile(self.SUM_LOOP)
+        assert "(v128.load)" in code
+        assert "(i32x4.add)" in code
+        assert "(i32x4.extract_lane 3)" in code
+        assert "(i32.load)" in code  # Scalar tail is kept
+
+    def test_map_vectorized(self):
+        """Test that an element-wise store loop is vectorized"""
+        transpiler = Sui2WatTranspiler()
+        code = transpiler.transpile("""
+[ g0 8
+[ g1 8
+= v0 0
+: 0
+< v1 v0 8
+! v2 v1
+? v2 1
+] v3 g0 v0
+* v4 v3 3
+{ g1 v0 v4
++ v0 v0 1
+@ 0
+: 1
+""")
+        assert "(i32x4.mul)" in code
+        assert "(v128.store)" in code
+
+    def test_no_simd_option(self):
+        """Test that vectorization can be disabled"""
+        transpiler = Sui2WatTranspiler(simd=False)
+        code = transpiler.transpile(self.SUM_LOOP)
+        assert "v128" not in code
+
+    def test_loop_carried_dependency_not_vectorized(self):
+        """Test that a prefix-sum style loop stays scalar"""
+        transpiler = Sui2WatTranspiler()
+        code = transpiler.transpile("""
+[ g0 8
+= v0 1
+: 0
+< v1 v0 8
+! v2 v1
+? v2 1
+- v5 v0 1
+] v3 g0 v5
+{ g0 v0 v3
++ v0 v0 1
+@ 0
+: 1
+""")
+        assert "v128" not in code
+
+    def test_vectorized_matches_scalar(self):
+        """Test that SIMD and scalar builds agree, including the tail"""
+        suiwasm = pytest.importorskip("suiwasm")
+        if not suiwasm.WASMTIME_AVAILABLE:
+            pytest.skip("wasmtime not installed")
+        from wasmtime import Engine, Store, Module, Linker, FuncType, ValType
+
+        def run(code: str, simd: bool) -> list[int]:
+            engine = Engine()
+            store = Store(engine)
+            module = Module(engine, Sui2WatTranspiler(simd=simd).transpile(code))
+            output: list[int] = []
+            linker = Linker(engine)
+            linker.define_func("env", "print_i32", FuncType([ValType.i32()], []), output.append)
+            linker.instantiate(store, module).exports(store)["main"](store)
+            return output
+
+        for size in [0, 3, 4, 5, 9, 33]:
+            code = f"""
+[ g0 {size}
+= v0 0
+: 0
+< v1 v0 {size}
+! v2 v1
+? v2 1
+* v3 v0 v0
+- v3 v3 5
+{{ g0 v0 v3
++ v0 v0 1
+@ 0
+: 1
+= g1 0
+= v0 0
+: 2
+< v1 v0 {size}
+! v2 v1
+? v2 3
+] v3 g0 v0
+< v4 v3 10
++ g1 g1 v4
++ v0 v0 1
+@ 2
+: 3
+. g1
+. v3
+"""
+            assert run(code, simd=True) == run(code, simd=False)
+
+
+class TestSui2WatLocals:
+    """Test liveness-based local allocation"""
+
+    def test_disjoint_locals_share_slot(self):
+        """Test that locals with disjoint live ranges are coalesced"""
+        transpiler = Sui2WatTranspiler()
+        code = transpiler.transpile("# 0 1 {\n+ v0 a0 1\n. a0\n. v0\n+ v1 a0 2\n. a0\n. v1\n^ a0\n}")
+        assert "(local $v0 i32)" in code
+        assert "(local $v1 i32)" not in code
+
+    def test_overlapping_locals_keep_slots(self):
+        """Test that simultaneously live locals are not merged"""
+        transpiler = Sui2WatTranspiler()
+        code = transpiler.transpile("# 0 1 {\n+ v0 a0 1\n+ v1 a0 2\n. v0\n. v1\n^ a0\n}")
+        assert "(local $v0 i32)" in code
+        assert "(local $v1 i32)" in code
+
+    def test_single_use_temp_stays_on_stack(self):
+        """Test that a temp consumed by the next instruction needs no local"""
+        transpiler = Sui2WatTranspiler()
+        code = transpiler.transpile("# 0 2 {\n< v0 a0 a1\n! v1 v0\n^ v1\n}")
+        assert "$v0" not in code
+        assert "$v1" not in code
+        assert "(i32.lt_s)\n    (i32.eqz)\n    (return)" in code
+
+    def test_reuse_locals_option(self):
+        """Test that local reuse can be disabled"""
+        transpiler = Sui2WatTranspiler(reuse_locals=False)
+        code = transpiler.transpile("# 0 2 {\n< v0 a0 a1\n! v1 v0\n^ v1\n}")
+        assert "(local $v0 i32)" in code
+        assert "(local $v1 i32)" in code
+
+    def test_fallthrough_follows_source_order(self):
+        """Test that falling off a label continues with the next label in the source"""
+        suiwasm = pytest.importorskip("suiwasm")
+        if not suiwasm.WASMTIME_AVAILABLE:
+            pytest.skip("wasmtime not installed")
+        runtime = suiwasm.SuiWasmRuntime()
+        code = "= v0 0\n: 3\n+ v0 v0 1\n: 1\n. v0\n~ v1 v0 2\n? v1 2\n@ 3\n: 2\n. 99"
+        _, output = runtime.run(code)
+        assert output == [1, 2, 99]
+
+
+class TestSui2WatHostIO:
+    """Test strings, input and command-line arguments"""
+
+    def test_string_literal_in_data_segment(self):
+        """Test that printed strings go to a data segment and print_str"""
+        transpiler = Sui2WatTranspiler()
+        code = transpiler.transpile('. "Hi"')
+        assert '(import "env" "print_str"' in code
+        assert '(data (i32.const 0) "\\02\\00\\00\\00\\48\\69' in code
+        assert "(call $print_str)" in code
+        assert '(export "memory" (memory 0))' in code
+
+    def test_string_variable_printed_as_string(self):
+        """Test that variables only holding strings are printed with print_str"""
+        transpiler = Sui2WatTranspiler()
+        code = transpiler.transpile('= g0 "a"\n= v0 5\n. v0\n. g0')
+        assert code.count("(call $print_str)") == 1
+        assert code.count("(call $print_i32)") == 1
+
+    def test_copy_cycle_is_not_a_string(self):
+        """Test that variables only copied from each other are printed as numbers"""
+        transpiler = Sui2WatTranspiler()
+        assert transpiler.infer_string_vars([['=', 'v0', 'v1'], ['=', 'v1', 'v0'], ['.', 'v0']]) == set()
+        code = transpiler.transpile('= v0 v1\n= v1 v0\n. v0\n. "hi"')
+        assert code.count("(call $print_str)") == 1
+        assert code.count("(call $print_i32)") == 1
+        # A literal entering the cycle still makes both strings
+        lines = [['=', 'v0', '"a"'], ['=', 'v1', 'v0'], ['=', 'v0', 'v1']]
+        assert transpiler.infer_string_vars(lines) == {'v0', 'v1'}
+
+    def test_heap_starts_after_strings(self):
+        """Test that arrays are allocated past the string data"""
+        transpiler = Sui2WatTranspiler()
+        code = transpiler.transpile('. "abcdefgh"\n[ g0 4')
+        assert "(global $heap_ptr (export \"heap_ptr\") (mut i32) (i32.const 16))" in code
+
+    def test_input_import(self):
+        """Test that `,` reads through read_i32"""
+        transpiler = Sui2WatTranspiler()
+        code = transpiler.transpile(", v0\n. v0")
+        assert '(import "env" "read_i32"' in code
+        assert "(call $read_i32)" in code
+
+    def test_argv_globals_initialised(self):
+        """Test that g100/g101 are set from the host before main's body"""
+        transpiler = Sui2WatTranspiler()
+        code = transpiler.transpile("+ v0 g101 g100\n. v0")
+        assert "(call $arg_count)\n    (global.set $g100)" in code
+        assert "(i32.const 0)\n    (call $arg_i32)\n    (global.set $g101)" in code
+
+    def test_no_extra_imports_for_plain_code(self):
+        """Test that programs without strings/input/argv only import print_i32"""
+        transpiler = Sui2WatTranspiler()
+        code = transpiler.transpile("= g0 1\n. g0")
+        assert code.count("(import ") == 1
+
+
+class TestSui2WatBatchExports:
+    """Test generated batch wrappers"""
+
+    def test_batch_wrapper(self):
+        """Test that a batch_fN wrapper loops the function over memory"""
+        transpiler = Sui2WatTranspiler(batch_exports=[0])
+        code = transpiler.transpile("# 0 2 {\n+ v0 a0 a1\n^ v0\n}")
+        assert '(func $batch_f0 (export "batch_f0") (param $in i32) (param $out i32) (param $n i32)' in code
+        assert "(call $f0)" in code
+        assert '(export "memory" (memory 0))' in code
+
+    def test_no_batch_wrapper_by_default(self):
+        """Test that wrappers are opt-in"""
+        transpiler = Sui2WatTranspiler()
+        code = transpiler.transpile("# 0 1 {\n^ a0\n}")
+        assert "batch_f0" not in code
+
+
+class TestSui2WatExports:
+    """Test export selection and dead-function elimination"""
+
+    CODE = "# 0 1 {\n$ v0 1 a0\n^ v0\n}\n# 1 1 {\n+ v0 a0 g1\n^ v0\n}\n# 2 0 {\n[ g3 10\n^ g2\n}\n= g1 5\n= g0 1"
+
+    def test_default_exports_everything(self):
+        """Test that every function and global is exported by default"""
+        code = Sui2WatTranspiler().transpile(self.CODE)
+        for name in ("f0", "f1", "f2", "g0", "g1", "g2", "g3"):
+            assert f'(export "{name}")' in code
+
+    def test_unreachable_functions_dropped(self):
+        """Test that only exported functions and their callees are kept"""
+        code = Sui2WatTranspiler(exports=["f0", "g0"]).transpile(self.CODE)
+        assert '(func $f0 (export "f0")' in code
+        assert "(func $f1 (param" in code
+        assert "$f2" not in code
+        assert '(export "f1")' not in code
+
+    def test_unreachable_globals_dropped(self):
+        """Test that globals used only by dropped functions disappear"""
+        code = Sui2WatTranspiler(exports=["f0", "g0"]).transpile(self.CODE)
+        assert '(global $g0 (export "g0")' in code
+        assert "(global $g1 (mut i32)" in code
+        assert "$g2" not in code
+        assert "$g3" not in code
+        assert "(memory" not in code
+
+    def test_unused_print_import_dropped(self):
+        """Test that print_i32 is only imported when something prints"""
+        code = Sui2WatTranspiler(exports=["g0"]).transpile("= g0 1")
+        assert "print_i32" not in code
+        code = Sui2WatTranspiler(exports=["g0"]).transpile("= g0 1\n. g0")
+        assert "print_i32" in code
+
+    def test_strip_custom_sections(self):
+        """Test that the name section is removed from the binary"""
+        wasmtime = pytest.importorskip("wasmtime")
+        from sui2wasm import strip_custom_sections
+        wat = Sui2WatTranspiler(exports=["f0"]).transpile(self.CODE)
+        wasm = wasmtime.wat2wasm(wat)
+        stripped = strip_custom_sections(wasm)
+        assert len(stripped) < len(wasm)
+        assert b"name" not in stripped
+        module = wasmtime.Module(wasmtime.Engine(), stripped)
+        assert sorted(e.name for e in module.exports) == ["f0", "main"]